@@ -0,0 +1,42 @@
+import importlib
+
+# Purpose: Processing of eddy-covariance TOA5 data as an importable package. The public
+#          functions and classes are imported from their modules on first use, so importing
+#          the package does not load pandas, matplotlib or the splitter.
+#
+# Example: import ecdataprocessing
+#          ecdataprocessing.main(['inventory', '/Volumes/Group/speuldpro_praj/'])
+#          inventory = ecdataprocessing.FileInventory('file_inventory.sqlite')
+
+# Public name -> module that defines it
+_EXPORTS = {
+    'main': 'cli',
+    'unzip_all_files': 'unzipfiles',
+    'FileInventory': 'checktime',
+    'update_inventory': 'checktime',
+    'split_site': 'split_30mins_file',
+    'split_files_serial': 'split_30mins_file',
+    'split_files_parallel': 'split_30mins_file',
+    'list_input_files': 'split_30mins_file',
+    'load_block': 'split_30mins_file',
+    'BlockIndex': 'blockindex',
+    'BlockStats': 'blockstats',
+    'Coverage': 'coverage',
+    'TOA5Reader': 'toa5reader',
+    'configure_compression': 'compressed_io',
+    'load_file_times': 'checkmissingtimes',
+    'find_missing_ranges': 'checkmissingtimes',
+    'plot_coverage': 'checkmissingtimes',
+}
+
+__all__ = sorted(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
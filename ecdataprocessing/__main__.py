@@ -0,0 +1,6 @@
+import sys
+from .cli import main
+
+# Purpose: Run the command line with `python -m ecdataprocessing <command>`, see cli.py.
+
+sys.exit(main())
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import logging
+import argparse
+from itertools import islice
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .split_30mins_file import (check_block_minutes, list_input_files, setup_logging, worker_pool,
+                               submit_jobs, collect_edges, report_metrics, PENDING_PER_WORKER)
+from .instrumentation import configure_profiling
+from .compressed_io import CODEC_SUFFIXES, configure_compression
+
+# Purpose: Split the data of several sites, or of one site with several block settings, in
+#          one run. Every site has its own input, output folder, sampling frequency and block
+#          length; the files of all sites are fed to one shared pool of worker processes.
+#
+# Usage:   ecdataprocessing batch sites.json [--workers N] [--log batch.log] [--metrics metrics.json]
+#          python -m ecdataprocessing.batch_split sites.json [--workers N] [--log batch.log] [--metrics metrics.json]
+#                                                              [--compression zstd] [--compression-level 3] [--compression-threads 0]
+#
+# Example sites.json:
+#   {
+#     "workers": 8,
+#     "sites": [
+#       {"site_name": "speuld", "file_location": "/Volumes/ITC/WRS/Group/speuldpro_praj/",
+#        "output_directory": "/Volumes/ITC/WRS/Group/speuldpro_praj/30mins_files",
+#        "years": [2012, 2013], "frequency": 20, "block_minutes": 30},
+#       {"site_name": "speuld", "file_location": "/Volumes/ITC/WRS/Group/speuldpro_praj/",
+#        "output_directory": "/Volumes/ITC/WRS/Group/speuldpro_praj/15mins_files",
+#        "years": [2012, 2013], "frequency": 20, "block_minutes": 15}
+#     ]
+#   }
+
+class SiteConfig(NamedTuple):
+    """Settings of one site in a batch run."""
+    site_name: str
+    file_location: str
+    output_directory: str
+    years: List[int]
+    frequency: int = 20  # samples per second
+    block_minutes: int = 30  # any divisor of 60
+    output_format: str = "raw"  # "raw" or "npy"
+    use_index: bool = True
+    zip_location: Optional[str] = None
+    turb_years: Sequence[int] = range(2014, 2020)
+
+    @property
+    def block_size(self) -> int:
+        """Expected number of rows in a complete block."""
+        return self.block_minutes * 60 * self.frequency
+
+def load_config(path: str) -> Tuple[List[SiteConfig], Optional[int]]:
+    """Read the sites and the optional worker count from a JSON config file.
+
+    Args:
+        path: Path to the JSON config file.
+
+    Returns:
+        Tuple of the site settings and the number of workers (None if not set).
+
+    Raises:
+        ValueError: If a site has unknown keys, an invalid block length or no input location.
+    """
+    with open(path, 'r') as file:
+        config = json.load(file)
+
+    sites = []
+    for entry in config.get('sites', []):
+        unknown = set(entry) - set(SiteConfig._fields)
+        if unknown:
+            raise ValueError(f"Unknown site settings: {', '.join(sorted(unknown))}")
+        site = SiteConfig(**entry)
+        check_block_minutes(site.block_minutes)
+        if site.zip_location is None and not site.file_location:
+            raise ValueError(f"Site {site.site_name} has no file_location or zip_location")
+        sites.append(site)
+    return sites, config.get('workers')
+
+def run_batch(sites: List[SiteConfig], workers: int) -> None:
+    """Split the files of every site with one shared pool of worker processes.
+
+    The files of all sites form one queue, so the pool stays busy across site boundaries,
+    but only a few files per worker are submitted ahead of the parent. The edge blocks of
+    each site are written by the parent in file order, site by site.
+
+    Args:
+        sites: Settings of the sites to process.
+        workers: Number of worker processes.
+    """
+    jobs = []
+    for site in sites:
+        os.makedirs(site.output_directory, exist_ok=True)
+        files = list_input_files(site.file_location, site.years, site.zip_location, site.turb_years)
+        if not files:
+            logging.warning(f"No input files found for {site.site_name} ({site.output_directory})")
+            continue
+        logging.info(f"{site.site_name}: {len(files)} files, {site.block_minutes}-minute blocks of {site.block_size} rows")
+        jobs.append((site, files))
+
+    calls = ((dat_file, site.output_directory, site.site_name, site.block_size, site.use_index, site.output_format, site.block_minutes)
+             for site, files in jobs for dat_file in files)
+    with worker_pool(workers) as executor:
+        futures = submit_jobs(executor, calls, PENDING_PER_WORKER * workers)
+        for site, files in jobs:
+            collect_edges(islice(futures, len(files)), site.output_directory, site.site_name, site.block_size,
+                          site.use_index, site.output_format, site.block_minutes)
+            logging.info(f"Finished {site.site_name} ({site.output_directory})")
+
+def run_config(config_path: str, workers: Optional[int] = None, metrics_path: Optional[str] = None) -> int:
+    """Split the sites of a JSON config file and report the metrics of the run.
+
+    Args:
+        config_path: Path to the JSON config file.
+        workers: Number of worker processes (default: the config value or the CPU count).
+        metrics_path: Optional output file of the run metrics.
+
+    Returns:
+        Exit status, 0 on success and 1 if no sites are configured.
+    """
+    sites, configured_workers = load_config(config_path)
+    workers = workers or configured_workers or os.cpu_count() or 1
+    if not sites:
+        logging.error(f"No sites configured in {config_path}")
+        return 1
+    run_batch(sites, workers)
+    report_metrics(metrics_path)
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Split the .dat files of several sites into fixed-length blocks.")
+    parser.add_argument('config', help="JSON file with the site settings")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: config value or CPU count)")
+    parser.add_argument('--log', default='batch_split.log', help="log file")
+    parser.add_argument('--metrics', default=None, help="export the run metrics (.json, or Prometheus text otherwise)")
+    parser.add_argument('--profile', default=None, help="run files matching this glob under cProfile and tracemalloc")
+    parser.add_argument('--compression', choices=sorted(CODEC_SUFFIXES), default='none', help="codec of the block files of all sites")
+    parser.add_argument('--compression-level', type=int, default=None, help="compression level (default: the codec's default)")
+    parser.add_argument('--compression-threads', type=int, default=0, help="compression threads per writer, -1 for one per core")
+    args = parser.parse_args()
+
+    setup_logging(args.log)
+    configure_profiling(args.profile, 'profiles')
+    configure_compression(args.compression, args.compression_level, args.compression_threads)
+    return run_config(args.config, args.workers, args.metrics)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from contextlib import nullcontext
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .synthetic_toa5 import generate_dataset
+from .concurrent_io import latency_shim
+
+# Purpose: Benchmark the processing stages on a synthetic data set, so the effect of a change
+#          on unzip, inventory, split and gap-check can be measured and compared between runs.
+#          Every stage runs in a fresh process, so its peak RSS is not inflated by earlier
+#          stages. Throughput is reported against the size of the whole data set (rows and
+#          uncompressed .dat bytes), which every stage processes in some form.
+#
+# Usage:   python -m ecdataprocessing.benchmark --days 2 --output benchmark_results.json
+#          python -m ecdataprocessing.benchmark --stages split --split-mode streaming --compare benchmark_results.json
+#          python -m ecdataprocessing.benchmark --latency 0.005   # emulate a network share with 5 ms per file-system call
+#          python -m ecdataprocessing.benchmark --stages split --compression gzip --compression-threads -1
+
+STAGES = ['unzip', 'inventory', 'split', 'gaps']
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process and its finished children in MB."""
+    if resource is None:
+        return float('nan')
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+def stage_unzip(dataset: dict, workdir: str, options: dict) -> None:
+    from .unzipfiles import unzip_all_files
+    destination = os.path.join(workdir, 'unzipped')
+    shutil.rmtree(destination, ignore_errors=True)
+    unzip_all_files(dataset['zip_root'], destination, years=dataset['years'], workers=options['workers'])
+
+def stage_inventory(dataset: dict, workdir: str, options: dict) -> None:
+    from .checktime import FileInventory
+    path = os.path.join(workdir, 'file_inventory.sqlite')
+    if os.path.exists(path):
+        os.remove(path)
+    inventory = FileInventory(path)
+    try:
+        inventory.update(dataset['files'], workers=options['workers'])
+    finally:
+        inventory.close()
+
+def stage_split(dataset: dict, workdir: str, options: dict) -> None:
+    from . import split_30mins_file as splitter
+    from .blockindex import BlockIndex
+    from .compressed_io import configure_compression
+    configure_compression(options['compression'], options['compression_level'], options['compression_threads'])
+    output_directory = os.path.join(workdir, 'blocks')
+    shutil.rmtree(output_directory, ignore_errors=True)
+    os.makedirs(output_directory)
+    block_size = options['block_minutes'] * 60 * options['frequency']
+    mode = options['split_mode']
+
+    if mode == 'vectorized' and options['workers'] > 1:
+        splitter.split_files_parallel(dataset['files'], output_directory, 'bench', block_size, options['workers'],
+                                      use_index=True, block_minutes=options['block_minutes'])
+        return
+    index = BlockIndex(output_directory)
+    try:
+        splitter.split_files_serial(dataset['files'], output_directory, 'bench', block_size, options['frequency'], mode,
+                                    index=index, block_minutes=options['block_minutes'])
+    finally:
+        index.close()
+
+def stage_gaps(dataset: dict, workdir: str, options: dict) -> None:
+    # Gap-check as in checkmissingtimes, from the inventory written by the inventory stage
+    from .checktime import FileInventory
+    from .timestamps import NANOSECONDS_PER_SECOND
+    path = os.path.join(workdir, 'file_inventory.sqlite')
+    if not os.path.exists(path):
+        stage_inventory(dataset, workdir, options)
+    sample_period = NANOSECONDS_PER_SECOND // options['frequency']
+    inventory = FileInventory(path)
+    try:
+        coverage = inventory.coverage(sample_period=sample_period)
+        inventory.update_blocks(block_minutes=options['block_minutes'], frequency=options['frequency'])
+        inventory.blocks(block_minutes=options['block_minutes'], below=1.0)
+    finally:
+        inventory.close()
+    start, end = coverage.merged_starts[0], coverage.merged_ends[-1]
+    coverage.gaps(start, end, resolution=sample_period)
+    coverage.missing_blocks(start, end, options['block_minutes'] * 60 * NANOSECONDS_PER_SECOND)
+
+STAGE_FUNCTIONS = {
+    'unzip': stage_unzip,
+    'inventory': stage_inventory,
+    'split': stage_split,
+    'gaps': stage_gaps,
+}
+
+def _run_stage(stage: str, dataset: dict, workdir: str, options: dict, results) -> None:
+    """Run one stage in this (child) process and put its wall time and peak RSS on `results`."""
+    logging.basicConfig(level=logging.WARNING)
+    # The artificial latency applies to this process and to worker processes forked from it
+    latency = latency_shim(options['latency'], workdir) if options['latency'] else nullcontext()
+    start = time.perf_counter()
+    with latency:
+        STAGE_FUNCTIONS[stage](dataset, workdir, options)
+    results.put((time.perf_counter() - start, peak_rss_mb()))
+
+def run_stage(stage: str, dataset: dict, workdir: str, options: dict) -> dict:
+    """Run a stage in a fresh process and return its measurements."""
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_stage, args=(stage, dataset, workdir, options, results))
+    process.start()
+    process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Stage {stage} failed with exit code {process.exitcode}")
+    seconds, peak = results.get()
+    return {
+        'stage': stage,
+        'seconds': round(seconds, 4),
+        'rows': dataset['rows'],
+        'bytes': dataset['bytes'],
+        'rows_per_s': round(dataset['rows'] / seconds, 1),
+        'mb_per_s': round(dataset['bytes'] / 1e6 / seconds, 2),
+        'peak_rss_mb': round(peak, 1),
+    }
+
+def compare(results: list, baseline_path: str) -> None:
+    """Print the throughput ratio of every stage against a previous result file."""
+    with open(baseline_path, 'r') as file:
+        baseline = {entry['stage']: entry for entry in json.load(file)['results']}
+    for entry in results:
+        previous = baseline.get(entry['stage'])
+        if previous:
+            if previous['rows'] != entry['rows']:
+                print(f"{entry['stage']:>10}: compared with a data set of {previous['rows']} rows instead of {entry['rows']}")
+            print(f"{entry['stage']:>10}: {entry['rows_per_s'] / previous['rows_per_s']:.2f}x throughput, "
+                  f"peak RSS {previous['peak_rss_mb']:.0f} -> {entry['peak_rss_mb']:.0f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark unzip, inventory, split and gap-check on synthetic TOA5 data.")
+    parser.add_argument('--days', type=float, default=1.0, help="length of the synthetic data set in days")
+    parser.add_argument('--frequency', type=int, default=20, help="samples per second")
+    parser.add_argument('--file-hours', type=float, default=6.0, help="hours of data per file")
+    parser.add_argument('--block-minutes', type=int, default=30, help="block length of the split stage")
+    parser.add_argument('--split-mode', default='vectorized', choices=['vectorized', 'streaming', 'line_count'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="workers of the parallel stages")
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every file-system call, emulating a network share")
+    parser.add_argument('--workdir', default=None, help="folder for the data set (default: a temporary folder)")
+    parser.add_argument('--keep', action='store_true', help="keep the generated data and outputs")
+    parser.add_argument('--output', default='benchmark_results.json', help="JSON file receiving the results")
+    parser.add_argument('--compare', default=None, help="previous result file to compare with")
+    parser.add_argument('--compression', default='none', choices=['none', 'gzip', 'zstd'], help="codec of the blocks of the split stage")
+    parser.add_argument('--compression-level', type=int, default=None, help="compression level (default: the codec's default)")
+    parser.add_argument('--compression-threads', type=int, default=0, help="compression threads per writer, -1 for one per core")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='toa5_benchmark_')
+    options = {
+        'frequency': args.frequency,
+        'block_minutes': args.block_minutes,
+        'split_mode': args.split_mode,
+        'workers': args.workers,
+        'latency': args.latency,
+        'compression': args.compression,
+        'compression_level': args.compression_level,
+        'compression_threads': args.compression_threads,
+    }
+    try:
+        print(f"Generating {args.days} days of synthetic data in {workdir}")
+        dataset = generate_dataset(workdir, days=args.days, frequency=args.frequency, file_hours=args.file_hours,
+                                   zip_files='unzip' in args.stages, seed=args.seed)
+        print(f"{len(dataset['files'])} files, {dataset['rows']} rows, {dataset['bytes'] / 1e6:.1f} MB")
+
+        results = []
+        for stage in args.stages:
+            entry = run_stage(stage, dataset, workdir, options)
+            results.append(entry)
+            print(f"{stage:>10}: {entry['seconds']:8.2f} s {entry['rows_per_s']:12.0f} rows/s "
+                  f"{entry['mb_per_s']:8.1f} MB/s {entry['peak_rss_mb']:8.0f} MB peak RSS")
+    finally:
+        if not args.keep and args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'config': dict(options, days=args.days, file_hours=args.file_hours, files=len(dataset['files']),
+                       rows=dataset['rows'], bytes=dataset['bytes'], seed=args.seed),
+        'results': results,
+    }
+    if args.compare:
+        compare(results, args.compare)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
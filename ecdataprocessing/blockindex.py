@@ -0,0 +1,254 @@
+import os
+import sys
+import time
+import zlib
+import sqlite3
+import logging
+import argparse
+from typing import TYPE_CHECKING, Optional, Tuple, List
+from .blockstats import BlockStats
+from .compressed_io import codec_of, open_compressed, strip_codec_suffix
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Purpose: Keep a small SQLite manifest of the .raw blocks in an output directory, so reruns
+#          can tell finished blocks apart without reading them. The manifest also holds the
+#          data-quality statistics of every block, computed while it was written.
+
+INDEX_FILENAME = 'block_index.sqlite'
+# Suffix of block files that are still being written; they are moved into place when complete.
+# Every writer has its own temporary file, named <block>.<random>.part
+TEMPORARY_SUFFIX = '.part'
+# Age after which a temporary file is taken to be left by a killed run; a writer keeps one for seconds
+STALE_TEMPORARY_SECONDS = 3600
+
+def is_temporary(name: str) -> bool:
+    """Return True for the temporary file of a block that is being written, whatever its random part."""
+    return TEMPORARY_SUFFIX in name
+
+def scan_block(path: str, chunk_size: int = 1024 * 1024) -> Tuple[int, int, int]:
+    """Read a block file and return its line count, size and CRC32.
+
+    Size and checksum are those of the file on disk; the lines of a compressed block are
+    counted in its decompressed content, in a second pass.
+    """
+    lines = size = checksum = 0
+    compressed = codec_of(path) != 'none'
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            if not compressed:
+                lines += chunk.count(b'\n')
+            size += len(chunk)
+            checksum = zlib.crc32(chunk, checksum)
+    if compressed:
+        with open_compressed(path) as file:
+            lines = sum(chunk.count(b'\n') for chunk in iter(lambda: file.read(chunk_size), b''))
+    return lines, size, checksum
+
+def block_format(name: str) -> str:
+    """Return the format of a block file name, "raw" or "npy" (also when compressed), or '' for other files."""
+    base = strip_codec_suffix(name)
+    return base.rsplit('.', 1)[-1] if base.endswith(('.raw', '.npy')) and not is_temporary(name) else ''
+
+class BlockIndex:
+    """Persistent manifest of the 30-minute blocks written to an output directory.
+
+    Each block is stored with its row count, file size, CRC32 checksum and the .dat files
+    it was written from. Every update is a single SQLite transaction, so the manifest is
+    never left half-written. The default rollback journal is used because WAL does not work on
+    network file systems.
+    """
+
+    def __init__(self, output_directory: str, filename: str = INDEX_FILENAME):
+        self.output_directory = output_directory
+        self.path = os.path.join(output_directory, filename)
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        with self.connection:
+            # Workers open the index at the same time; the write lock makes the schema update one step
+            self.connection.execute("BEGIN IMMEDIATE")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS blocks ("
+                "name TEXT PRIMARY KEY, rows INTEGER NOT NULL, size INTEGER NOT NULL, sources TEXT NOT NULL DEFAULT '')"
+            )
+            # Manifests written before checksums were recorded get the column added
+            if 'checksum' not in {row[1] for row in self.connection.execute("PRAGMA table_info(blocks)")}:
+                self.connection.execute("ALTER TABLE blocks ADD COLUMN checksum INTEGER")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            # One row per block and channel; m2 is the sum of squared deviations, so appended rows can be merged
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS block_stats ("
+                "name TEXT NOT NULL, channel TEXT NOT NULL, count INTEGER NOT NULL, nans INTEGER NOT NULL, "
+                "mean REAL, m2 REAL NOT NULL, min REAL, max REAL, spikes INTEGER NOT NULL, "
+                "PRIMARY KEY (name, channel)) WITHOUT ROWID"
+            )
+        self.lists_all_blocks = self._load_lists_all_blocks()
+
+    def _load_lists_all_blocks(self) -> bool:
+        # An index started in a folder without blocks sees every block written after it, so a
+        # block it does not know cannot exist and needs no existence check on the (network) disk.
+        # This is decided once, when the index is created; concurrent creators keep the first answer.
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'lists_all_blocks'").fetchone()
+        if row is None:
+            has_blocks = any(block_format(name) for name in os.listdir(self.output_directory))
+            with self.connection:
+                self.connection.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('lists_all_blocks', ?)", (int(not has_blocks),))
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'lists_all_blocks'").fetchone()
+        return bool(row[0])
+
+    def set_lists_all_blocks(self, value: bool) -> None:
+        """Record whether every block file in the output directory has an entry in the index.
+
+        Args:
+            value: False once a block was found on disk that the index did not know, e.g.
+                one written by a run without the index.
+        """
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('lists_all_blocks', ?)", (int(value),))
+        self.lists_all_blocks = value
+
+    def get(self, name: str) -> Optional[Tuple[int, int]]:
+        """Return the (rows, size) recorded for a block, or None if it is unknown.
+
+        Args:
+            name: File name of the block, e.g. "2012-01-01_0030_speuld.raw".
+        """
+        return self.connection.execute("SELECT rows, size FROM blocks WHERE name = ?", (name,)).fetchone()
+
+    def checksum(self, name: str) -> Optional[int]:
+        """Return the CRC32 recorded for a block, or None if it is unknown."""
+        row = self.connection.execute("SELECT checksum FROM blocks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def sources(self, name: str) -> List[str]:
+        """Return the .dat files a block was written from."""
+        row = self.connection.execute("SELECT sources FROM blocks WHERE name = ?", (name,)).fetchone()
+        return [source for source in row[0].split(',') if source] if row else []
+
+    def record(self, name: str, rows: int, size: int, source: str = '', stats: Optional[BlockStats] = None, append: bool = False,
+               checksum: Optional[int] = None) -> None:
+        """Record the current row count and size of a block.
+
+        Args:
+            name: File name of the block.
+            rows: Number of lines in the block file.
+            size: Size of the block file in bytes.
+            source: .dat file (or comma-separated files) written into the block.
+            stats: Finished statistics of the rows that were written, stored with the block.
+            append: The rows were appended to the block, so the sources and statistics are
+                added to the stored ones instead of replacing them.
+            checksum: CRC32 of the block file.
+        """
+        with self.connection:
+            sources = self.sources(name) if append else []
+            sources.extend(part for part in source.split(',') if part and part not in sources)
+            self.connection.execute(
+                "INSERT OR REPLACE INTO blocks (name, rows, size, sources, checksum) VALUES (?, ?, ?, ?, ?)",
+                (name, rows, size, ','.join(sources), checksum)
+            )
+            if stats is not None:
+                stored = self.stats(name) if append else None
+                if stored is not None:
+                    stored.merge(stats)
+                    stats = stored
+                self.connection.execute("DELETE FROM block_stats WHERE name = ?", (name,))
+                self.connection.executemany(
+                    "INSERT INTO block_stats (name, channel, count, nans, mean, m2, min, max, spikes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(name,) + row for row in stats.rows()]
+                )
+
+    def stats(self, name: str) -> Optional[BlockStats]:
+        """Return the stored statistics of a block, or None if it has none."""
+        rows = self.connection.execute(
+            "SELECT channel, count, nans, mean, m2, min, max, spikes FROM block_stats WHERE name = ? ORDER BY channel", (name,)
+        ).fetchall()
+        return BlockStats.from_rows(rows) if rows else None
+
+    def stats_frame(self) -> 'pd.DataFrame':
+        """Return the statistics of all blocks, one row per block and channel.
+
+        Columns: name, channel, count (values that are not NAN), nans, mean, variance, min,
+        max, spikes and spike_rate.
+        """
+        import pandas as pd
+        return pd.read_sql_query(
+            "SELECT name, channel, count, nans, mean, CASE WHEN count > 1 THEN m2 / (count - 1) END AS variance, "
+            "min, max, spikes, CASE WHEN count > 0 THEN CAST(spikes AS REAL) / count END AS spike_rate "
+            "FROM block_stats ORDER BY name, channel", self.connection
+        )
+
+    def rebuild(self) -> List[str]:
+        """Rebuild the manifest from the .raw files on disk, compressed or not.
+
+        Every block is read once to count its lines and compute its checksum. Sources and
+        statistics of blocks that are still present are kept, entries of deleted blocks are
+        dropped, and temporary files left by killed runs are removed. Temporary files of
+        writers that may still be running (changed in the last STALE_TEMPORARY_SECONDS) are
+        ignored. Afterwards the index lists every block, unless the folder holds .npy blocks,
+        which are not rebuilt.
+
+        Returns:
+            Names of the blocks whose recorded row count, size or checksum did not match the disk.
+        """
+        mismatches = []
+        listing = os.listdir(self.output_directory)
+        names = sorted(f for f in listing if block_format(f) == 'raw')
+        entries = {}
+        for name in names:
+            path = os.path.join(self.output_directory, name)
+            entries[name] = scan_block(path)
+            recorded = self.connection.execute("SELECT rows, size, checksum FROM blocks WHERE name = ?", (name,)).fetchone()
+            if recorded is None or recorded[:2] != entries[name][:2] or recorded[2] not in (None, entries[name][2]):
+                mismatches.append(name)
+
+        with self.connection:
+            sources = {name: ','.join(self.sources(name)) for name in names}
+            self.connection.execute("DELETE FROM blocks")
+            self.connection.executemany(
+                "INSERT INTO blocks (name, rows, size, sources, checksum) VALUES (?, ?, ?, ?, ?)",
+                [(name, rows, size, sources[name], checksum) for name, (rows, size, checksum) in entries.items()]
+            )
+            self.connection.execute("DELETE FROM block_stats WHERE name NOT IN (SELECT name FROM blocks)")
+        stale = time.time() - STALE_TEMPORARY_SECONDS
+        for name in filter(is_temporary, listing):
+            path = os.path.join(self.output_directory, name)
+            try:
+                if os.path.getmtime(path) < stale:
+                    os.remove(path)
+            except FileNotFoundError:
+                # Moved into place by its writer in the meantime
+                pass
+        self.set_lists_all_blocks(not any(block_format(f) == 'npy' for f in listing))
+        return mismatches
+
+    def close(self) -> None:
+        self.connection.close()
+
+def verify(output_directory: str) -> int:
+    """Rebuild the block manifest of an output directory from disk and log the corrected entries.
+
+    Returns:
+        Exit status, 0 if the manifest matched the files on disk and 1 otherwise.
+    """
+    index = BlockIndex(output_directory)
+    try:
+        mismatches = index.rebuild()
+    finally:
+        index.close()
+
+    for name in mismatches:
+        logging.warning(f"Manifest entry of {name} did not match the file on disk.")
+    logging.info(f"Manifest rebuilt at {index.path} ({len(mismatches)} entries corrected).")
+    return 1 if mismatches else 0
+
+def main():
+    """Verify the block manifest of an output directory by rebuilding it from disk."""
+    parser = argparse.ArgumentParser(description="Rebuild and verify the block manifest of a 30-minute output directory.")
+    parser.add_argument('output_directory', help="Directory containing the .raw block files.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    return verify(args.output_directory)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+import numpy as np
+from typing import Optional, Sequence
+
+# Purpose: Data-quality statistics of the channels of a block, accumulated while the block is
+#          split, so QC needs no second read of the output: NAN count, min/max, mean and
+#          variance (Welford/Chan updates, so rows can arrive in any number of pieces) and the
+#          number of spikes.
+
+SPIKE_WINDOW_SECONDS = 300  # length of a spike-detection window, so spike rates compare across frequencies
+SPIKE_WINDOW = SPIKE_WINDOW_SECONDS * 20  # rows per spike-detection window at 20 Hz
+SPIKE_THRESHOLD = 3.5  # standard deviations from the window mean beyond which a value is a spike
+
+def combine_moments(count_a: np.ndarray, mean_a: np.ndarray, m2_a: np.ndarray,
+                    count_b: np.ndarray, mean_b: np.ndarray, m2_b: np.ndarray):
+    """Combine the count, mean and sum of squared deviations of two sets of values (Chan et al.).
+
+    Returns:
+        Tuple of the combined count, mean and sum of squared deviations. The mean of an
+        empty set is 0.
+    """
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = np.where(count > 0, count_b / count, 0.0)
+    mean = mean_a + delta * share
+    m2 = m2_a + m2_b + delta * delta * count_a * share
+    return count, mean, m2
+
+def spike_window(frequency: int) -> int:
+    """Return the rows per spike-detection window at a sampling frequency (samples per second)."""
+    return SPIKE_WINDOW_SECONDS * frequency
+
+class BlockStats:
+    """Running statistics of every channel of a block.
+
+    Rows are fed with update() in order, in pieces of any size. Spikes are counted in
+    consecutive windows of `spike_window` rows: a value is a spike if it lies more than
+    `spike_threshold` standard deviations from the mean of its window. Rows are held back
+    until a window is full, so the result does not depend on how the rows were split into
+    pieces; finish() processes the last, shorter window.
+
+    Example:
+        stats = BlockStats(['col2', 'col3'])
+        stats.update(values)  # array of shape (rows, 2), NaN for NAN
+        stats.finish()
+        stats.variance, stats.spike_rate
+    """
+
+    def __init__(self, channels: Sequence[str], spike_window: int = SPIKE_WINDOW, spike_threshold: float = SPIKE_THRESHOLD):
+        self.channels = list(channels)
+        self.spike_window = spike_window
+        self.spike_threshold = spike_threshold
+        width = len(self.channels)
+        self.count = np.zeros(width, dtype=np.int64)
+        self.nans = np.zeros(width, dtype=np.int64)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+        self.min = np.full(width, np.nan)
+        self.max = np.full(width, np.nan)
+        self.spikes = np.zeros(width, dtype=np.int64)
+        self._held = []
+        self._held_rows = 0
+
+    def update(self, values: np.ndarray) -> None:
+        """Add rows of shape (rows, channels), with NaN for missing values."""
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self._held.append(values)
+        self._held_rows += len(values)
+        if self._held_rows < self.spike_window:
+            return
+        values = np.concatenate(self._held) if len(self._held) > 1 else values
+        full = len(values) - len(values) % self.spike_window
+        self._add_windows(values[:full].reshape(-1, self.spike_window, len(self.channels)))
+        rest = values[full:]
+        self._held = [rest] if len(rest) else []
+        self._held_rows = len(rest)
+
+    def finish(self) -> 'BlockStats':
+        """Process the rows held back for an incomplete window. Returns the statistics."""
+        if self._held_rows:
+            values = np.concatenate(self._held)
+            self._add_windows(values.reshape(1, len(values), len(self.channels)))
+        self._held = []
+        self._held_rows = 0
+        return self
+
+    def _add_windows(self, windows: np.ndarray) -> None:
+        # windows has the shape (windows, rows, channels)
+        valid = ~np.isnan(windows)
+        counts = valid.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(counts > 0, np.where(valid, windows, 0.0).sum(axis=1) / counts, 0.0)
+            deviations = np.where(valid, windows - means[:, None, :], 0.0)
+            m2s = (deviations * deviations).sum(axis=1)
+            deviation_limits = self.spike_threshold * np.sqrt(np.where(counts > 1, m2s / (counts - 1), np.inf))
+        self.spikes += (np.abs(deviations) > deviation_limits[:, None, :]).sum(axis=(0, 1))
+
+        # Moments of all windows together, then combined with the earlier rows
+        count = counts.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, (counts * means).sum(axis=0) / count, 0.0)
+        m2 = m2s.sum(axis=0) + (counts * (means - mean) ** 2).sum(axis=0)
+        self.count, self.mean, self.m2 = combine_moments(self.count, self.mean, self.m2, count, mean, m2)
+
+        self.nans += (~valid).sum(axis=(0, 1))
+        flat = windows.reshape(-1, windows.shape[2])
+        self.min = np.fmin(self.min, np.fmin.reduce(flat, axis=0))
+        self.max = np.fmax(self.max, np.fmax.reduce(flat, axis=0))
+
+    def merge(self, other: 'BlockStats') -> None:
+        """Add the statistics of rows that were processed separately, e.g. an earlier part of the block."""
+        self.count, self.mean, self.m2 = combine_moments(self.count, self.mean, self.m2, other.count, other.mean, other.m2)
+        self.nans += other.nans
+        self.spikes += other.spikes
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+
+    @property
+    def variance(self) -> np.ndarray:
+        """Sample variance of every channel, NaN with fewer than two values."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def spike_rate(self) -> np.ndarray:
+        """Fraction of the values of every channel that are spikes."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.spikes / self.count, np.nan)
+
+    def rows(self) -> list:
+        """Return one (channel, count, nans, mean, m2, min, max, spikes) tuple per channel, None for undefined values."""
+        def number(value) -> Optional[float]:
+            return None if np.isnan(value) else float(value)
+        return [
+            (channel, int(self.count[i]), int(self.nans[i]), number(self.mean[i]) if self.count[i] else None,
+             float(self.m2[i]), number(self.min[i]), number(self.max[i]), int(self.spikes[i]))
+            for i, channel in enumerate(self.channels)
+        ]
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple], **options) -> 'BlockStats':
+        """Rebuild finished statistics from the tuples returned by rows()."""
+        stats = cls([row[0] for row in rows], **options)
+        for i, (_, count, nans, mean, m2, minimum, maximum, spikes) in enumerate(rows):
+            stats.count[i], stats.nans[i], stats.spikes[i] = count, nans, spikes
+            stats.mean[i] = mean if mean is not None else 0.0
+            stats.m2[i] = m2
+            stats.min[i] = minimum if minimum is not None else np.nan
+            stats.max[i] = maximum if maximum is not None else np.nan
+        return stats
@@ -0,0 +1,114 @@
+import os
+import numpy as np
+from datetime import datetime
+from .coverage import Coverage
+from .timestamps import parse_timestamp, parse_timestamps, NANOSECONDS_PER_SECOND
+from .checktime import FileInventory, INVENTORY_FILENAME
+
+# Purpose: This script reads the start and end times of the files from the inventory kept by
+#          checktime (or its older CSV file) and identifies the missing date ranges for the
+#          specified years. pandas and matplotlib are imported by the functions that need them,
+#          so importing the module is fast.
+
+NANOSECONDS_PER_DAY = 86400 * NANOSECONDS_PER_SECOND
+
+def load_file_times(period_start, period_end, site=None, inventory_path=INVENTORY_FILENAME, csv_path='file_times.csv'):
+    # Load the files overlapping the period from the inventory kept by checktime. Its start and
+    # end times are int64 nanoseconds already, so nothing is parsed
+    import pandas as pd
+    if os.path.exists(inventory_path):
+        inventory = FileInventory(inventory_path)
+        try:
+            return inventory.files(period_start, period_end, site=site)
+        finally:
+            inventory.close()
+    # Older runs of checktime only wrote the CSV file; drop files without data rows
+    df = pd.read_csv(csv_path).dropna(subset=['start_time', 'end_time'])
+    return pd.DataFrame({
+        'filename': df['filename'].to_numpy(),
+        'start_ns': parse_timestamps(df['start_time'].to_numpy()),
+        'end_ns': parse_timestamps(df['end_time'].to_numpy()),
+    }).sort_values(by='start_ns')
+
+def file_coverage(df_selected, frequency=20):
+    # Build the coverage of all files; the last sample of a file covers one sample period
+    return Coverage(
+        df_selected['start_ns'].to_numpy(),
+        df_selected['end_ns'].to_numpy(),
+        names=df_selected['filename'].to_numpy(),
+        sample_period=NANOSECONDS_PER_SECOND // frequency,
+    )
+
+def find_missing_ranges(coverage, period_start, period_end, frequency=20):
+    # Identify gaps between the covered ranges, ignoring gaps shorter than one sample.
+    # Returns a list of (start, end) timestamps
+    import pandas as pd
+    gap_starts, gap_ends = coverage.gaps(period_start, period_end, resolution=NANOSECONDS_PER_SECOND // frequency)
+    return list(zip(pd.to_datetime(gap_starts), pd.to_datetime(gap_ends)))
+
+def write_missing_ranges(missing_ranges, output_path='missing_ranges.txt'):
+    # Output the missing ranges
+    for start, end in missing_ranges:
+        print(f"Missing range: {start} to {end}")
+    # Write the missing ranges to a file
+    with open(output_path, 'w') as f:
+        for start, end in missing_ranges:
+            f.write(f"Missing range: {start} to {end}\n")
+
+def write_available_times(df_selected, output_path):
+    # The available times stay in the inventory (FileInventory.files); this also saves them as CSV
+    import pandas as pd
+    df_selected.assign(start_time=pd.to_datetime(df_selected['start_ns']),
+                       end_time=pd.to_datetime(df_selected['end_ns'])).to_csv(output_path)
+
+def plot_coverage(coverage, start_of_year, end_of_year, output_path='coverage_only.png'):
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    # Generate a date range covering each day from the start to the end of the specified years
+    all_days = pd.date_range(start=start_of_year, end=end_of_year, freq='D')
+
+    # Binary coverage: 1 for days with any data, NaN for missing (NaN helps in not plotting those values)
+    day_fraction = coverage.fraction(all_days.to_numpy().astype('datetime64[ns]').view('int64'), NANOSECONDS_PER_DAY)
+    coverage_series = pd.Series(np.where(day_fraction > 0, 1.0, np.nan), index=all_days)
+
+    # Plot only the covered periods
+    plt.figure(figsize=(12, 4))
+    plt.plot(coverage_series.index, coverage_series.values, color='blue', label='Covered', drawstyle='steps-post')
+
+    # Customize the plot
+    plt.title(f"Covered Date Ranges from {start_of_year.year} to {end_of_year.year}")
+    plt.xlabel("Date")
+    plt.ylabel("Coverage")
+    plt.ylim(0.9, 1.1)  # Adjust the y-axis to zoom in on the coverage line
+    plt.yticks([1], ["Covered"])
+    plt.grid(True)
+
+    # Save the plot
+    plt.savefig(output_path)
+    plt.close()
+
+def period_bounds(start_year, end_year):
+    # Return the first and last day of the years as datetimes and as nanoseconds since the epoch
+    start_of_year = datetime(start_year, 1, 1)
+    end_of_year = datetime(end_year, 12, 31)
+    return start_of_year, end_of_year, parse_timestamp(f"{start_of_year:%Y-%m-%d %H:%M:%S}"), parse_timestamp(f"{end_of_year:%Y-%m-%d %H:%M:%S}")
+
+def main():
+    # Define the years you are interested in
+    start_year = 2010
+    end_year = 2018
+    site = None  # e.g. 'speuld' to check one site of a shared inventory
+    frequency = 20  # samples per second
+    available_times_path = None  # e.g. 'available_times.csv'
+
+    start_of_year, end_of_year, period_start, period_end = period_bounds(start_year, end_year)
+    df_selected = load_file_times(period_start, period_end, site=site)
+    coverage = file_coverage(df_selected, frequency)
+    write_missing_ranges(find_missing_ranges(coverage, period_start, period_end, frequency))
+    if available_times_path is not None:
+        write_available_times(df_selected, available_times_path)
+    plot_coverage(coverage, start_of_year, end_of_year)
+
+if __name__ == "__main__":
+    main()
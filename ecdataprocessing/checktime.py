@@ -0,0 +1,365 @@
+import os
+import re
+import sqlite3
+import zipfile
+import numpy as np
+from .toa5reader import summarize_file, summarize_stream
+from .concurrent_io import ConcurrentIO
+from .compressed_io import is_dat_file
+from .coverage import Coverage
+from .timestamps import parse_timestamp, parse_timestamps, floor_to_block, NANOSECONDS_PER_SECOND, NANOSECONDS_PER_MINUTE
+
+# pandas is imported by the functions that return DataFrames, so the inventory starts fast without it
+
+INVENTORY_FILENAME = 'file_inventory.sqlite'
+# Station name in "TOA5_<station>.<table>_<date>.dat"
+SITE_PATTERN = re.compile(r'^TOA5_([^.]+)\.')
+
+def get_start_and_end_times(filename):
+    # The reader parses the header once and reads only the first and last data line
+    return summarize_file(filename)[:2]
+
+def probe_file(file_path):
+    # Return the size, mtime, start time, end time and row count of a .dat file
+    stat = os.stat(file_path)
+    return (stat.st_size, stat.st_mtime_ns) + summarize_file(file_path)
+
+def member_path(zip_path, member_name):
+    # Inventory path of a zip member, "<archive>.zip/<member>"
+    return f"{zip_path}/{member_name}"
+
+def archive_of(path):
+    # Return the archive of a zip member path, or the path itself for other files
+    head, separator, _ = path.partition('.zip/')
+    return head + '.zip' if separator else path
+
+def probe_archive(zip_path):
+    # Return {member path: (size, mtime, start time, end time, row count)} of the TOA5 .dat members of
+    # a zip archive, read without extracting them. Members carry the size and mtime of the archive
+    stat = os.stat(zip_path)
+    members = {}
+    with zipfile.ZipFile(zip_path) as archive:
+        for member in sorted(archive.infolist(), key=lambda m: m.filename):
+            if member.is_dir() or not member.filename.endswith('.dat'):
+                continue
+            with archive.open(member) as stream:
+                # Skip members that are not TOA5 text files, e.g. TOB binaries
+                if stream.peek(6).startswith(b'"TOA5"'):
+                    members[member_path(zip_path, member.filename)] = (stat.st_size, stat.st_mtime_ns) + summarize_stream(stream)
+    return members
+
+def probe(file_path):
+    # Probe a .dat file, or every member of a zip archive
+    return probe_archive(file_path) if file_path.endswith('.zip') else probe_file(file_path)
+
+def site_of(file_path):
+    # Return the station name of a TOA5 file name, or '' if the name has another layout
+    match = SITE_PATTERN.match(os.path.basename(file_path))
+    return match.group(1) if match else ''
+
+def year_bounds(year):
+    # Return the start of a year and of the next year in nanoseconds since the epoch
+    return parse_timestamp(f"{year}-01-01 00:00:00"), parse_timestamp(f"{year + 1}-01-01 00:00:00")
+
+def time_filters(start, end, site, years, start_column, end_column):
+    # Return the SQL conditions and parameters selecting rows that overlap [start, end), a site and any of the years
+    conditions, parameters = [], []
+    if site is not None:
+        conditions.append("site = ?")
+        parameters.append(site)
+    if start is not None:
+        conditions.append(f"{end_column} >= ?")
+        parameters.append(int(start))
+    if end is not None:
+        conditions.append(f"{start_column} < ?")
+        parameters.append(int(end))
+    if years is not None:
+        overlaps = []
+        for year in years:
+            year_start, year_end = year_bounds(year)
+            overlaps.append(f"({end_column} >= ? AND {start_column} < ?)")
+            parameters.extend((year_start, year_end))
+        conditions.append('(' + (' OR '.join(overlaps) or '0') + ')')
+    return ''.join(f" AND {condition}" for condition in conditions), parameters
+
+class FileInventory:
+    """Persistent cache of the start/end times and row counts of .dat files.
+
+    Entries are keyed on the file path and remember the size and mtime the file had when it
+    was probed, so only new or changed files have to be read again. Start and end times are
+    kept as text and as indexed int64 nanoseconds since the epoch, so range lookups and
+    coverage reports need no parsing. The blocks table holds the covered fraction of every
+    block, per site and block length, as computed by update_blocks().
+
+    Example:
+        inventory = FileInventory()
+        frame = inventory.files(years=[2015], site='speuld')
+        coverage = inventory.coverage(site='speuld', sample_period=NANOSECONDS_PER_SECOND // 20)
+        missing = inventory.blocks(years=[2015], site='speuld', below=1.0)
+    """
+
+    def __init__(self, path=INVENTORY_FILENAME):
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=60)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, filename TEXT NOT NULL, size INTEGER NOT NULL, mtime INTEGER NOT NULL, "
+                "start_time TEXT, end_time TEXT, rows INTEGER, site TEXT NOT NULL DEFAULT '', start_ns INTEGER, end_ns INTEGER)"
+            )
+            # Inventories written before the int64 columns existed get them added and filled in
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(files)")}
+            for column, declaration in (('site', "TEXT NOT NULL DEFAULT ''"), ('start_ns', 'INTEGER'), ('end_ns', 'INTEGER')):
+                if column not in columns:
+                    self.connection.execute(f"ALTER TABLE files ADD COLUMN {column} {declaration}")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS files_site_start ON files (site, start_ns)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS files_end ON files (end_ns)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS blocks ("
+                "site TEXT NOT NULL, block_minutes INTEGER NOT NULL, start_ns INTEGER NOT NULL, covered REAL NOT NULL, "
+                "PRIMARY KEY (site, block_minutes, start_ns)) WITHOUT ROWID"
+            )
+        self._fill_int64_times()
+
+    def _fill_int64_times(self):
+        # Parse the text times of entries that have no int64 times yet, in bulk
+        rows = self.connection.execute(
+            "SELECT path, start_time, end_time FROM files WHERE start_ns IS NULL AND start_time IS NOT NULL AND end_time IS NOT NULL"
+        ).fetchall()
+        if not rows:
+            return
+        paths, starts, ends = zip(*rows)
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE files SET start_ns = ?, end_ns = ?, site = ? WHERE path = ?",
+                [(int(start), int(end), site_of(path), path)
+                 for path, start, end in zip(paths, parse_timestamps(list(starts)), parse_timestamps(list(ends)))]
+            )
+
+    def cached(self):
+        # Return {path: (size, mtime)} of all cached files
+        return {path: (size, mtime) for path, size, mtime in self.connection.execute("SELECT path, size, mtime FROM files")}
+
+    def record(self, file_path, size, mtime, start_time, end_time, rows, site=None):
+        # Files without data rows have no start and end time
+        start_ns = parse_timestamp(start_time) if start_time is not None else None
+        end_ns = parse_timestamp(end_time) if end_time is not None else None
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO files (path, filename, size, mtime, start_time, end_time, rows, site, start_ns, end_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (file_path, os.path.basename(file_path), size, mtime, start_time, end_time, rows,
+                 site_of(file_path) if site is None else site, start_ns, end_ns)
+            )
+
+    def forget_archive(self, zip_path):
+        # Drop the entries of the members of a zip archive
+        prefix = member_path(zip_path, '')
+        with self.connection:
+            self.connection.execute("DELETE FROM files WHERE substr(path, 1, ?) = ?", (len(prefix), prefix))
+
+    def forget(self, file_paths):
+        # Drop the entries of files, and of the members of archives, that are gone
+        for file_path in file_paths:
+            if file_path.endswith('.zip'):
+                self.forget_archive(file_path)
+        with self.connection:
+            self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in file_paths])
+
+    def prune(self, file_paths, root=None):
+        # Drop the entries of files under root that are no longer present, and of the members of removed
+        # archives. Without a root only the folders of file_paths are pruned, so an inventory shared by
+        # several directory trees keeps the entries of the other trees
+        present = set(file_paths)
+        if root is not None:
+            folders = (os.path.join(root, ''),)
+        else:
+            folders = tuple({os.path.join(os.path.dirname(path), '') for path in present})
+        stale = {path for path in self.cached() if path.startswith(folders) and archive_of(path) not in present}
+        with self.connection:
+            self.connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in stale])
+
+    def update(self, file_paths, workers=16, site=None, root=None):
+        # Stat every file and probe the new or changed ones concurrently; the reads are latency bound.
+        # Entries of files that are gone are pruned under root (see prune), e.g. the directory listed.
+        # Each probe is recorded as soon as it finishes, so an interrupted update keeps its progress.
+        # .dat files may be gzip or zstd compressed, and zip archives are read member by member;
+        # an archive counts as changed if any of its member entries has another size or mtime.
+        # A file that is removed after it was listed, e.g. moved by a logger sync, is treated as removed
+        cached = self.cached()
+        members = {}
+        for path in cached:
+            if archive_of(path) != path:
+                members.setdefault(archive_of(path), []).append(path)
+        gone = set()
+        with ConcurrentIO(limit=workers) as fs:
+            stats = {}
+            for file_path, stat in zip(file_paths, fs.map(os.stat, file_paths, return_exceptions=True)):
+                if isinstance(stat, FileNotFoundError):
+                    gone.add(file_path)
+                elif isinstance(stat, Exception):
+                    raise stat
+                else:
+                    stats[file_path] = (stat.st_size, stat.st_mtime_ns)
+
+            def unchanged(file_path):
+                entries = members.get(file_path, []) if file_path.endswith('.zip') else [file_path]
+                return bool(entries) and all(cached.get(entry) == stats[file_path] for entry in entries)
+
+            changed = [file_path for file_path in stats if not unchanged(file_path)]
+
+            def record(file_path, result, error):
+                if isinstance(error, FileNotFoundError):
+                    gone.add(file_path)
+                elif error is not None:
+                    print(f"Error processing {os.path.basename(file_path)}: {error}")
+                elif file_path.endswith('.zip'):
+                    self.forget_archive(file_path)
+                    for path, entry in result.items():
+                        self.record(path, *entry, site=site)
+                else:
+                    self.record(file_path, *result, site=site)
+
+            fs.each(probe, changed, record)
+        self.forget(gone)
+        self.prune([file_path for file_path in file_paths if file_path not in gone], root)
+        return len(changed) - len(gone & set(changed))
+
+    def files(self, start=None, end=None, site=None, years=None):
+        # Return the files with data overlapping [start, end) (nanoseconds), a site and any of the
+        # years, sorted by start time. start_ns and end_ns are int64 nanoseconds since the epoch
+        import pandas as pd
+        where, parameters = time_filters(start, end, site, years, 'start_ns', 'end_ns')
+        return pd.read_sql_query(
+            f"SELECT filename, path, site, start_ns, end_ns, rows FROM files WHERE start_ns IS NOT NULL{where} ORDER BY start_ns, path",
+            self.connection, params=parameters, dtype={'start_ns': 'int64', 'end_ns': 'int64'}
+        )
+
+    def coverage(self, start=None, end=None, site=None, years=None, sample_period=0):
+        # Return the Coverage of the selected files; see files() for the filters
+        frame = self.files(start, end, site, years)
+        return Coverage(frame['start_ns'].to_numpy(), frame['end_ns'].to_numpy(), names=frame['filename'].to_numpy(),
+                        sample_period=sample_period)
+
+    def sites(self):
+        return [site for site, in self.connection.execute("SELECT DISTINCT site FROM files ORDER BY site")]
+
+    def update_blocks(self, block_minutes=30, frequency=20, site=None):
+        # Store the covered fraction of every block from the first to the last file of each site
+        # (or of one site). Returns the number of blocks stored
+        sample_period = NANOSECONDS_PER_SECOND // frequency
+        block_length = block_minutes * NANOSECONDS_PER_MINUTE
+        stored = 0
+        for name in ([site] if site is not None else self.sites()):
+            coverage = self.coverage(site=name, sample_period=sample_period)
+            with self.connection:
+                self.connection.execute("DELETE FROM blocks WHERE site = ? AND block_minutes = ?", (name, block_minutes))
+                if len(coverage.merged_starts) == 0:
+                    continue
+                block_starts = np.arange(floor_to_block(int(coverage.merged_starts[0]), block_minutes),
+                                         int(coverage.merged_ends[-1]), block_length, dtype=np.int64)
+                fractions = coverage.fraction(block_starts, block_length)
+                self.connection.executemany(
+                    "INSERT INTO blocks (site, block_minutes, start_ns, covered) VALUES (?, ?, ?, ?)",
+                    zip([name] * len(block_starts), [block_minutes] * len(block_starts), block_starts.tolist(), fractions.tolist())
+                )
+            stored += len(block_starts)
+        return stored
+
+    def blocks(self, start=None, end=None, site=None, years=None, block_minutes=30, below=None):
+        # Return the blocks starting in [start, end), of a site and any of the years, with their covered
+        # fraction; only those covered less than `below` if it is given, e.g. 1.0 for incomplete blocks
+        import pandas as pd
+        block_length = block_minutes * NANOSECONDS_PER_MINUTE
+        where, parameters = time_filters(start, end, site, years, 'start_ns', 'start_ns')
+        if below is not None:
+            where += " AND covered < ?"
+            parameters.append(below)
+        frame = pd.read_sql_query(
+            f"SELECT site, start_ns, covered FROM blocks WHERE block_minutes = ?{where} ORDER BY site, start_ns",
+            self.connection, params=[block_minutes] + parameters, dtype={'start_ns': 'int64', 'covered': 'float64'}
+        )
+        frame['end_ns'] = frame['start_ns'] + block_length
+        return frame
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.read_sql_query("SELECT filename, start_time, end_time, rows, path FROM files ORDER BY path", self.connection)
+
+    def close(self):
+        self.connection.close()
+
+def select_dat_files(directory_path, filenames):
+    # .dat files, also gzip or zstd compressed, and zip archives of them.
+    # Skip files with '103320000' in the filename , this is corrupted file.
+    return [
+        os.path.join(directory_path, filename)
+        for filename in sorted(filenames)
+        if (is_dat_file(filename) or filename.endswith('.zip')) and '103320000' not in filename
+    ]
+
+def list_dat_files(directory_path):
+    return select_dat_files(directory_path, os.listdir(directory_path))
+
+def process_files_in_directory(directory_path):
+    # Create a list to store file data
+    file_data = []
+
+    # Iterate over all .dat files in the directory
+    for file_path in list_dat_files(directory_path):
+        filename = os.path.basename(file_path)
+        try:
+            if file_path.endswith('.zip'):
+                # One entry per member of an archive
+                for path, (_, _, start_time, end_time, _) in probe_archive(file_path).items():
+                    file_data.append({'filename': os.path.basename(path), 'start_time': start_time, 'end_time': end_time})
+                continue
+            # Get start and end times for each file
+            start_time, end_time = get_start_and_end_times(file_path)
+            # Append data to the list
+            file_data.append({'filename': filename, 'start_time': start_time, 'end_time': end_time})
+        except Exception as e:
+            print(f"Error processing {filename}: {e}")
+
+    # Create a DataFrame from the list of file data
+    import pandas as pd
+    df = pd.DataFrame(file_data)
+
+    return df
+
+def update_inventory(directory_path, inventory_path=INVENTORY_FILENAME, workers=16, frequency=20, block_minutes=30, csv_output_path=None):
+    # Update the inventory with the .dat files of every <year>/TOA5 folder of directory_path.
+    # Returns the number of new or changed files, the number of files and the number of blocks stored
+
+    # Collect the .dat files of all year folders at once; the folders are listed concurrently
+    # and a missing TOA5 folder lists as empty, so no isdir round trips are needed
+    with ConcurrentIO(limit=workers) as fs:
+        toa5_folders = [os.path.join(directory_path, d, 'TOA5') for d in sorted(os.listdir(directory_path))]
+        dat_files = []
+        for subdirectory_path, filenames in fs.listdir_many(toa5_folders).items():
+            dat_files.extend(select_dat_files(subdirectory_path, filenames))
+
+    # Only new or changed files are read again
+    inventory = FileInventory(inventory_path)
+    try:
+        changed = inventory.update(dat_files, workers=workers, root=directory_path)
+        blocks = inventory.update_blocks(block_minutes=block_minutes, frequency=frequency)
+        if csv_output_path is not None:
+            inventory.to_dataframe()[['filename', 'start_time', 'end_time']].to_csv(csv_output_path, index=False)
+            print(f"Data has been written to {csv_output_path}")
+    finally:
+        inventory.close()
+    return changed, len(dat_files), blocks
+
+def main():
+    directory_path = '/Volumes/Group/speuldpro_praj/'
+    workers = 16  # concurrent head/tail probes on the mounted share
+    frequency = 20  # samples per second
+    block_minutes = 30  # block length of the block-level coverage
+    csv_output_path = None  # e.g. 'file_times.csv' for tools that still read the CSV file
+
+    changed, files, blocks = update_inventory(directory_path, INVENTORY_FILENAME, workers, frequency, block_minutes, csv_output_path)
+    print(f"Inventory updated: {changed} of {files} files were new or changed, coverage of {blocks} blocks stored in {INVENTORY_FILENAME}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import os
+import sys
+import logging
+import argparse
+from typing import List, Optional
+
+# Purpose: One command line for the processing steps: unzip, inventory, split, batch, verify,
+#          gaps and plot. Every subcommand imports its module only when it runs, so the command
+#          starts fast, and main() takes an argument list, so a scheduler can run jobs in-process
+#          or from a long-lived worker instead of starting a new interpreter per job.
+#
+# Usage:   ecdataprocessing unzip SOURCE DESTINATION --years 2010 2011 2012
+#          ecdataprocessing inventory /Volumes/Group/speuldpro_praj/
+#          ecdataprocessing split FILE_LOCATION OUTPUT_DIRECTORY --years 2012 2013 --workers 8
+#          ecdataprocessing batch sites.json --workers 8
+#          ecdataprocessing verify OUTPUT_DIRECTORY
+#          ecdataprocessing gaps --start-year 2010 --end-year 2018
+#          ecdataprocessing plot --start-year 2010 --end-year 2018 --output coverage_only.png
+#
+#          The ecdataprocessing command is installed with the package (pip install .);
+#          python -m ecdataprocessing runs the same commands from a checkout.
+#          From Python: ecdataprocessing.main(['inventory', '/Volumes/Group/speuldpro_praj/'])
+
+CODECS = ['none', 'gzip', 'zstd']
+
+def run_unzip(args: argparse.Namespace) -> int:
+    from .unzipfiles import unzip_all_files
+    from .instrumentation import Metrics, set_metrics
+    metrics = Metrics()
+    set_metrics(metrics)
+    unzip_all_files(args.source, args.destination, years=args.years, turb_years=args.turb_years, workers=args.workers)
+    print(metrics.summary())
+    if args.metrics is not None:
+        metrics.export(args.metrics)
+    return 0
+
+def run_inventory(args: argparse.Namespace) -> int:
+    from .checktime import update_inventory
+    changed, files, blocks = update_inventory(args.directory, args.inventory, args.workers, args.frequency,
+                                              args.block_minutes, args.csv)
+    print(f"Inventory updated: {changed} of {files} files were new or changed, coverage of {blocks} blocks stored in {args.inventory}")
+    return 0
+
+def run_split(args: argparse.Namespace) -> int:
+    from .split_30mins_file import split_site, setup_logging, report_metrics
+    from .instrumentation import Metrics, set_metrics, configure_profiling
+    from .compressed_io import configure_compression
+    os.makedirs(args.output_directory, exist_ok=True)
+    # Every run logs to its own file; a long-lived caller keeps its console handler and level
+    log_handler = setup_logging(args.log or os.path.join(args.output_directory, f'processing_{args.years[0]}_{args.years[-1]}.log'))
+    try:
+        set_metrics(Metrics())
+        configure_profiling(args.profile, os.path.join(args.output_directory, 'profiles'))
+        configure_compression(args.compression, args.compression_level, args.compression_threads)
+        files = split_site(args.file_location, args.output_directory, args.years, args.site, args.frequency, args.block_minutes,
+                           args.mode, args.workers, not args.no_index, args.format, args.zip_location, args.turb_years)
+        if not files:
+            return 1
+        report_metrics(args.metrics)
+        return 0
+    finally:
+        logging.getLogger().removeHandler(log_handler)
+        log_handler.close()
+
+def run_batch(args: argparse.Namespace) -> int:
+    from .batch_split import run_config
+    from .split_30mins_file import setup_logging
+    from .instrumentation import Metrics, set_metrics, configure_profiling
+    from .compressed_io import configure_compression
+    log_handler = setup_logging(args.log)
+    try:
+        set_metrics(Metrics())
+        configure_profiling(args.profile, 'profiles')
+        configure_compression(args.compression, args.compression_level, args.compression_threads)
+        return run_config(args.config, args.workers, args.metrics)
+    finally:
+        logging.getLogger().removeHandler(log_handler)
+        log_handler.close()
+
+def run_verify(args: argparse.Namespace) -> int:
+    from .blockindex import verify
+    if not os.path.isdir(args.output_directory):
+        print(f"No output directory {args.output_directory}", file=sys.stderr)
+        return 1
+    status = verify(args.output_directory)
+    print(f"Block index of {args.output_directory} {'corrected' if status else 'verified'}")
+    return status
+
+def load_coverage(args: argparse.Namespace):
+    # Return the first and last day of the years, the selected files and their coverage
+    from .checkmissingtimes import period_bounds, load_file_times, file_coverage
+    start_of_year, end_of_year, period_start, period_end = period_bounds(args.start_year, args.end_year)
+    files = load_file_times(period_start, period_end, site=args.site, inventory_path=args.inventory, csv_path=args.csv)
+    return (start_of_year, end_of_year, period_start, period_end), files, file_coverage(files, args.frequency)
+
+def run_gaps(args: argparse.Namespace) -> int:
+    from .checkmissingtimes import find_missing_ranges, write_missing_ranges, write_available_times
+    (_, _, period_start, period_end), files, coverage = load_coverage(args)
+    write_missing_ranges(find_missing_ranges(coverage, period_start, period_end, args.frequency), args.output)
+    if args.available_times is not None:
+        write_available_times(files, args.available_times)
+    return 0
+
+def run_plot(args: argparse.Namespace) -> int:
+    from .checkmissingtimes import plot_coverage
+    (start_of_year, end_of_year, _, _), _, coverage = load_coverage(args)
+    plot_coverage(coverage, start_of_year, end_of_year, args.output)
+    print(f"Coverage plot written to {args.output}")
+    return 0
+
+def add_period_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--inventory', default='file_inventory.sqlite', help="inventory written by the inventory command")
+    parser.add_argument('--csv', default='file_times.csv', help="file times of older runs, read if there is no inventory")
+    parser.add_argument('--start-year', type=int, default=2010)
+    parser.add_argument('--end-year', type=int, default=2018)
+    parser.add_argument('--site', default=None, help="check one site of a shared inventory")
+    parser.add_argument('--frequency', type=int, default=20, help="samples per second")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='ecdataprocessing', description="Process eddy-covariance TOA5 data.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    unzip = commands.add_parser('unzip', help="extract the zip archives of the raw data")
+    unzip.add_argument('source', help="raw zip folder with a folder per year")
+    unzip.add_argument('destination', help="base folder of the extracted <year>/TOB folders")
+    unzip.add_argument('--years', type=int, nargs='+', default=list(range(2010, 2013)))
+    unzip.add_argument('--turb-years', type=int, nargs='*', default=list(range(2014, 2020)),
+                       help="years whose zip files are inside a 'turb' directory")
+    unzip.add_argument('--workers', type=int, default=8, help="archives extracted concurrently")
+    unzip.add_argument('--metrics', default=None, help="export the run metrics (.json, or Prometheus text otherwise)")
+    unzip.set_defaults(run=run_unzip)
+
+    inventory = commands.add_parser('inventory', help="update the inventory of file start/end times and block coverage")
+    inventory.add_argument('directory', help="folder with a <year>/TOA5 folder of .dat files per year")
+    inventory.add_argument('--inventory', default='file_inventory.sqlite', help="SQLite inventory file")
+    inventory.add_argument('--workers', type=int, default=16, help="concurrent probes on the mounted share")
+    inventory.add_argument('--frequency', type=int, default=20, help="samples per second")
+    inventory.add_argument('--block-minutes', type=int, default=30, help="block length of the block-level coverage")
+    inventory.add_argument('--csv', default=None, help="also write file_times.csv for tools that still read it")
+    inventory.set_defaults(run=run_inventory)
+
+    split = commands.add_parser('split', help="split the .dat files of a site into fixed-length blocks")
+    split.add_argument('file_location', help="folder with a <year>/TOA5 folder of .dat files per year")
+    split.add_argument('output_directory', help="folder of the block files")
+    split.add_argument('--years', type=int, nargs='+', required=True)
+    split.add_argument('--site', default='speuld', help="site identifier in the block file names")
+    split.add_argument('--frequency', type=int, default=20, help="samples per second")
+    split.add_argument('--block-minutes', type=int, default=30, help="block length, any divisor of 60")
+    split.add_argument('--mode', default='vectorized', choices=['vectorized', 'streaming', 'line_count'])
+    split.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes of the vectorized mode")
+    split.add_argument('--no-index', action='store_true', help="do not keep a block manifest")
+    split.add_argument('--format', default='raw', choices=['raw', 'npy'], help="block format (npy in the vectorized mode only)")
+    split.add_argument('--zip-location', default=None, help="split the zip archives of this folder without extracting them")
+    split.add_argument('--turb-years', type=int, nargs='*', default=list(range(2014, 2020)),
+                       help="years whose zip files are inside a 'turb' directory")
+    split.add_argument('--log', default=None, help="log file (default: processing_<years>.log in the output directory)")
+    split.add_argument('--metrics', default=None, help="export the run metrics (.json, or Prometheus text otherwise)")
+    split.add_argument('--profile', default=None, help="run files matching this glob under cProfile and tracemalloc")
+    split.add_argument('--compression', choices=CODECS, default='none', help="codec of the block files")
+    split.add_argument('--compression-level', type=int, default=None, help="compression level (default: the codec's default)")
+    split.add_argument('--compression-threads', type=int, default=0, help="compression threads per writer, -1 for one per core")
+    split.set_defaults(run=run_split)
+
+    batch = commands.add_parser('batch', help="split several sites, or block settings, with one pool of workers")
+    batch.add_argument('config', help="JSON file with the site settings, see batch_split.py")
+    batch.add_argument('--workers', type=int, default=None, help="worker processes (default: config value or CPU count)")
+    batch.add_argument('--log', default='batch_split.log', help="log file")
+    batch.add_argument('--metrics', default=None, help="export the run metrics (.json, or Prometheus text otherwise)")
+    batch.add_argument('--profile', default=None, help="run files matching this glob under cProfile and tracemalloc")
+    batch.add_argument('--compression', choices=CODECS, default='none', help="codec of the block files of all sites")
+    batch.add_argument('--compression-level', type=int, default=None, help="compression level (default: the codec's default)")
+    batch.add_argument('--compression-threads', type=int, default=0, help="compression threads per writer, -1 for one per core")
+    batch.set_defaults(run=run_batch)
+
+    verify = commands.add_parser('verify', help="rebuild the block index of an output directory from the files on disk")
+    verify.add_argument('output_directory', help="folder of the block files")
+    verify.set_defaults(run=run_verify)
+
+    gaps = commands.add_parser('gaps', help="list the missing time ranges of the inventoried files")
+    add_period_arguments(gaps)
+    gaps.add_argument('--output', default='missing_ranges.txt', help="file receiving the missing ranges")
+    gaps.add_argument('--available-times', default=None, help="also save the selected files as CSV")
+    gaps.set_defaults(run=run_gaps)
+
+    plot = commands.add_parser('plot', help="plot the days covered by the inventoried files")
+    add_period_arguments(plot)
+    plot.add_argument('--output', default='coverage_only.png', help="image file of the plot")
+    plot.set_defaults(run=run_plot)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run one subcommand.
+
+    Args:
+        argv: Command line arguments without the program name; defaults to sys.argv[1:].
+
+    Returns:
+        Exit status, 0 on success.
+    """
+    args = build_parser().parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import io
+import os
+import gzip
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, NamedTuple, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip and zip need only the standard library
+    zstandard = None
+
+# Purpose: Read .dat input and block files through gzip or zstd transparently, and compress
+#          block output with a configurable codec and level. Compression can run on several
+#          threads (zstd natively, gzip as independently compressed members), so compressing
+#          does not slow the splitter down on multi-core nodes.
+
+# File name suffix of every codec; a compressed file is named <name><suffix>, e.g. "x.raw.zst"
+CODEC_SUFFIXES = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+# Suffixes of the TOA5 files the splitter and the inventory read; .zip archives are read member by member
+DAT_SUFFIXES = ('.dat', '.dat.gz', '.dat.zst')
+COMPRESSION_CHUNK = 256 * 1024  # bytes compressed at a time by a gzip thread, a few chunks per block
+READ_CHUNK = 1024 * 1024
+
+class Compression(NamedTuple):
+    """Compression of the block output: codec ("none", "gzip" or "zstd"), level (None for the
+    codec's default) and compression threads (0 to compress in the writing thread, -1 for one per core)."""
+    codec: str = 'none'
+    level: Optional[int] = None
+    threads: int = 0
+
+_compression = Compression()
+_executors: Dict[Tuple[int, int], ThreadPoolExecutor] = {}
+
+def require_zstandard():
+    """Return the zstandard module, or raise an ImportError that says how to install it."""
+    if zstandard is None:
+        raise ImportError("zstd compression needs the zstandard package: pip install zstandard")
+    return zstandard
+
+def configure_compression(codec: str = 'none', level: Optional[int] = None, threads: int = 0) -> None:
+    """Set the compression of the block output of this process.
+
+    Args:
+        codec: "none", "gzip" or "zstd".
+        level: Compression level, None for the codec's default (gzip 6, zstd 3).
+        threads: Compression threads per block writer; 0 compresses in the writing thread, -1
+            uses one thread per core.
+    """
+    global _compression
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if codec == 'zstd':
+        require_zstandard()
+    _compression = Compression(codec, level, threads)
+
+def get_compression() -> Compression:
+    """Return the compression settings, e.g. to pass them on to worker processes."""
+    return _compression
+
+def codec_suffix() -> str:
+    """Return the file name suffix of the configured codec, '' without compression."""
+    return CODEC_SUFFIXES[_compression.codec]
+
+def codec_of(path: str) -> str:
+    """Return the codec of a file from its name: "gzip" for .gz, "zstd" for .zst, otherwise "none"."""
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if suffix and path.endswith(suffix):
+            return codec
+    return 'none'
+
+def strip_codec_suffix(name: str) -> str:
+    """Return a file name without its codec suffix, e.g. "x.raw" for "x.raw.zst"."""
+    return name[:len(name) - len(CODEC_SUFFIXES[codec_of(name)])]
+
+def is_dat_file(name: str) -> bool:
+    """Return True for a TOA5 .dat file name, compressed or not."""
+    return name.endswith(DAT_SUFFIXES)
+
+def open_compressed(path: str, mode: str = 'rb'):
+    """Open a file for reading, decompressing it if its name ends in .gz or .zst.
+
+    Args:
+        path: Path of the file.
+        mode: "rb" for a binary stream, "r" or "rt" for text.
+    """
+    codec = codec_of(path)
+    if codec == 'gzip':
+        return gzip.open(path, mode if 'b' in mode else 'rt')
+    if codec == 'zstd':
+        reader = require_zstandard().ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+        stream = io.BufferedReader(reader, READ_CHUNK)
+        return stream if 'b' in mode else io.TextIOWrapper(stream)
+    return open(path, mode)
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """Return the decompressed content of a file read as bytes."""
+    if codec == 'gzip':
+        return gzip.decompress(data)
+    if codec == 'zstd':
+        reader = require_zstandard().ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True)
+        return b''.join(iter(lambda: reader.read(READ_CHUNK), b''))
+    return data
+
+def _executor(threads: int) -> ThreadPoolExecutor:
+    # One pool per process and thread count, shared by all writers; keyed on the pid because
+    # worker processes are forked and must not use the parent's threads
+    key = (os.getpid(), threads)
+    if key not in _executors:
+        _executors[key] = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='compress')
+    return _executors[key]
+
+def _gzip_member(data: bytes, level: int) -> bytes:
+    # zlib releases the GIL while it compresses, so members are compressed in parallel
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+class Compressor:
+    """Incremental compressor of one file.
+
+    With threads, zstd compresses with its own worker threads. gzip input is cut into chunks
+    of `chunk_size` bytes that are compressed in parallel as separate gzip members; members
+    concatenate into a valid gzip file, which gzip and zcat read as one stream.
+
+    Example:
+        compressor = Compressor('gzip', level=6, threads=4)
+        file.write(compressor.compress(data))
+        file.write(compressor.flush())
+    """
+
+    def __init__(self, codec: str, level: Optional[int] = None, threads: int = 0, chunk_size: int = COMPRESSION_CHUNK):
+        if codec not in DEFAULT_LEVELS:
+            raise ValueError(f"Unknown compression codec: {codec}")
+        self.level = DEFAULT_LEVELS[codec] if level is None else level
+        self.threads = (os.cpu_count() or 1) if threads < 0 else threads
+        self.chunk_size = chunk_size
+        self._buffer = bytearray()
+        self._members = deque()
+        if codec == 'zstd':
+            self._stream = require_zstandard().ZstdCompressor(level=self.level, threads=self.threads).compressobj()
+            self.threads = 0
+        else:
+            self._stream = None if self.threads else zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress data; returns the compressed bytes that are ready, possibly none."""
+        if self._stream is not None:
+            return self._stream.compress(data)
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            self._submit(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+        # Hand out finished members in order, and wait once `threads` members are in flight
+        output = []
+        while self._members and (len(self._members) > self.threads or self._members[0].done()):
+            output.append(self._members.popleft().result())
+        return b''.join(output)
+
+    def _submit(self, chunk: bytes) -> None:
+        self._members.append(_executor(self.threads).submit(_gzip_member, chunk, self.level))
+
+    def flush(self) -> bytes:
+        """Compress the remaining data and end the stream; returns the last compressed bytes."""
+        if self._stream is not None:
+            return self._stream.flush()
+        if self._buffer or not self._members:
+            self._submit(bytes(self._buffer))
+            self._buffer.clear()
+        output = b''.join(member.result() for member in self._members)
+        self._members.clear()
+        return output
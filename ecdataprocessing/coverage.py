@@ -0,0 +1,112 @@
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+# Purpose: Vectorized time coverage of a set of files. Intervals are sorted and merged
+#          with NumPy once, after which gaps, coverage fractions and "which files cover
+#          time T" queries are answered with binary searches instead of Python loops.
+#          All times are int64 nanoseconds since the epoch.
+
+def merge_intervals(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Merge overlapping or touching [start, end) intervals.
+
+    Args:
+        starts: Interval start times.
+        ends: Interval end times.
+
+    Returns:
+        Tuple of the start and end times of the merged intervals, sorted by start.
+    """
+    if len(starts) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    order = np.argsort(starts, kind='stable')
+    starts, ends = starts[order], ends[order]
+    # An interval starts a new merged interval if it begins after every earlier interval ended
+    reach = np.maximum.accumulate(ends)
+    new = np.empty(len(starts), dtype=bool)
+    new[0] = True
+    new[1:] = starts[1:] > reach[:-1]
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(starts)) - 1
+    return starts[first], reach[last]
+
+class Coverage:
+    """Time coverage of a set of files.
+
+    Args:
+        starts: First timestamp of every file.
+        ends: Last timestamp of every file.
+        names: Optional file names, in the same order.
+        sample_period: Duration of one sample. The last sample of a file covers up to
+            end + sample_period, so back-to-back files do not leave one-sample gaps.
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, names: Optional[Sequence[str]] = None, sample_period: int = 0):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64) + sample_period
+        order = np.argsort(starts, kind='stable')
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.names = np.asarray(names, dtype=object)[order] if names is not None else None
+        # Latest end of any file up to each position, used to bound "covers T" searches
+        self._reach = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+
+        self.merged_starts, self.merged_ends = merge_intervals(self.starts, self.ends)
+        # Covered time before each merged interval, for coverage fractions
+        lengths = self.merged_ends - self.merged_starts
+        self._covered_before = np.concatenate(([0], np.cumsum(lengths)))
+
+    def covered_until(self, times: np.ndarray) -> np.ndarray:
+        """Return the total covered time before each of `times`."""
+        times = np.asarray(times, dtype=np.int64)
+        if len(self.merged_starts) == 0:
+            return np.zeros(times.shape, dtype=np.int64)
+        position = np.searchsorted(self.merged_starts, times, side='right') - 1
+        clamped = np.maximum(position, 0)
+        inside = np.clip(times - self.merged_starts[clamped], 0, self.merged_ends[clamped] - self.merged_starts[clamped])
+        return np.where(position >= 0, self._covered_before[clamped] + inside, 0)
+
+    def fraction(self, block_starts: np.ndarray, block_length: int) -> np.ndarray:
+        """Return the fraction of each block that is covered.
+
+        Args:
+            block_starts: Start times of the blocks.
+            block_length: Length of every block, e.g. 30 minutes or one day.
+
+        Returns:
+            Array of fractions between 0 and 1.
+        """
+        block_starts = np.asarray(block_starts, dtype=np.int64)
+        return (self.covered_until(block_starts + block_length) - self.covered_until(block_starts)) / block_length
+
+    def gaps(self, start: int, end: int, resolution: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the uncovered ranges between `start` and `end`.
+
+        Args:
+            start: Start of the period to check.
+            end: End of the period to check.
+            resolution: Only gaps longer than this are reported, e.g. one sample, 30 minutes or a day.
+
+        Returns:
+            Tuple of the start and end times of the gaps.
+        """
+        first = np.searchsorted(self.merged_ends, start, side='right')
+        last = np.searchsorted(self.merged_starts, end, side='left')
+        gap_starts = np.concatenate(([start], self.merged_ends[first:last]))
+        gap_ends = np.concatenate((self.merged_starts[first:last], [end]))
+        gap_starts = np.maximum(gap_starts, start)
+        gap_ends = np.minimum(gap_ends, end)
+        keep = gap_ends - gap_starts > resolution
+        return gap_starts[keep], gap_ends[keep]
+
+    def missing_blocks(self, start: int, end: int, block_length: int, threshold: float = 1.0) -> np.ndarray:
+        """Return the start times of blocks between `start` and `end` with less than `threshold` coverage."""
+        block_starts = np.arange(start, end, block_length, dtype=np.int64)
+        return block_starts[self.fraction(block_starts, block_length) < threshold]
+
+    def files_covering(self, time: int) -> np.ndarray:
+        """Return the positions (or names, if given) of the files that cover `time`."""
+        # Files before `low` all end before `time`, files from `high` on start after it
+        low = np.searchsorted(self._reach, time, side='right')
+        high = np.searchsorted(self.starts, time, side='right')
+        positions = low + np.flatnonzero(self.ends[low:high] > time)
+        return self.names[positions] if self.names is not None else positions
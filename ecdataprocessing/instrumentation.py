@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import cProfile
+import fnmatch
+import logging
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+# Purpose: Timers and counters for the processing stages (read, parse, format, write, existence
+#          checks, ...) with a per-file breakdown, a summary at the end of a run and export as
+#          JSON or Prometheus text. The scripts record into a process-wide Metrics object, like
+#          they log to the root logger; worker processes send theirs back to the parent.
+#          Files matching a pattern can additionally be run under cProfile and tracemalloc.
+
+class Metrics:
+    """Accumulated stage times (seconds) and counters, in total and per file.
+
+    Recording is thread-safe. The file being processed is tracked per thread, so the
+    threads of the unzipper each attribute their work to their own archive.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timers = defaultdict(float)
+        self.counters = defaultdict(int)
+        self.files = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _current_file(self) -> Optional[dict]:
+        return getattr(self._local, 'file', None)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.timers[name] += seconds
+            current = self._current_file()
+            if current is not None:
+                current['timers'][name] = current['timers'].get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+            current = self._current_file()
+            if current is not None:
+                current['counters'][name] = current['counters'].get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Add the time spent in the block to the stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    @contextmanager
+    def file(self, name: str) -> Iterator[None]:
+        """Attribute everything recorded in the block (by this thread) to the file `name` as well."""
+        with self._lock:
+            entry = self.files.setdefault(name, {'timers': {}, 'counters': {}})
+        previous = self._current_file()
+        self._local.file = entry
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.file = previous
+            self.add_time('total', time.perf_counter() - start)
+            with self._lock:
+                entry['timers']['total'] = entry['timers'].get('total', 0.0) + time.perf_counter() - start
+                self.counters['files'] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'elapsed': self.elapsed(),
+                'timers': dict(self.timers),
+                'counters': dict(self.counters),
+                'files': {name: {'timers': dict(entry['timers']), 'counters': dict(entry['counters'])}
+                          for name, entry in self.files.items()},
+            }
+
+    def merge(self, other: dict) -> None:
+        """Add the timers, counters and files of another run, e.g. the dict sent back by a worker."""
+        with self._lock:
+            for name, seconds in other['timers'].items():
+                self.timers[name] += seconds
+            for name, value in other['counters'].items():
+                self.counters[name] += value
+            for name, entry in other['files'].items():
+                target = self.files.setdefault(name, {'timers': {}, 'counters': {}})
+                for kind in ('timers', 'counters'):
+                    for key, value in entry[kind].items():
+                        target[kind][key] = target[kind].get(key, 0) + value
+
+    def summary(self) -> str:
+        """Return a readable summary: stage times, throughput and counters."""
+        elapsed = self.elapsed()
+        lines = [f"Elapsed {elapsed:.2f} s, {self.counters.get('files', 0)} files"]
+        stages = {name: seconds for name, seconds in self.timers.items() if name != 'total'}
+        # Time inside files that no stage timer covers, e.g. the per-line loop of the streaming mode
+        if 'total' in self.timers and self.timers['total'] > sum(stages.values()):
+            stages['other'] = self.timers['total'] - sum(stages.values())
+        staged = sum(stages.values()) or 1.0
+        for name, seconds in sorted(stages.items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<10} {seconds:10.2f} s  {100 * seconds / staged:5.1f}%")
+        rows = self.counters.get('rows', 0)
+        if rows:
+            lines.append(f"  {rows} rows, {rows / elapsed:.0f} rows/s")
+        for name in ('bytes_in', 'bytes_out'):
+            if name in self.counters:
+                lines.append(f"  {name} {self.counters[name] / 1e6:.1f} MB, {self.counters[name] / 1e6 / elapsed:.1f} MB/s")
+        for name, value in sorted(self.counters.items()):
+            if name not in ('rows', 'files', 'bytes_in', 'bytes_out'):
+                lines.append(f"  {name} {value}")
+        return '\n'.join(lines)
+
+    def to_prometheus(self, prefix: str = 'ecdata') -> str:
+        """Return the totals in the Prometheus text exposition format."""
+        lines = [f"# HELP {prefix}_stage_seconds_total Time spent per processing stage.",
+                 f"# TYPE {prefix}_stage_seconds_total counter"]
+        for name, seconds in sorted(self.timers.items()):
+            lines.append(f'{prefix}_stage_seconds_total{{stage="{name}"}} {seconds:.6f}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        lines.append(f"# TYPE {prefix}_elapsed_seconds gauge")
+        lines.append(f"{prefix}_elapsed_seconds {self.elapsed():.6f}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str) -> None:
+        """Write the metrics to `path`: JSON for a .json file, Prometheus text otherwise."""
+        with open(path, 'w') as file:
+            if path.endswith('.json'):
+                json.dump(self.to_dict(), file, indent=2)
+            else:
+                file.write(self.to_prometheus())
+
+_metrics = Metrics()
+# (file name pattern, output folder) of files to run under cProfile and tracemalloc
+_profiling: Tuple[Optional[str], str] = (None, '.')
+
+def get_metrics() -> Metrics:
+    """Return the process-wide metrics."""
+    return _metrics
+
+def set_metrics(metrics: Metrics) -> Metrics:
+    """Replace the process-wide metrics and return the previous ones."""
+    global _metrics
+    previous, _metrics = _metrics, metrics
+    return previous
+
+def timer(name: str):
+    """Time a block into the stage `name` of the process-wide metrics."""
+    return _metrics.timer(name)
+
+def count(name: str, value: int = 1) -> None:
+    """Add `value` to the counter `name` of the process-wide metrics."""
+    _metrics.count(name, value)
+
+def configure_profiling(pattern: Optional[str], directory: str = '.') -> None:
+    """Profile the files whose name matches the glob `pattern` (None disables profiling)."""
+    global _profiling
+    _profiling = (pattern, directory)
+
+def get_profiling() -> Tuple[Optional[str], str]:
+    """Return the profiling settings, e.g. to hand them to worker processes."""
+    return _profiling
+
+@contextmanager
+def profiled(name: str, directory: str, top: int = 15) -> Iterator[None]:
+    """Run the block under cProfile and tracemalloc.
+
+    The profile is written to <directory>/<name>.prof (open it with pstats or snakeviz) and
+    the peak traced memory and the largest allocation sites are logged.
+    """
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+        output = os.path.join(directory, f"{name}.prof")
+        profiler.dump_stats(output)
+        statistics = snapshot.statistics('lineno')[:top]
+        logging.info(f"Profile of {name} written to {output}; peak traced memory {peak / 1e6:.1f} MB. Largest allocations:\n"
+                     + '\n'.join(f"  {statistic}" for statistic in statistics))
+
+@contextmanager
+def track_file(path: str) -> Iterator[None]:
+    """Attribute the work in the block to the file `path`, profiling it if it matches the profiling pattern."""
+    name = os.path.basename(path)
+    pattern, directory = _profiling
+    with _metrics.file(name):
+        if pattern is not None and fnmatch.fnmatch(name, pattern):
+            with profiled(name, directory):
+                yield
+        else:
+            yield
@@ -0,0 +1,1508 @@
+import os
+import io
+from datetime import datetime
+from typing import Tuple, List, Optional, Iterator, Iterable, NamedTuple
+from itertools import chain, islice
+import logging
+import logging.handlers
+import multiprocessing
+import traceback
+import tempfile
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, Future
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from .blockindex import BlockIndex, TEMPORARY_SUFFIX
+from .blockstats import BlockStats, spike_window
+from .concurrent_io import ConcurrentIO, WRITE_BUFFER_SIZE
+from .compressed_io import (Compressor, Compression, codec_of, codec_suffix, decompress, get_compression, configure_compression,
+                           is_dat_file, open_compressed)
+from .instrumentation import Metrics, timer, count, track_file, get_metrics, set_metrics, configure_profiling, get_profiling
+from .toa5reader import HEADER_LINES, summarize_file
+from .unzipfiles import find_year_folders
+from .timestamps import (parse_timestamp, parse_timestamps, floor_to_block, block_numbers, to_datetime,
+                        format_block_key, NANOSECONDS_PER_SECOND, NANOSECONDS_PER_MINUTE)
+
+# Columns 2-8 of a TOA5 data line, without the sixth column which is not needed
+DATA_COLUMNS = [2, 3, 4, 5, 7, 8]
+
+# Layout of binary .npy blocks: the timestamp as int64 nanoseconds since the epoch,
+# followed by the data columns named after their TOA5 column index
+BLOCK_DTYPE = np.dtype([('timestamp', np.int64)] + [(f'col{c}', np.float64) for c in DATA_COLUMNS])
+
+# Channels of the per-block statistics, named like the columns of the .npy blocks
+STAT_CHANNELS = BLOCK_DTYPE.names[1:]
+
+# Lines formatted and written at a time by the line-based modes, bounding their memory use
+LINE_CHUNK = 4096
+
+# Files submitted ahead of the parent per worker, bounding the results waiting to be collected
+PENDING_PER_WORKER = 2
+
+def _block_file_mode() -> int:
+    # Mode of a new file under the current umask; mkstemp would make blocks readable by the owner only
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+BLOCK_FILE_MODE = _block_file_mode()
+
+def check_block_minutes(block_minutes: int) -> None:
+    """Raise a ValueError unless the block length divides an hour."""
+    if block_minutes <= 0 or 60 % block_minutes != 0:
+        raise ValueError(f"Block length must divide an hour, got {block_minutes} minutes")
+
+def count_lines(filepath: str) -> int:
+    """Count the total number of lines in a file.
+    
+    Args:
+        filepath: Path to the file, decompressed if it ends in .gz or .zst.
+    
+    Returns:
+        Number of lines in the file.
+    """
+    with open_compressed(filepath, 'r') as file:
+        return sum(1 for _ in file)
+
+def file_size(filepath: str) -> Optional[int]:
+    """Return the size of a file in bytes, or None if it does not exist (a single stat call)."""
+    try:
+        return os.path.getsize(filepath)
+    except OSError:
+        return None
+
+def is_on_the_hour_or_half_hour(timestamp: str, block_minutes: int = 30) -> bool:
+    """Check if the given timestamp is at HH:00:00 or HH:30:00 (or another block boundary).
+    
+    Args:
+        timestamp: A timestamp string in the format "YYYY-MM-DD HH:MM:SS".
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Returns:
+        True if the timestamp is at the start of a block, False otherwise.
+    """
+    try:
+        return parse_timestamp(timestamp) % (block_minutes * NANOSECONDS_PER_MINUTE) == 0
+    except ValueError:
+        return False  # Handle incorrect input format
+
+                
+def round_to_half_hour_mark(initial_date: str, frequency: int = 20, block_minutes: int = 30) -> tuple[datetime, int]:
+    """Round up the timestamp to the next HH:00:00 or HH:30:00 and calculate the number of observations.
+    
+    Args:
+        initial_date: A timestamp string in the format "YYYY-MM-DD HH:MM:SS.%f".
+        frequency: Observations per second.
+        block_minutes: Block length in minutes, dividing an hour. The timestamp is rounded
+            up to the next block boundary, e.g. HH:15:00 for 15-minute blocks.
+    
+    Returns:
+        A tuple containing:
+        - The rounded-up datetime object.
+        - The number of observations until that rounded time.
+    """
+    current_time = parse_timestamp(initial_date)
+
+    # Determine next rounded time (HH:00:00 or HH:30:00)
+    next_time = floor_to_block(current_time, block_minutes) + block_minutes * NANOSECONDS_PER_MINUTE
+
+    # Compute time difference in seconds
+    time_difference = (next_time - current_time) / NANOSECONDS_PER_SECOND
+
+    # Calculate the number of observations
+    number_of_observations = time_difference* frequency
+
+    return to_datetime(next_time), number_of_observations
+
+def format_filename(date_str: str, site_name: str, block_minutes: int = 30) -> str:
+    """Generate a formatted filename based on the timestamp and site name.
+    
+    Args:
+        date_str: Timestamp string.
+        site_name: Site identifier.
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Returns:
+        Formatted filename, ending in the suffix of the configured compression if any.
+    """
+    return f"{format_block_key(parse_timestamp(date_str), block_minutes)}_{site_name}{block_suffix()}"
+
+def block_suffix(output_format: str = "raw") -> str:
+    """Return the file name suffix of blocks in an output format, e.g. ".raw", or ".raw.zst" with zstd compression."""
+    return f".{output_format}{codec_suffix()}"
+
+def block_name(timestamp: int, site_name: str, block_minutes: int = 30, output_format: str = "raw") -> str:
+    """Return the file name of the block containing a time (int64 nanoseconds), e.g. "2012-01-01_0030_speuld.raw"."""
+    return f"{format_block_key(timestamp, block_minutes)}_{site_name}{block_suffix(output_format)}"
+
+def block_key(timestamp: str, block_minutes: int = 30) -> str:
+    """Return the block key of a timestamp using fixed-offset slicing.
+    
+    Args:
+        timestamp: A timestamp string in the format "YYYY-MM-DD HH:MM:SS[.f]".
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Returns:
+        Block key in the format "YYYY-MM-DD_HHMM", rounded down to the start of the block.
+    """
+    minute = int(timestamp[14:16])
+    return f"{timestamp[:10]}_{timestamp[11:13]}{minute - minute % block_minutes:02d}"
+
+def parse_line(line: str) -> List[float]:
+    """Parse the kept columns of a TOA5 data line.
+    
+    Args:
+        line: Raw comma-separated TOA5 data line.
+    
+    Returns:
+        Values of columns 2-8 (except the sixth column), with "NAN" entries as NaN.
+    """
+    # I do not need sixth column, so I am skipping it
+    return [float(entry) if entry.strip('"') != "NAN" else np.nan for i, entry in enumerate(line.rstrip('\r\n').split(',')[2:9]) if i != 4]
+
+def format_row(row: List[float]) -> str:
+    """Format the values of one row, as returned by parse_line, as a tab-separated output line."""
+    return '\t'.join([f"{value:.6f}" if value == value else "NAN" for value in row]) + '\n'
+
+def format_line(line: str) -> str:
+    """Convert a TOA5 data line into a tab-separated output line.
+    
+    Args:
+        line: Raw comma-separated TOA5 data line.
+    
+    Returns:
+        Tab-separated line with columns 2-8 (except the sixth column) formatted to six decimals.
+    """
+    return format_row(parse_line(line))
+
+def read_data_columns(source, usecols: List[int], skiprows: int = 0, chunksize: Optional[int] = None):
+    """Read selected columns of TOA5 data with pandas' C parser.
+    
+    Float columns are parsed with the round-trip converter so values match Python's float().
+    
+    Args:
+        source: Path or file object with TOA5 data.
+        usecols: Column indices to read. Column 0 is read as the timestamp string.
+        skiprows: Number of header lines to skip.
+        chunksize: If given, return an iterator of DataFrames with this many rows.
+    
+    Returns:
+        DataFrame (or iterator of DataFrames) with the selected columns.
+    """
+    float_columns = [c for c in usecols if c != 0]
+    dtype = {c: np.float64 for c in float_columns}
+    if 0 in usecols:
+        dtype[0] = str
+    return pd.read_csv(source, header=None, skiprows=skiprows, usecols=usecols, dtype=dtype,
+                       na_values={c: ["NAN"] for c in float_columns}, keep_default_na=False,
+                       float_precision='round_trip', engine='c', chunksize=chunksize)
+
+def format_block(values: np.ndarray) -> str:
+    """Format a block of values as tab-separated .raw output.
+    
+    Produces the same bytes as format_line applied to every row, but formats the
+    whole block with a single call.
+    
+    Args:
+        values: Array of shape (rows, columns) as read by read_data_columns.
+    
+    Returns:
+        Tab-separated text with one line per row and NaN written as "NAN".
+    """
+    if values.size == 0:
+        return ''
+    row_format = '\t'.join(['%.6f'] * values.shape[1]) + '\n'
+    return ((row_format * values.shape[0]) % tuple(values.ravel().tolist())).replace('nan', 'NAN')
+
+def row_values(rows: List[List[float]]) -> np.ndarray:
+    """Return rows parsed by parse_line as an array of shape (rows, 6) for the block statistics."""
+    return np.array(rows, dtype=np.float64).reshape(-1, len(DATA_COLUMNS))
+
+def block_statistics(values: Optional[np.ndarray] = None, block_size: int = 36000, block_minutes: int = 30) -> BlockStats:
+    """Return new statistics of the kept channels, fed with `values` if given.
+    
+    Spikes are counted in windows of the same length in time at every sampling frequency,
+    which is taken from the rows and minutes of a complete block.
+    """
+    stats = BlockStats(STAT_CHANNELS, spike_window=spike_window(block_size // (block_minutes * 60)))
+    if values is not None:
+        stats.update(values)
+    return stats
+
+class BlockWriter:
+    """Write a block to a temporary file and move it into place when it is complete.
+    
+    The block file is only ever replaced by a finished, fsynced file, so a run that is
+    killed leaves the previous version of a block or the new one, never a truncated block.
+    A CRC32 of the file is kept while writing, for the block index.
+    
+    Blocks whose name ends in .gz or .zst are compressed with the level and threads set by
+    configure_compression; size and checksum then refer to the compressed file.
+    
+    Args:
+        path: Path of the block file.
+        existing: Content of the block so far, copied to the temporary file when rows are appended.
+        new: The block is not expected to exist. It is then moved into place with a hard link,
+            which fails instead of replacing a block that was written without the index.
+    """
+    
+    def __init__(self, path: str, existing: bytes = b'', new: bool = False):
+        self.name = path
+        # A temporary file of its own, so writers of the same block never share one
+        descriptor, self.temporary = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.',
+                                                      suffix=TEMPORARY_SUFFIX)
+        os.chmod(self.temporary, BLOCK_FILE_MODE)
+        self.appended = bool(existing)
+        self.new = new
+        self.size = 0
+        self.checksum = 0
+        codec = codec_of(path)
+        compression = get_compression()
+        self._compressor = Compressor(codec, compression.level, compression.threads) if codec != 'none' else None
+        self._file = os.fdopen(descriptor, 'wb', buffering=WRITE_BUFFER_SIZE)
+        if existing:
+            self.write(existing)
+    
+    def write(self, data) -> None:
+        """Write text or bytes to the block."""
+        if isinstance(data, str):
+            data = data.encode()
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        self._write_out(data)
+    
+    def _write_out(self, data: bytes) -> None:
+        self._file.write(data)
+        self.size += len(data)
+        self.checksum = zlib.crc32(data, self.checksum)
+    
+    def tell(self) -> int:
+        return self.size
+    
+    def commit(self) -> None:
+        """Flush the block to disk and atomically replace the block file with it.
+        
+        Raises:
+            FileExistsError: If a new block already exists; the temporary file is dropped.
+        """
+        if self._compressor is not None:
+            self._write_out(self._compressor.flush())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        if self.new:
+            try:
+                os.link(self.temporary, self.name)
+            except FileExistsError:
+                self.discard()
+                raise
+            except OSError:
+                # File systems without hard links (some SMB shares) get an existence check instead
+                if os.path.exists(self.name):
+                    self.discard()
+                    raise FileExistsError(self.name)
+            else:
+                os.remove(self.temporary)
+                return
+        os.replace(self.temporary, self.name)
+    
+    def discard(self) -> None:
+        """Drop the temporary file, leaving the block file as it was."""
+        self._file.close()
+        try:
+            os.remove(self.temporary)
+        except OSError:
+            pass
+
+def read_complete_lines(path: str, name: str, index: Optional[BlockIndex] = None) -> bytes:
+    """Return the content of a block file up to its last complete line.
+    
+    Blocks written before writes were atomic can end in a half-written line if a run was
+    killed; that line is dropped so the appended rows do not corrupt it. The file is
+    checked against the checksum in the block index, and decompressed if it is compressed.
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    content = decompress(data, codec_of(path))
+    complete = content[:content.rfind(b'\n') + 1]
+    if len(complete) < len(content):
+        logging.warning(f"File {name} ends in an incomplete line, which is dropped.")
+    recorded = index.checksum(name) if index is not None else None
+    entry = index.get(name) if recorded is not None else None
+    if entry is not None and entry[1] == len(data) and zlib.crc32(data) != recorded:
+        logging.warning(f"File {name} does not match the checksum in the block index.")
+    return complete
+
+def rows_written(name: str, source: str, index: Optional[BlockIndex] = None) -> bool:
+    """Return True, and log it, if the block index lists `source` as a source of block `name`.
+    
+    The rows of that source are in the block already, so writing them again would
+    duplicate them. `source` may hold several comma-separated files.
+    """
+    if index is None or not source:
+        return False
+    recorded = index.sources(name)
+    if not any(part in recorded for part in source.split(',')):
+        return False
+    logging.info(f"File {name} holds the rows of {source} already. Skipping them.")
+    count('blocks_skipped')
+    return True
+
+def keep_existing_block(name: str, rows: int, block_size: int, index: Optional[BlockIndex] = None, source: str = '') -> bool:
+    """Decide whether the rows of `source` may be appended to an existing block, logging why not.
+    
+    Blocks are cut by timestamp, so a block with a logger gap is short for good and a short
+    block is not necessarily incomplete. Rows are therefore only appended if the block index
+    lists the sources of the block and `source` is not among them. Without that record the
+    rows in the block are unknown and it is left as it is.
+    
+    Args:
+        name: File name of the block.
+        rows: Number of rows in the block.
+        block_size: Expected number of rows in a complete block.
+        index: Optional manifest of the output directory.
+        source: Names of the .dat files of the rows to be written.
+    
+    Returns:
+        True if the block is left as it is, False if the rows can be appended.
+    """
+    if rows == 0:
+        return False
+    if rows == block_size:
+        logging.info(f"File {name} exists and is complete. Skipping.")
+    elif rows > block_size:
+        logging.warning(f"File {name} exists but is larger than expected ({rows} lines). Skipping.")
+    elif index is None:
+        logging.warning(f"File {name} exists, and without a block index the rows it holds are unknown. Skipping.")
+    elif not index.sources(name):
+        logging.warning(f"File {name} has no sources in the block index, so the rows it holds are unknown. Skipping.")
+    else:
+        return rows_written(name, source, index)
+    count('blocks_skipped')
+    return True
+
+def skips_rows_of(name: str, source: str, block_size: int, index: Optional[BlockIndex] = None) -> bool:
+    """Return True if the block index shows that the rows of `source` must not be written to block `name`.
+    
+    Used before rows are formatted or joined with the rows of other files, so only the
+    block index is consulted, not the disk.
+    """
+    entry = index.get(name) if index is not None else None
+    return entry is not None and keep_existing_block(name, entry[0], block_size, index, source)
+
+def open_block_file(output_path: str, block_size: int, index: Optional[BlockIndex] = None, source: str = '') -> Tuple[Optional[BlockWriter], int]:
+    """Open an output block for writing, appending to incomplete blocks and skipping finished ones.
+    
+    With a block index, finished blocks are recognised from the manifest without touching
+    the file, and incomplete blocks are only re-counted if their size changed since they
+    were recorded. Blocks missing from the manifest are counted once and recorded. If the
+    manifest lists every block of the folder, a block it does not know is created without
+    checking the disk first, which saves a round trip per block on a network share.
+    
+    The rows are written to a temporary file that replaces the block when it is closed
+    with close_block_file, see BlockWriter. Rows appended to a block are written after a
+    copy of its complete lines; an existing block is only appended to as keep_existing_block
+    allows, so a rerun does not write the same rows twice.
+    
+    Args:
+        output_path: Path of the .raw (or compressed .raw.gz/.raw.zst) block file.
+        block_size: Expected number of lines in a complete block.
+        index: Optional manifest of the output directory.
+        source: Names of the .dat files of the rows to be written.
+    
+    Returns:
+        Tuple of the block writer (None if the block should be skipped) and the number of
+        lines already in the block.
+    """
+    output_filename = os.path.basename(output_path)
+    
+    with timer('exists'):
+        num_lines = None
+        absent = False
+        if index is not None:
+            entry = index.get(output_filename)
+            absent = entry is None and index.lists_all_blocks
+            if entry is not None:
+                rows, size = entry
+                if rows >= block_size:
+                    num_lines = rows
+                elif file_size(output_path) == size:
+                    num_lines = rows
+        
+        if num_lines is None and not absent and os.path.exists(output_path):
+            num_lines = count_lines(output_path)
+            if index is not None:
+                index.record(output_filename, num_lines, os.path.getsize(output_path))
+    
+    existing = b''
+    if num_lines is not None:
+        if keep_existing_block(output_filename, num_lines, block_size, index, source):
+            return None, num_lines
+        logging.info(f"Appending to {output_filename} (incomplete file: {num_lines}/{block_size} lines).")
+        count('blocks_appended')
+        with timer('copy'):
+            existing = read_complete_lines(output_path, output_filename, index)
+        num_lines = existing.count(b'\n')
+    else: 
+        num_lines = 0
+        logging.info(f"Writing new file {output_filename}")
+        count('blocks_written')
+    with timer('write'):
+        return BlockWriter(output_path, existing, new=absent), num_lines
+
+def commit_block(writer: BlockWriter, index: Optional[BlockIndex] = None) -> bool:
+    """Move a finished block into place, leaving a block the index did not know as it is.
+    
+    The rows of a block that appeared on disk without an index entry are unknown, so it is
+    kept like in keep_existing_block, and the index no longer trusts that it lists every block.
+    
+    Returns:
+        True if the block was written, False if it was left as it is.
+    """
+    try:
+        with timer('write'):
+            writer.commit()
+    except FileExistsError:
+        logging.warning(f"File {os.path.basename(writer.name)} exists but is missing from the block index. "
+                        "Skipping it and checking the disk for every block from now on.")
+        index.set_lists_all_blocks(False)
+        count('blocks_written', -1)
+        count('blocks_skipped')
+        return False
+    return True
+
+def close_block_file(outfile: BlockWriter, rows: int, index: Optional[BlockIndex] = None, source: str = '', stats: Optional[BlockStats] = None) -> None:
+    """Move a finished block into place and record its row count, size, checksum and statistics in the block index.
+    
+    Args:
+        outfile: Block writer returned by open_block_file.
+        rows: Total number of lines in the block file after writing.
+        index: Optional manifest of the output directory.
+        source: Name of the .dat file the lines were written from.
+        stats: Statistics of the lines written, merged with the stored ones if the lines were appended.
+    """
+    if not commit_block(outfile, index):
+        return
+    if index is not None:
+        if stats is not None:
+            with timer('stats'):
+                stats.finish()
+        with timer('index'):
+            index.record(os.path.basename(outfile.name), rows, outfile.size, source, stats,
+                         append=outfile.appended, checksum=outfile.checksum)
+
+class PendingBlock(NamedTuple):
+    """Formatted rows of the last, incomplete block of a file.
+    
+    The block is held in memory until the next file shows whether it continues there, so
+    a block spanning two files is written once instead of appended to and re-counted.
+    The parsed values are held with the text, for the statistics of the block.
+    """
+    name: str
+    text: str
+    rows: int
+    source: str
+    values: List[List[float]]
+
+def join_sources(*sources: str) -> str:
+    """Join comma-separated source lists without repeating a source."""
+    names = []
+    for source in sources:
+        names.extend(name for name in source.split(',') if name and name not in names)
+    return ','.join(names)
+
+def format_chunks(lines: Iterable[str], chunk_lines: int = LINE_CHUNK) -> Iterator[Tuple[str, int, List[List[float]]]]:
+    """Format raw TOA5 lines in chunks of `chunk_lines`, yielding the text, row count and parsed values of each chunk."""
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_lines))
+        if not chunk:
+            return
+        with timer('format'):
+            values = [parse_line(line) for line in chunk]
+            text = ''.join([format_row(row) for row in values])
+        yield text, len(chunk), values
+
+def write_text_block(output_directory: str, name: str, lines: Iterable[str], block_size: int, index: Optional[BlockIndex] = None, source: str = '', held: Optional[PendingBlock] = None, block_minutes: int = 30) -> None:
+    """Format raw TOA5 lines in chunks and write them to a block file with the usual skip/append logic.
+    
+    Args:
+        output_directory: Directory of the block files.
+        name: File name of the block.
+        lines: Raw TOA5 data lines of the block. They are consumed even if the block is skipped.
+        block_size: Expected number of lines in a complete block.
+        index: Optional manifest of the output directory.
+        source: Names of the .dat files the rows come from.
+        held: Optional held rows of the same block, written before `lines`.
+        block_minutes: Block length in minutes, dividing an hour.
+    """
+    outfile, num_lines = open_block_file(os.path.join(output_directory, name), block_size, index, source)
+    if outfile is None:
+        # Drain the lines of a skipped block so the caller's line iterator stays in step
+        for _ in lines:
+            pass
+        return
+    chunks = format_chunks(lines)
+    if held is not None:
+        chunks = chain([(held.text, held.rows, held.values)], chunks)
+    # Statistics are kept in the index, and taken from the values parsed for the text
+    stats = block_statistics(block_size=block_size, block_minutes=block_minutes) if index is not None else None
+    rows = 0
+    try:
+        for text, chunk_rows, values in chunks:
+            with timer('write'):
+                outfile.write(text)
+            count('bytes_out', len(text))
+            rows += chunk_rows
+            if stats is not None:
+                with timer('stats'):
+                    stats.update(row_values(values))
+    except BaseException:
+        outfile.discard()
+        raise
+    close_block_file(outfile, num_lines + rows, index, source, stats)
+
+def flush_pending(pending: Optional[PendingBlock], output_directory: str, block_size: int, index: Optional[BlockIndex] = None, block_minutes: int = 30) -> None:
+    """Write a held block, e.g. at the end of a run. A held block without rows is dropped."""
+    if pending is not None and pending.rows:
+        write_text_block(output_directory, pending.name, [], block_size, index, pending.source, held=pending, block_minutes=block_minutes)
+
+def hold_or_write(name: str, lines: Iterable[str], block_size: int, output_directory: str, index: Optional[BlockIndex] = None, source: str = '', held: Optional[PendingBlock] = None, block_minutes: int = 30) -> Optional[PendingBlock]:
+    """Format the last block of a file and hold it if it is incomplete, or write it if it is complete.
+    
+    The block has fewer than `block_size` rows unless it is complete, so holding it keeps
+    memory bounded by one block.
+    
+    Returns:
+        The held block, or None if the block was written.
+    """
+    parts = [held.text] if held is not None else []
+    rows = held.rows if held is not None else 0
+    values = list(held.values) if held is not None else []
+    for text, chunk_rows, chunk_values in format_chunks(lines):
+        parts.append(text)
+        rows += chunk_rows
+        values.extend(chunk_values)
+    pending = PendingBlock(name, ''.join(parts), rows, source, values)
+    if rows < block_size:
+        return pending
+    flush_pending(pending, output_directory, block_size, index, block_minutes)
+    return None
+
+def split_file_streaming(file_path: str, output_directory: str, site_name: str, block_size: int, index: Optional[BlockIndex] = None, block_minutes: int = 30, pending: Optional[PendingBlock] = None, hold_last: bool = False) -> Optional[PendingBlock]:
+    """Split a .dat file into 30-minute blocks in a single pass.
+    
+    Rows are formatted as they are read and each block is written when the next one
+    starts. Block boundaries are taken from the row timestamps, so the file is never
+    counted or re-read, and at most one block is held in memory. A row of a block that
+    was already written is dropped and counted as late.
+    
+    Args:
+        file_path: Path to the TOA5 .dat file.
+        output_directory: Directory where the output files will be saved.
+        site_name: Site identifier.
+        block_size: Expected number of lines in a complete block.
+        index: Optional manifest of the output directory.
+        block_minutes: Block length in minutes, dividing an hour.
+        pending: Block held from the previous file. It is joined with the first block of
+            this file if that continues it, and written otherwise.
+        hold_last: Hold the last block of the file in memory if it is incomplete, instead
+            of writing it, so the next file can complete it.
+    
+    Returns:
+        The held last block if `hold_last` is set and the block is incomplete, otherwise None.
+    """
+    source = os.path.basename(file_path)
+    count('bytes_in', os.path.getsize(file_path))
+    current_key = None
+    name = block_source = None
+    parts = []
+    values = []
+    block_rows = 0
+    skip = False
+    rows = late = 0
+    
+    def finish():
+        return PendingBlock(name, ''.join(parts), block_rows, block_source, values)
+    
+    try:
+        with open_compressed(file_path, 'r') as file:
+            # Skip the four TOA5 header lines
+            for _ in range(4):
+                next(file, None)
+        
+            for line in file:
+                rows += 1
+                key = block_key(line.split(',', 1)[0].strip('"'), block_minutes)
+                if key != current_key:
+                    # Keys sort in time order; the block of an earlier key was written already
+                    if current_key is not None and key < current_key:
+                        late += 1
+                        continue
+                    if current_key is not None:
+                        flush_pending(finish(), output_directory, block_size, index, block_minutes)
+                    current_key = key
+                    name = f"{key}_{site_name}{block_suffix()}"
+                    # Blocks the index knows to be complete, or to hold the rows of this file, are not formatted at all
+                    skip = skips_rows_of(name, source, block_size, index)
+                    if pending is not None and pending.name == name:
+                        parts, values, block_rows = [pending.text], list(pending.values), pending.rows
+                        block_source = pending.source if skip else join_sources(pending.source, source)
+                    else:
+                        flush_pending(pending, output_directory, block_size, index, block_minutes)
+                        parts, values, block_rows, block_source = [], [], 0, '' if skip else source
+                    pending = None
+                if not skip:
+                    row = parse_line(line)
+                    parts.append(format_row(row))
+                    values.append(row)
+                    block_rows += 1
+    except BaseException:
+        # Write the block held from the previous file if this file failed before taking it over
+        flush_pending(pending, output_directory, block_size, index, block_minutes)
+        raise
+    count('rows', rows)
+    if late:
+        count('rows_late', late)
+        logging.warning(f"{late} rows of {source} arrived after their block was written and are dropped.")
+    
+    if current_key is not None:
+        if hold_last and not skip and block_rows < block_size:
+            return finish()
+        flush_pending(finish(), output_directory, block_size, index, block_minutes)
+    else:
+        logging.warning(f"Skipping empty file: {source}")
+    
+    if hold_last:
+        return pending
+    flush_pending(pending, output_directory, block_size, index, block_minutes)
+    return None
+
+class BlockReport(NamedTuple):
+    """Timestamp problems found in one block of one file."""
+    key: str
+    rows: int
+    duplicates: int
+    out_of_order: int
+    gaps: int
+    missing_samples: int
+    late: int = 0  # out-of-order rows that arrived after the block was finished and were dropped
+
+def add_late_rows(reports: List[BlockReport], key: str, rows: int) -> None:
+    """Count rows that arrived after their block was finished in the report of the block."""
+    for position in range(len(reports) - 1, -1, -1):
+        if reports[position].key == key:
+            report = reports[position]
+            reports[position] = report._replace(out_of_order=report.out_of_order + rows, late=report.late + rows)
+            return
+    reports.append(BlockReport(key, 0, 0, rows, 0, 0, rows))
+
+def clean_block(timestamps: np.ndarray, values: np.ndarray, sample_period: int, block_minutes: int = 30) -> Tuple[np.ndarray, np.ndarray, BlockReport]:
+    """Put the rows of a block in time order, drop duplicate timestamps and find gaps.
+    
+    Args:
+        timestamps: Timestamps of the rows (int64 nanoseconds since the epoch).
+        values: Values of the rows, of shape (rows, 6).
+        sample_period: Expected time between two rows in nanoseconds.
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Returns:
+        Tuple of the cleaned timestamps, the cleaned values and a BlockReport. Rows with a
+        duplicate timestamp keep their first occurrence. A gap is any step longer than
+        1.5 sample periods.
+    """
+    steps = np.diff(timestamps)
+    out_of_order = int(np.count_nonzero(steps < 0))
+    if out_of_order:
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, values = timestamps[order], values[order]
+        steps = np.diff(timestamps)
+    
+    duplicate = steps == 0
+    duplicates = int(np.count_nonzero(duplicate))
+    if duplicates:
+        keep = np.concatenate(([True], ~duplicate))
+        timestamps, values = timestamps[keep], values[keep]
+        steps = steps[~duplicate]
+    
+    gap_steps = steps[steps > sample_period * 3 // 2]
+    missing_samples = int(np.rint(gap_steps / sample_period).sum()) - len(gap_steps)
+    report = BlockReport(format_block_key(timestamps[0], block_minutes), len(timestamps), duplicates, out_of_order, len(gap_steps), missing_samples)
+    return timestamps, values, report
+
+def iter_blocks(file_path, block_size: int, reports: Optional[List[BlockReport]] = None, block_minutes: int = 30) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Read a .dat file once and yield its 30-minute (or `block_minutes`) blocks as parsed arrays.
+    
+    The file is read in chunks of `block_size` rows. Each chunk is parsed into a typed
+    array and every row is assigned to the block of its own timestamp, so gaps,
+    duplicates and out-of-order rows cannot shift later rows into the wrong block. The
+    last block of a chunk is carried over until the block is known to be complete, and
+    each block is cleaned with clean_block before it is yielded. Rows that arrive after
+    their block was already yielded are dropped and counted as late in its report.
+    
+    Args:
+        file_path: Path to the TOA5 .dat file, or an open stream of one.
+        block_size: Expected number of lines in a complete block.
+        reports: Optional list that receives a BlockReport for every yielded block.
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Yields:
+        Tuples of the timestamps of the block (int64 nanoseconds since the epoch) and its
+        values of shape (rows, 6).
+    """
+    sample_period = block_minutes * NANOSECONDS_PER_MINUTE // block_size
+    
+    def finish(timestamps, values):
+        with timer('parse'):
+            timestamps, values, report = clean_block(timestamps, values, sample_period, block_minutes)
+        if reports is not None:
+            reports.append(report)
+        return timestamps, values
+    
+    carry_timestamps = None
+    carry = None
+    carry_block = None
+    chunks = read_data_columns(file_path, usecols=[0] + DATA_COLUMNS, skiprows=4, chunksize=block_size)
+    while True:
+        # Reading includes pandas' tokenizing and float conversion
+        with timer('read'):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        count('rows', len(chunk))
+        
+        with timer('parse'):
+            timestamps = parse_timestamps(chunk[0].to_numpy())
+            values = chunk[DATA_COLUMNS].to_numpy()
+            
+            blocks = block_numbers(timestamps, block_minutes)
+            # Every block before the carried one was yielded already, so its late rows are dropped
+            late = blocks < carry_block if carry_block is not None else None
+            if late is not None and np.any(late):
+                late_blocks, late_rows = np.unique(blocks[late], return_counts=True)
+                count('rows_late', int(late_rows.sum()))
+                if reports is not None:
+                    for block, rows in zip(late_blocks, late_rows):
+                        add_late_rows(reports, format_block_key(int(block) * block_minutes * NANOSECONDS_PER_MINUTE, block_minutes), int(rows))
+                timestamps, values, blocks = timestamps[~late], values[~late], blocks[~late]
+            
+            # Group rows of the same block together if some arrived out of order
+            if np.any(blocks[1:] < blocks[:-1]):
+                order = np.argsort(blocks, kind='stable')
+                timestamps, values, blocks = timestamps[order], values[order], blocks[order]
+            
+            # A new block starts wherever the block number changes
+            starts = np.flatnonzero(blocks[1:] != blocks[:-1]) + 1
+            starts = np.concatenate(([0], starts)) if len(blocks) else starts
+        
+        for start, end in zip(starts, np.append(starts[1:], len(values))):
+            if carry is not None:
+                if blocks[start] == carry_block:
+                    carry_timestamps = np.concatenate((carry_timestamps, timestamps[start:end]))
+                    carry = np.concatenate((carry, values[start:end]))
+                    continue
+                yield finish(carry_timestamps, carry)
+            carry_timestamps, carry, carry_block = timestamps[start:end], values[start:end], blocks[start]
+    
+    if carry is not None:
+        yield finish(carry_timestamps, carry)
+
+def log_block_reports(reports: List[BlockReport], source: str, block_size: int) -> None:
+    """Log the blocks of a file that had duplicate, out-of-order or missing rows."""
+    for report in reports:
+        if report.duplicates or report.out_of_order or report.gaps:
+            late = f" ({report.late} arrived after the block was written and were dropped)" if report.late else ""
+            logging.warning(f"Block {report.key} of {source}: {report.rows}/{block_size} rows, "
+                            f"{report.duplicates} duplicate and {report.out_of_order} out-of-order rows{late}, "
+                            f"{report.gaps} gaps ({report.missing_samples} missing samples)")
+
+def split_file_vectorized(file_path, output_directory: str, site_name: str, block_size: int, keep_edges: bool = False, index: Optional[BlockIndex] = None, output_format: str = "raw", source_name: Optional[str] = None, block_minutes: int = 30) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """Split a .dat file into 30-minute blocks using the vectorized parse-and-format engine.
+    
+    Args:
+        file_path: Path to the TOA5 .dat file, or an open stream of one.
+        output_directory: Directory where the output files will be saved.
+        site_name: Site identifier.
+        block_size: Expected number of lines in a complete block.
+        keep_edges: If True, the first and last block are returned instead of written,
+            because they may be shared with the neighbouring files.
+        index: Optional manifest of the output directory.
+        output_format: "raw" for tab-separated text blocks, "npy" for binary blocks.
+        source_name: Name recorded as the source of the blocks. Defaults to the file name.
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Returns:
+        List of (source, timestamps, values) edge blocks that were not written, where source
+        is the name recorded for the rows.
+    """
+    source = source_name or os.path.basename(file_path)
+    if isinstance(file_path, str):
+        count('bytes_in', os.path.getsize(file_path))
+    reports = []
+    edges = []
+    previous = None
+    for position, (timestamps, values) in enumerate(iter_blocks(file_path, block_size, reports, block_minutes)):
+        if keep_edges and position == 0:
+            edges.append((source, timestamps, values))
+            continue
+        if previous is not None:
+            write_block(previous[1], previous[0], output_directory, site_name, block_size, index, source, output_format, block_minutes)
+        previous = (timestamps, values)
+    
+    if previous is not None:
+        if keep_edges:
+            edges.append((source, *previous))
+        else:
+            write_block(previous[1], previous[0], output_directory, site_name, block_size, index, source, output_format, block_minutes)
+    elif not edges:
+        logging.warning(f"Skipping empty file: {source}")
+    log_block_reports(reports, source, block_size)
+    return edges
+
+def split_zip_vectorized(zip_path: str, output_directory: str, site_name: str, block_size: int, keep_edges: bool = False, index: Optional[BlockIndex] = None, output_format: str = "raw", block_minutes: int = 30) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """Split the TOA5 .dat members of a zip archive without extracting them.
+    
+    Each member is opened as a stream and fed straight into split_file_vectorized, so
+    only the 30-minute blocks are written to disk. Members are processed in name order.
+    Members that are not TOA5 text files (e.g. TOB binaries that still need converting)
+    are skipped.
+    
+    Args:
+        zip_path: Path to the zip archive.
+        output_directory: Directory where the output files will be saved.
+        site_name: Site identifier.
+        block_size: Expected number of lines in a complete block.
+        keep_edges: If True, the first and last block of every member are returned instead of written.
+        index: Optional manifest of the output directory.
+        output_format: "raw" for tab-separated text blocks, "npy" for binary blocks.
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Returns:
+        List of (source, timestamps, values) edge blocks that were not written, in member
+        order. The source is "<archive>.zip:<member>", as recorded for the interior blocks.
+    """
+    edges = []
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for member in sorted(zip_ref.infolist(), key=lambda m: m.filename):
+            if member.is_dir() or not member.filename.endswith('.dat'):
+                continue
+            source_name = f"{os.path.basename(zip_path)}:{member.filename}"
+            with zip_ref.open(member) as stream:
+                if not stream.peek(6).startswith(b'"TOA5"'):
+                    logging.warning(f"Skipping {source_name}: not a TOA5 file")
+                    continue
+                logging.info(f"Processing member: {source_name}")
+                count('bytes_in', member.compress_size)
+                edges.extend(split_file_vectorized(stream, output_directory, site_name, block_size, keep_edges=keep_edges, 
+                                                   index=index, output_format=output_format, source_name=source_name, 
+                                                   block_minutes=block_minutes))
+    return edges
+
+def split_path_vectorized(file_path: str, output_directory: str, site_name: str, block_size: int, keep_edges: bool = False, index: Optional[BlockIndex] = None, output_format: str = "raw", block_minutes: int = 30) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """Split a .dat file, or the .dat members of a .zip archive, with the vectorized engine."""
+    if file_path.endswith('.zip'):
+        return split_zip_vectorized(file_path, output_directory, site_name, block_size, keep_edges, index, output_format, block_minutes)
+    return split_file_vectorized(file_path, output_directory, site_name, block_size, keep_edges, index, output_format, block_minutes=block_minutes)
+
+def _init_worker(log_queue, log_level: int = logging.INFO, profiling: Tuple[Optional[str], str] = (None, '.'), compression: Compression = Compression()) -> None:
+    """Send the log records of a worker process to the central log queue at the parent's level and apply the profiling and compression settings."""
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(log_level)
+    configure_profiling(*profiling)
+    configure_compression(*compression)
+
+def _split_worker(file_path: str, output_directory: str, site_name: str, block_size: int, use_index: bool, output_format: str, block_minutes: int) -> Tuple[str, List[Tuple[str, np.ndarray, np.ndarray]], Optional[str], dict]:
+    """Split one file in a worker process and hand its edge blocks and metrics back to the parent."""
+    logging.info(f"Processing file: {file_path}")
+    metrics = Metrics()
+    previous = set_metrics(metrics)
+    index = BlockIndex(output_directory) if use_index else None
+    try:
+        with track_file(file_path):
+            edges = split_path_vectorized(file_path, output_directory, site_name, block_size, keep_edges=True, index=index, 
+                                          output_format=output_format, block_minutes=block_minutes)
+        return file_path, edges, None, metrics.to_dict()
+    except Exception:
+        return file_path, [], traceback.format_exc(), metrics.to_dict()
+    finally:
+        set_metrics(previous)
+        if index is not None:
+            index.close()
+
+@contextmanager
+def worker_pool(workers: int) -> Iterator[ProcessPoolExecutor]:
+    """Start a pool of worker processes whose log records go to the parent's log handlers.
+    
+    Args:
+        workers: Number of worker processes.
+    
+    Yields:
+        The process pool executor.
+    """
+    with multiprocessing.Manager() as manager:
+        log_queue = manager.Queue()
+        listener = logging.handlers.QueueListener(log_queue, *logging.getLogger().handlers, respect_handler_level=True)
+        listener.start()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(log_queue, logging.getLogger().level, get_profiling(), get_compression())) as executor:
+                yield executor
+        finally:
+            listener.stop()
+
+def submit_jobs(executor: Executor, jobs: Iterable[tuple], max_pending: int, function=_split_worker) -> Iterator[Future]:
+    """Submit jobs to a pool as their futures are consumed and yield the futures in job order.
+    
+    At most max_pending jobs are submitted ahead of the consumer. A future is dropped from
+    the queue when it is handed out, so the edge blocks of files the parent has written are
+    released instead of being held until the last file is done.
+    
+    Args:
+        executor: Pool to submit the jobs to.
+        jobs: Argument tuples of the calls, in the order their results are needed.
+        max_pending: Number of jobs kept in flight ahead of the consumer.
+        function: Callable run for every job, by default the split of one file.
+    
+    Yields:
+        The future of each job, in job order.
+    """
+    pending = deque()
+    for job in jobs:
+        pending.append(executor.submit(function, *job))
+        if len(pending) >= max_pending:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+def submit_files(executor: ProcessPoolExecutor, dat_files: List[str], output_directory: str, site_name: str, block_size: int, max_pending: int, use_index: bool = False, output_format: str = "raw", block_minutes: int = 30) -> Iterator[Future]:
+    """Submit the files to a worker pool as they are collected and yield the futures in file order."""
+    jobs = ((dat_file, output_directory, site_name, block_size, use_index, output_format, block_minutes) for dat_file in dat_files)
+    return submit_jobs(executor, jobs, max_pending)
+
+def merge_edges(edges: Iterable[Tuple[str, np.ndarray, np.ndarray]], block_minutes: int = 30) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+    """Join consecutive edge blocks that belong to the same block.
+    
+    A block that spans two files arrives as the last edge of one file and the first edge
+    of the next. Joining them in memory means the block is written once instead of
+    written and then appended to. Only one block is held at a time.
+    
+    Args:
+        edges: (source, timestamps, values) edge blocks in file order.
+        block_minutes: Block length in minutes, dividing an hour.
+    
+    Yields:
+        (sources, timestamps, values) blocks, with the sources comma-separated.
+    """
+    held = None
+    for source, timestamps, values in edges:
+        if held is not None and block_numbers(held[1][0], block_minutes) == block_numbers(timestamps[0], block_minutes):
+            held = (join_sources(held[0], source), np.concatenate((held[1], timestamps)), np.concatenate((held[2], values)))
+            continue
+        if held is not None:
+            yield held
+        held = (source, timestamps, values)
+    if held is not None:
+        yield held
+
+def write_edges(edges: Iterable[Tuple[str, np.ndarray, np.ndarray]], output_directory: str, site_name: str, block_size: int, index: Optional[BlockIndex] = None, output_format: str = "raw", block_minutes: int = 30) -> None:
+    """Write edge blocks in file order, joining the parts of blocks that span two files.
+    
+    Parts whose rows the block index already lists in their block are dropped before the
+    parts are joined, so a block completed by a new file only receives the new rows.
+    """
+    if index is not None:
+        edges = (edge for edge in edges
+                 if not skips_rows_of(block_name(edge[1][0], site_name, block_minutes, output_format), edge[0], block_size, index))
+    for source, timestamps, values in merge_edges(edges, block_minutes):
+        write_block(values, timestamps, output_directory, site_name, block_size, index, source, output_format, block_minutes)
+
+def collect_edges(futures: Iterable[Future], output_directory: str, site_name: str, block_size: int, use_index: bool = False, output_format: str = "raw", block_minutes: int = 30) -> None:
+    """Wait for the workers in file order and write the edge blocks they sent back."""
+    def results():
+        for future in futures:
+            dat_file, edges, error, metrics = future.result()
+            get_metrics().merge(metrics)
+            if error is not None:
+                logging.error(f"Error processing {dat_file}:\n{error}")
+                continue
+            yield from edges
+    
+    index = BlockIndex(output_directory) if use_index else None
+    try:
+        write_edges(results(), output_directory, site_name, block_size, index, output_format, block_minutes)
+    finally:
+        if index is not None:
+            index.close()
+
+def split_files_parallel(dat_files: List[str], output_directory: str, site_name: str, block_size: int, workers: int, use_index: bool = False, output_format: str = "raw", block_minutes: int = 30) -> None:
+    """Split .dat files (or zip archives of them) across a pool of worker processes.
+    
+    Workers write the interior blocks of their files. The first and last block of each
+    file can be shared with the neighbouring files, so they are sent back to the parent,
+    which joins the parts of a shared block and writes it in file order. Log records and
+    errors of the workers are collected in the parent's log handlers.
+    
+    Args:
+        dat_files: Sorted list of .dat file or .zip archive paths.
+        output_directory: Directory where the output files will be saved.
+        site_name: Site identifier.
+        block_size: Expected number of lines in a complete block.
+        workers: Number of worker processes.
+        use_index: Keep a block index in the output directory.
+        output_format: "raw" for tab-separated text blocks, "npy" for binary blocks.
+        block_minutes: Block length in minutes, dividing an hour.
+    """
+    with worker_pool(workers) as executor:
+        futures = submit_files(executor, dat_files, output_directory, site_name, block_size, PENDING_PER_WORKER * workers,
+                               use_index, output_format, block_minutes)
+        collect_edges(futures, output_directory, site_name, block_size, use_index, output_format, block_minutes)
+
+def write_block(values: np.ndarray, timestamps: np.ndarray, output_directory: str, site_name: str, block_size: int, index: Optional[BlockIndex] = None, source: str = '', output_format: str = "raw", block_minutes: int = 30) -> None:
+    """Write a parsed block to the output file of the block it belongs to.
+    
+    Args:
+        values: Array of shape (rows, 6) as yielded by iter_blocks.
+        timestamps: Timestamps of the rows in the block (int64 nanoseconds since the epoch).
+        output_directory: Directory where the output file will be saved.
+        site_name: Site identifier.
+        block_size: Expected number of lines in a complete block.
+        index: Optional manifest of the output directory.
+        source: Name of the .dat file the block comes from.
+        output_format: "raw" for a tab-separated text block, "npy" for a binary block.
+        block_minutes: Block length in minutes, dividing an hour.
+    """
+    output_path = os.path.join(output_directory, block_name(timestamps[0], site_name, block_minutes, output_format))
+    if output_format == "npy":
+        write_npy_block(values, timestamps, output_path, block_size, index, source, block_minutes)
+        return
+    
+    outfile, num_lines = open_block_file(output_path, block_size, index, source)
+    if outfile is None:
+        return
+    try:
+        with timer('format'):
+            text = format_block(values)
+        with timer('write'):
+            outfile.write(text)
+        count('bytes_out', len(text))
+    except BaseException:
+        outfile.discard()
+        raise
+    stats = None
+    if index is not None:
+        with timer('stats'):
+            stats = block_statistics(values, block_size, block_minutes)
+    close_block_file(outfile, num_lines + len(values), index, source, stats)
+
+def write_npy_block(values: np.ndarray, timestamps: np.ndarray, output_path: str, block_size: int, index: Optional[BlockIndex] = None, source: str = '', block_minutes: int = 30) -> None:
+    """Write a parsed block as a binary .npy file with the BLOCK_DTYPE layout.
+    
+    Existing blocks are skipped or appended to like .raw blocks, see keep_existing_block.
+    A block that is appended to is loaded, extended with the new rows and written again.
+    
+    Args:
+        values: Array of shape (rows, 6) as yielded by iter_blocks.
+        timestamps: Timestamps of the rows in the block (int64 nanoseconds since the epoch).
+        output_path: Path of the .npy block file.
+        block_size: Expected number of rows in a complete block.
+        index: Optional manifest of the output directory.
+        source: Name of the .dat file the block comes from.
+        block_minutes: Block length in minutes, dividing an hour.
+    """
+    output_filename = os.path.basename(output_path)
+    
+    existing = None
+    with timer('exists'):
+        entry = index.get(output_filename) if index is not None else None
+        absent = index is not None and entry is None and index.lists_all_blocks
+        if entry is not None and entry[0] >= block_size:
+            num_rows = entry[0]
+        elif not absent and os.path.exists(output_path):
+            existing = load_block(output_path)
+            num_rows = len(existing)
+        else:
+            num_rows = 0
+    
+    if keep_existing_block(output_filename, num_rows, block_size, index, source):
+        return
+    
+    with timer('format'):
+        block = np.empty(len(values), dtype=BLOCK_DTYPE)
+        block['timestamp'] = timestamps
+        for column, name in zip(values.T, BLOCK_DTYPE.names[1:]):
+            block[name] = column
+    
+    if existing is not None:
+        logging.info(f"Appending to {output_filename} (incomplete file: {num_rows}/{block_size} rows).")
+        count('blocks_appended')
+        block = np.concatenate((existing, block))
+    if existing is None:
+        logging.info(f"Writing new file {output_filename}")
+        count('blocks_written')
+    with timer('write'):
+        writer = BlockWriter(output_path, new=absent)
+        try:
+            np.save(writer, block)
+        except BaseException:
+            writer.discard()
+            raise
+    if not commit_block(writer, index):
+        return
+    count('bytes_out', block.nbytes)
+    if index is not None:
+        with timer('stats'):
+            stats = block_statistics(values, block_size, block_minutes).finish()
+        with timer('index'):
+            index.record(output_filename, len(block), writer.size, source, stats,
+                         append=existing is not None, checksum=writer.checksum)
+
+def load_block(path: str) -> np.ndarray:
+    """Memory-map a binary .npy block without copying it.
+    
+    Columns are views into the mapped file, e.g. `load_block(path)['col2']`, and the
+    timestamps can be viewed as datetimes with `block['timestamp'].view('datetime64[ns]')`.
+    Compressed blocks (.npy.gz, .npy.zst) cannot be mapped and are decompressed into memory.
+    
+    Args:
+        path: Path of the .npy block file.
+    
+    Returns:
+        Read-only structured array with the BLOCK_DTYPE layout.
+    """
+    codec = codec_of(path)
+    if codec != 'none':
+        with open(path, 'rb') as file:
+            block = np.load(io.BytesIO(decompress(file.read(), codec)))
+        block.flags.writeable = False
+        return block
+    return np.load(path, mmap_mode='r')
+
+def split_file_by_line_count(file_path: str, output_directory: str, site_name: str, block_size: int, frequency: int, index: Optional[BlockIndex] = None, block_minutes: int = 30, pending: Optional[PendingBlock] = None, hold_last: bool = False) -> Optional[PendingBlock]:
+    """Split a .dat file into 30-minute blocks by counting lines.
+    
+    The file is counted first and then read again, assuming rows arrive at exactly
+    `frequency` Hz without gaps. Blocks are formatted and written in chunks of LINE_CHUNK
+    lines, so memory use does not grow with the size of the file.
+    
+    Args:
+        file_path: Path to the TOA5 .dat file.
+        output_directory: Directory where the output files will be saved.
+        site_name: Site identifier.
+        block_size: Expected number of lines in a complete block.
+        frequency: Sampling frequency (samples per second).
+        index: Optional manifest of the output directory.
+        block_minutes: Block length in minutes, dividing an hour.
+        pending: Block held from the previous file. It is joined with the first block of
+            this file if that continues it, and written otherwise.
+        hold_last: Hold the last block of the file in memory if it is incomplete, instead
+            of writing it, so the next file can complete it.
+    
+    Returns:
+        The held last block if `hold_last` is set and the block is incomplete, otherwise None.
+    """
+    dat_file = os.path.basename(file_path)
+    
+    # Get the first timestamp and number of data rows; the reader counts rows without decoding them
+    size = os.path.getsize(file_path)
+    count('bytes_in', size)
+    with timer('count'):
+        initial_date, _, data_lines = summarize_file(file_path) if size else (None, None, 0)
+    count('rows', data_lines)
+    
+    try:
+        if data_lines == 0:
+            logging.warning(f"Skipping empty file: {dat_file}")
+        else:
+            with open_compressed(file_path, 'r') as file:
+                lines = islice(file, HEADER_LINES, None)
+            
+                # Block lengths: the lines until the next 00 or 30-minute mark, full blocks, and the remaining lines
+                if is_on_the_hour_or_half_hour(initial_date, block_minutes):
+                    logging.info(f"{dat_file} starts on 00 or 30 minutes")
+                    block_lengths = []
+                else:
+                    logging.info(f"{dat_file} does not start on 00 or 30 minutes")
+                    next_half_hour_mark, lines_until_next_half_hour = round_to_half_hour_mark(initial_date, frequency, block_minutes)
+                    block_lengths = [int(lines_until_next_half_hour)]
+                line_indicator = sum(block_lengths)
+                full_blocks = max(data_lines - line_indicator, 0) // block_size
+                block_lengths += [block_size] * full_blocks
+                line_indicator += full_blocks * block_size
+                if line_indicator < data_lines:
+                    block_lengths.append(data_lines - line_indicator)
+            
+                for position, length in enumerate(block_lengths):
+                    block_lines = islice(lines, length)
+                    first_line = next(block_lines, None)
+                    if first_line is None:
+                        break  # Stop if EOF
+                    block_lines = chain([first_line], block_lines)
+                    name = format_filename(first_line.split(',')[0].strip('"'), site_name, block_minutes)
+                
+                    held = None
+                    if pending is not None:
+                        if pending.name == name:
+                            held = pending
+                        else:
+                            flush_pending(pending, output_directory, block_size, index, block_minutes)
+                        pending = None
+                    if skips_rows_of(name, dat_file, block_size, index):
+                        # Drain the lines so the file iterator stays in step; only held rows are written
+                        for _ in block_lines:
+                            pass
+                        if held is None:
+                            continue
+                        block_lines, source = [], held.source
+                    else:
+                        source = join_sources(held.source, dat_file) if held is not None else dat_file
+                
+                    if position == len(block_lengths) - 1 and line_indicator < data_lines:
+                        logging.info(f"Processing remaining lines for {dat_file}")
+                    if hold_last and position == len(block_lengths) - 1:
+                        pending = hold_or_write(name, block_lines, block_size, output_directory, index, source, held, block_minutes)
+                    else:
+                        write_text_block(output_directory, name, block_lines, block_size, index, source, held, block_minutes)
+    except BaseException:
+        # Write the block held from the previous file if this file failed before taking it over
+        flush_pending(pending, output_directory, block_size, index, block_minutes)
+        raise
+    
+    if hold_last:
+        return pending
+    flush_pending(pending, output_directory, block_size, index, block_minutes)
+    return None
+
+def split_files_serial(dat_files: List[str], output_directory: str, site_name: str, block_size: int, frequency: int, split_mode: str = "vectorized", index: Optional[BlockIndex] = None, output_format: str = "raw", block_minutes: int = 30) -> None:
+    """Split files one by one, carrying blocks that span two files over in memory.
+    
+    The last block of each file is held until the next file shows whether it continues
+    there, and then written once, so no block is written and later appended to. A file
+    that fails is logged and skipped.
+    
+    Args:
+        dat_files: Sorted list of .dat file (or, in the vectorized mode, .zip archive) paths.
+        output_directory: Directory where the output files will be saved.
+        site_name: Site identifier.
+        block_size: Expected number of lines in a complete block.
+        frequency: Sampling frequency (samples per second), used by the line_count mode.
+        split_mode: "vectorized", "streaming" or "line_count".
+        index: Optional manifest of the output directory.
+        output_format: "raw" or "npy" (vectorized mode only).
+        block_minutes: Block length in minutes, dividing an hour.
+    """
+    if split_mode == "vectorized":
+        def edges():
+            for dat_file in dat_files:
+                logging.info(f"Processing file: {dat_file}")
+                try:
+                    with track_file(dat_file):
+                        file_edges = split_path_vectorized(dat_file, output_directory, site_name, block_size, keep_edges=True, 
+                                                           index=index, output_format=output_format, block_minutes=block_minutes)
+                except Exception as e:
+                    logging.error(f"Error processing {dat_file}: {e}", exc_info=True)
+                    continue
+                yield from file_edges
+        
+        write_edges(edges(), output_directory, site_name, block_size, index, output_format, block_minutes)
+        return
+    
+    pending = None
+    for dat_file in dat_files:
+        logging.info(f"Processing file: {dat_file}")
+        try:
+            with track_file(dat_file):
+                if split_mode == "streaming":
+                    pending = split_file_streaming(dat_file, output_directory, site_name, block_size, index, 
+                                                   block_minutes, pending=pending, hold_last=True)
+                else:
+                    pending = split_file_by_line_count(dat_file, output_directory, site_name, block_size, frequency, index, 
+                                                       block_minutes, pending=pending, hold_last=True)
+        except Exception as e:
+            logging.error(f"Error processing {dat_file}: {e}", exc_info=True)
+            pending = None  # The failed file wrote the held block if it had not taken it over
+    flush_pending(pending, output_directory, block_size, index, block_minutes)
+
+def list_input_files(file_location: str, years: List[int], zip_location: Optional[str] = None, turb_years=range(2014, 2020)) -> List[str]:
+    """List the input files of a site in time order.
+    
+    Args:
+        file_location: Folder with a <year>/TOA5 folder of .dat files per year.
+        years: Years to process.
+        zip_location: Raw zip folder. If given, the zip archives of the years are listed instead.
+        turb_years: Years whose zip files are inside a 'turb' directory.
+    
+    Returns:
+        Sorted list of .dat file (also gzip or zstd compressed, .dat.gz/.dat.zst) or .zip archive paths.
+    """
+    # The folders are listed concurrently, as every listing is a round trip on a network share
+    with ConcurrentIO() as fs:
+        if zip_location is not None:
+            # List the zip archives of every year, in time order
+            year_folders = [folder for _, folder in sorted(find_year_folders(zip_location, years, turb_years, fs))]
+            walked = sorted(fs.walk(year_folders))
+            return [
+            os.path.join(sub_root, file)
+            for folder in year_folders
+            for sub_root, _, files in walked
+            if sub_root == folder or sub_root.startswith(folder + os.sep)
+            for file in files
+            if file.endswith('.zip')
+            ]
+        # List .dat files in the input location including all folders. 
+        listings = fs.listdir_many(os.path.join(file_location, str(year), 'TOA5') for year in years)
+    return [
+    os.path.join(folder, file)
+    for folder, files in listings.items()
+    for file in files
+    if is_dat_file(file)
+    ]
+
+def report_metrics(metrics_path: Optional[str] = None) -> None:
+    """Log a summary of the stage timers and counters of the run and optionally export them.
+    
+    Args:
+        metrics_path: Optional output file, JSON if it ends in .json and Prometheus text otherwise.
+    """
+    metrics = get_metrics()
+    logging.info(f"Run summary:\n{metrics.summary()}")
+    if metrics_path is not None:
+        metrics.export(metrics_path)
+        logging.info(f"Metrics written to {metrics_path}")
+
+def setup_logging(log_filepath: str) -> logging.Handler:
+    """Set up logging for the script.
+    
+    The log file is always added to the root logger. The console handler and the INFO level
+    are only set up if the root logger has no handlers yet, so a long-lived caller that
+    configured logging itself keeps its own handlers and level.
+    
+    Returns:
+        The handler of the log file, which a caller running several jobs removes and closes when a job ends.
+    """
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    root = logging.getLogger()
+    if not root.handlers:
+        root.setLevel(logging.INFO)
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.INFO)
+        console_handler.setFormatter(formatter)
+        root.addHandler(console_handler)
+    
+    file_handler = logging.FileHandler(log_filepath)
+    file_handler.setFormatter(formatter)
+    root.addHandler(file_handler)
+    return file_handler
+      
+
+def split_site(file_location: str, output_directory: str, years: List[int], site_name: str = "speuld", frequency: int = 20, 
+               block_minutes: int = 30, split_mode: str = "vectorized", workers: int = 1, use_index: bool = True, 
+               output_format: str = "raw", zip_location: Optional[str] = None, turb_years=range(2014, 2020)) -> int:
+    """Split the .dat files (or zip archives) of one site into blocks.
+    
+    Logging, profiling and compression are set up by the caller, e.g. main or the
+    ecdataprocessing command line.
+    
+    Args:
+        file_location: Folder with a <year>/TOA5 folder of .dat files per year.
+        output_directory: Directory where the output files will be saved.
+        years: Years to process.
+        site_name: Site identifier.
+        frequency: Data frequency (samples per second).
+        block_minutes: Block length in minutes, any divisor of 60.
+        split_mode: "vectorized", "streaming" or "line_count".
+        workers: Worker processes for the vectorized mode.
+        use_index: Keep a block manifest so reruns skip finished blocks without reading them.
+        output_format: "raw" for tab-separated text blocks, "npy" for binary blocks (vectorized mode only).
+        zip_location: Raw zip folder to split archives directly without extracting them (vectorized mode only).
+        turb_years: Years whose zip files are inside a 'turb' directory.
+    
+    Returns:
+        Number of input files, 0 if there was nothing to split.
+    """
+    check_block_minutes(block_minutes)
+    block_size = block_minutes*60*frequency
+    # Ensure output directory exists
+    os.makedirs(output_directory, exist_ok=True)
+
+    if zip_location is not None and split_mode != "vectorized":
+        logging.error("Splitting zip archives directly needs the vectorized split mode.")
+        return 0
+    dat_files = list_input_files(file_location, years, zip_location, turb_years)
+   
+    # If no files, print error and return
+    if not dat_files:
+        logging.error("No .dat files found in the specified directory.")
+        return 0
+   
+    if split_mode == "vectorized" and workers > 1:
+        split_files_parallel(dat_files = dat_files, 
+                             output_directory = output_directory, 
+                             site_name = site_name, 
+                             block_size = block_size, 
+                             workers = workers, 
+                             use_index = use_index, 
+                             output_format = output_format, 
+                             block_minutes = block_minutes)
+        return len(dat_files)
+    
+    index = BlockIndex(output_directory) if use_index else None
+    try:
+        # Process the files one by one
+        split_files_serial(dat_files = dat_files, 
+                           output_directory = output_directory, 
+                           site_name = site_name, 
+                           block_size = block_size, 
+                           frequency = frequency, 
+                           split_mode = split_mode, 
+                           index = index, 
+                           output_format = output_format, 
+                           block_minutes = block_minutes)
+    finally:
+        if index is not None:
+            index.close()
+    return len(dat_files)
+
+def main():
+    """Main function to process all .dat files in the specified directory."""
+    file_location = '/Volumes/ITC/WRS/Group/speuldpro_praj/'
+    output_directory = '/Volumes/ITC/WRS/Group/speuldpro_praj/30mins_files'
+    years = list(range(2012, 2020))
+    #list all .dat files in the directory 
+    
+    # file_location = "/Users/prajzwal/PhD/TOA5/"
+    # output_directory = "/Users/prajzwal/PhD/30mins_files/2010"
+    # Set up logging
+    os.makedirs(output_directory, exist_ok=True)
+    log_filepath = os.path.join(output_directory, f'processing_{years[0]}_{years[-1]}.log')
+    setup_logging(log_filepath)
+    logging.info("Starting file processing...")
+    
+    frequency = 20  # Data frequency (samples per second)
+    time_block = 30  # Block length in minutes, any divisor of 60 (e.g. 10, 15, 30, 60)
+    site_name = "speuld"
+    split_mode = "vectorized"  # "vectorized", "streaming" or "line_count"
+    workers = os.cpu_count() or 1  # Worker processes for the vectorized mode
+    use_index = True  # Keep a block manifest so reruns skip finished blocks without reading them
+    output_format = "raw"  # "raw" for tab-separated text blocks, "npy" for binary blocks (vectorized mode only)
+    zip_location = None  # Raw zip folder to split archives directly without extracting them (vectorized mode only)
+    turb_years = range(2014, 2020)  # Years whose zip files are inside a 'turb' directory
+    metrics_path = None  # e.g. os.path.join(output_directory, 'metrics.json'), or a .prom file for Prometheus text
+    profile_pattern = None  # e.g. '*2015_06_01*' to run matching files under cProfile and tracemalloc
+    compression = "none"  # "gzip" or "zstd" to write compressed blocks (.raw.gz, .raw.zst); zstd needs the zstandard package
+    compression_level = None  # None for the codec's default (gzip 6, zstd 3)
+    compression_threads = 0  # Compression threads per writer, -1 for one per core; useful with few worker processes
+    # Several sites or settings can be processed in one run with batch_split.py, and all
+    # settings are options of the command line: python -m ecdataprocessing split --help
+
+    configure_profiling(profile_pattern, os.path.join(output_directory, 'profiles'))
+    configure_compression(compression, compression_level, compression_threads)
+    if split_site(file_location, output_directory, years, site_name, frequency, time_block, split_mode, workers, 
+                  use_index, output_format, zip_location, turb_years):
+        report_metrics(metrics_path)
+                        
+                
+if __name__ == "__main__":
+    main()
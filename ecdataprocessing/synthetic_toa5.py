@@ -0,0 +1,161 @@
+import os
+import csv
+import zipfile
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List, Sequence
+from .timestamps import parse_timestamp, NANOSECONDS_PER_SECOND
+
+# Purpose: Generate realistic synthetic TOA5 .dat files and zipped archives for benchmarks.
+#          Files are written in the layout the other scripts expect:
+#            <root>/TOA5_tree/<year>/TOA5/*.dat      (input of checktime and split_30mins_file)
+#            <root>/zips/<year>[/turb]/*.zip         (input of unzipfiles)
+#          The data has NAN bursts and gaps, and files start at an arbitrary minute.
+#
+# Usage:   python -m ecdataprocessing.synthetic_toa5 /tmp/synthetic --days 2 --start "2012-01-01 00:17:00"
+
+HEADER = [
+    '"TOA5","speuld","CR3000","1","CR3000.Std","CPU:ec.CR3","1","ts_data"',
+    '"TIMESTAMP","RECORD","Ux","Uy","Uz","Ts","diag","co2","h2o"',
+    '"TS","RN","m/s","m/s","m/s","C","","mg/m3","g/m3"',
+    '"","","Smp","Smp","Smp","Smp","Smp","Smp","Smp"',
+]
+# Mean and standard deviation of the data columns Ux, Uy, Uz, Ts, diag, co2, h2o
+COLUMN_MEANS = np.array([1.5, 0.2, 0.0, 12.0, 0.0, 720.0, 8.0])
+COLUMN_STDS = np.array([1.0, 1.0, 0.3, 0.5, 0.0, 15.0, 0.8])
+
+def timestamp_strings(times: np.ndarray) -> np.ndarray:
+    """Format int64 nanoseconds as TOA5 timestamps: "YYYY-MM-DD HH:MM:SS" plus a fraction without trailing zeros."""
+    seconds = times // NANOSECONDS_PER_SECOND
+    fractions = times % NANOSECONDS_PER_SECOND
+    base = np.char.replace(np.datetime_as_string(seconds.astype('datetime64[s]')), 'T', ' ')
+    # A fixed frequency has only a few distinct fractions, so they are formatted once
+    unique, inverse = np.unique(fractions, return_inverse=True)
+    suffixes = np.array([f"{fraction / NANOSECONDS_PER_SECOND:.9f}"[1:].rstrip('0').rstrip('.') for fraction in unique])
+    return np.char.add(np.char.add('"', np.char.add(base, suffixes[inverse])), '"')
+
+def synthetic_rows(rows: int, rng: np.random.Generator, nan_bursts: int = 3, max_nan_burst: int = 200) -> np.ndarray:
+    """Return a (rows, 7) array of sensor values with a few bursts of NAN."""
+    values = rng.normal(COLUMN_MEANS, COLUMN_STDS, size=(rows, len(COLUMN_MEANS)))
+    values = np.round(values, 4)  # a few decimals, like the logger output
+    values[:, 4] = 0.0  # diagnostic word
+    for _ in range(nan_bursts if rows else 0):
+        start = int(rng.integers(0, rows))
+        length = int(rng.integers(1, max_nan_burst + 1))
+        columns = rng.choice(len(COLUMN_MEANS), size=int(rng.integers(1, 4)), replace=False)
+        values[start:start + length, columns] = np.nan
+    return values
+
+def write_toa5(path: str, start: str, rows: int, frequency: int = 20, nan_bursts: int = 3, gaps: int = 1,
+               max_gap_seconds: int = 120, seed: int = 0, newline: str = '\n', chunk_rows: int = 500_000) -> int:
+    """Write one synthetic TOA5 .dat file.
+
+    Args:
+        path: Output path.
+        start: Timestamp of the first row, "YYYY-MM-DD HH:MM:SS".
+        rows: Number of sample slots in the file, before gaps are cut out.
+        frequency: Sampling frequency (samples per second).
+        nan_bursts: Number of NAN bursts in the file.
+        gaps: Number of gaps (runs of missing rows) in the file.
+        max_gap_seconds: Longest gap in seconds.
+        seed: Seed of the random generator.
+        newline: Line terminator, '\\r\\n' for files as written by the logger.
+        chunk_rows: Rows formatted at a time, bounding the memory use.
+
+    Returns:
+        Number of data rows written.
+    """
+    rng = np.random.default_rng(seed)
+    period = NANOSECONDS_PER_SECOND // frequency
+    keep = np.ones(rows, dtype=bool)
+    for _ in range(gaps if rows else 0):
+        gap_start = int(rng.integers(1, max(rows, 2)))
+        keep[gap_start:gap_start + int(rng.integers(1, max_gap_seconds * frequency + 1))] = False
+    slots = np.flatnonzero(keep)
+    first = parse_timestamp(start)
+
+    with open(path, 'w', newline='') as file:
+        file.write(newline.join(HEADER) + newline)
+        for offset in range(0, len(slots), chunk_rows):
+            chunk = slots[offset:offset + chunk_rows]
+            frame = pd.DataFrame(synthetic_rows(len(chunk), rng, -(-nan_bursts * len(chunk) // len(slots))))
+            frame.insert(0, 'record', chunk)
+            frame.insert(0, 'timestamp', timestamp_strings(first + chunk * period))
+            # Timestamps are quoted already; NAN is written quoted, as the logger does
+            frame.to_csv(file, header=False, index=False, quoting=csv.QUOTE_NONE, na_rep='"NAN"',
+                         lineterminator=newline)
+    return len(slots)
+
+def generate_dataset(root: str, days: float = 1.0, start: str = "2012-01-01 00:17:00", frequency: int = 20,
+                     file_hours: float = 6.0, zip_files: bool = True, turb_years: Sequence[int] = range(2014, 2020),
+                     seed: int = 0, **options) -> dict:
+    """Write a synthetic data set of consecutive .dat files and, optionally, their zip archives.
+
+    Args:
+        root: Folder receiving the TOA5_tree and zips folders.
+        days: Length of the data set in days.
+        start: Timestamp of the first row. Every file starts at the same minute past the hour.
+        frequency: Sampling frequency (samples per second).
+        file_hours: Hours of data per file.
+        zip_files: Also write one zip archive per file.
+        turb_years: Years whose zip files go into a 'turb' directory.
+        seed: Seed of the random generator.
+        **options: Further arguments of write_toa5, e.g. nan_bursts or gaps.
+
+    Returns:
+        Description of the data set: folders, years, files, rows and bytes.
+    """
+    dat_root = os.path.join(root, 'TOA5_tree')
+    zip_root = os.path.join(root, 'zips')
+    rows_per_file = int(file_hours * 3600 * frequency)
+    total_rows = int(days * 86400 * frequency)
+    first = parse_timestamp(start)
+
+    dat_files: List[str] = []
+    rows = 0
+    for number, offset in enumerate(range(0, total_rows, rows_per_file)):
+        file_start = pd.Timestamp(first + offset * (NANOSECONDS_PER_SECOND // frequency))
+        year_folder = os.path.join(dat_root, str(file_start.year), 'TOA5')
+        os.makedirs(year_folder, exist_ok=True)
+        path = os.path.join(year_folder, f"TOA5_speuld.ts_data_{file_start:%Y_%m_%d_%H%M}.dat")
+        rows += write_toa5(path, f"{file_start:%Y-%m-%d %H:%M:%S}", min(rows_per_file, total_rows - offset),
+                           frequency=frequency, seed=seed + number, **options)
+        dat_files.append(path)
+
+        if zip_files:
+            year = file_start.year
+            zip_folder = os.path.join(zip_root, str(year), 'turb') if year in turb_years else os.path.join(zip_root, str(year))
+            os.makedirs(zip_folder, exist_ok=True)
+            with zipfile.ZipFile(os.path.join(zip_folder, os.path.basename(path)[:-4] + '.zip'), 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.write(path, os.path.basename(path))
+
+    return {
+        'dat_root': dat_root,
+        'zip_root': zip_root if zip_files else None,
+        'years': sorted({int(os.path.basename(os.path.dirname(os.path.dirname(path)))) for path in dat_files}),
+        'files': dat_files,
+        'rows': rows,
+        'bytes': sum(os.path.getsize(path) for path in dat_files),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic TOA5 .dat files and zip archives.")
+    parser.add_argument('root', help="output folder")
+    parser.add_argument('--days', type=float, default=1.0, help="length of the data set in days")
+    parser.add_argument('--start', default="2012-01-01 00:17:00", help="timestamp of the first row")
+    parser.add_argument('--frequency', type=int, default=20, help="samples per second")
+    parser.add_argument('--file-hours', type=float, default=6.0, help="hours of data per file")
+    parser.add_argument('--nan-bursts', type=int, default=3, help="NAN bursts per file")
+    parser.add_argument('--gaps', type=int, default=1, help="gaps per file")
+    parser.add_argument('--no-zip', action='store_true', help="do not write zip archives")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    dataset = generate_dataset(args.root, days=args.days, start=args.start, frequency=args.frequency,
+                               file_hours=args.file_hours, zip_files=not args.no_zip, seed=args.seed,
+                               nan_bursts=args.nan_bursts, gaps=args.gaps)
+    print(f"Wrote {len(dataset['files'])} files, {dataset['rows']} rows, {dataset['bytes'] / 1e6:.1f} MB to {args.root}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Sequence, Union
+
+# Purpose: Fast parsing of TOA5 timestamps ("YYYY-MM-DD HH:MM:SS[.f]", optionally quoted)
+#          into int64 nanoseconds since the epoch. The strings are viewed as a byte matrix
+#          and every field is read from its fixed offset with NumPy, so a whole column is
+#          parsed without strptime or a Python loop. Times are naive, like the logger clock.
+
+NANOSECONDS_PER_SECOND = 1_000_000_000
+NANOSECONDS_PER_MINUTE = 60 * NANOSECONDS_PER_SECOND
+EPOCH = datetime(1970, 1, 1)
+
+# Offsets of the fields in "YYYY-MM-DD HH:MM:SS.fffffffff"
+_SEPARATORS = {4: b'-', 7: b'-', 13: b':', 16: b':'}
+_FRACTION_START = 20
+_FRACTION_DIGITS = 9
+_WIDTH = _FRACTION_START + _FRACTION_DIGITS
+
+def _byte_matrix(values) -> np.ndarray:
+    """Return the timestamps as an (n, _WIDTH) uint8 matrix with surrounding quotes removed."""
+    array = np.asarray(values)
+    if array.dtype.kind != 'S':
+        array = array.astype('S')
+    width = max(array.dtype.itemsize, _WIDTH + 1)
+    matrix = np.zeros((len(array), width), dtype=np.uint8)
+    matrix[:, :array.dtype.itemsize] = array.view(np.uint8).reshape(len(array), array.dtype.itemsize)
+    # Shift quoted timestamps one byte to the left
+    quoted = matrix[:, 0] == ord('"')
+    if quoted.any():
+        matrix[quoted, :-1] = matrix[quoted, 1:]
+        matrix[quoted, -1] = 0
+    return matrix[:, :_WIDTH]
+
+def _number(digits: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Read the decimal number at fixed byte offsets [start, end) of every row."""
+    number = digits[:, start].astype(np.int64)
+    for column in range(start + 1, end):
+        number = number * 10 + digits[:, column]
+    return number
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 of proleptic Gregorian dates (H. Hinnant's algorithm)."""
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+def parse_timestamps(values: Union[Sequence[str], np.ndarray]) -> np.ndarray:
+    """Parse TOA5 timestamp strings into int64 nanoseconds since the epoch.
+
+    Args:
+        values: Timestamp strings (or bytes) in the format "YYYY-MM-DD HH:MM:SS[.f]",
+            with or without surrounding quotes. Fractions of up to nine digits are kept.
+
+    Returns:
+        Array of int64 nanoseconds since 1970-01-01 00:00:00.
+
+    Raises:
+        ValueError: If a timestamp does not have the expected layout.
+    """
+    matrix = _byte_matrix(values)
+    if len(matrix) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Digits become 0-9, every other byte wraps around to a value above 9
+    digits = matrix - np.uint8(ord('0'))
+    digit_columns = [c for c in range(19) if c not in _SEPARATORS and c != 10]
+    valid = (digits[:, digit_columns] < 10).all(axis=1)
+    for column, separator in _SEPARATORS.items():
+        valid &= matrix[:, column] == ord(separator)
+    valid &= (matrix[:, 10] == ord(' ')) | (matrix[:, 10] == ord('T'))
+    if not valid.all():
+        bad = np.asarray(values)[np.argmin(valid)]
+        raise ValueError(f"Unrecognized date format: {bad}")
+
+    days = _days_from_civil(_number(digits, 0, 4), _number(digits, 5, 7), _number(digits, 8, 10))
+    seconds = ((days * 24 + _number(digits, 11, 13)) * 60 + _number(digits, 14, 16)) * 60 + _number(digits, 17, 19)
+
+    # Fraction digits run from offset 20 until the first non-digit (end of string or quote)
+    fraction = digits[:, _FRACTION_START:_WIDTH]
+    is_digit = np.zeros((len(matrix), _FRACTION_DIGITS + 1), dtype=bool)
+    is_digit[:, :-1] = fraction < 10
+    length = np.where(matrix[:, 19] == ord('.'), np.argmin(is_digit, axis=1), 0)
+    nanoseconds = np.zeros(len(matrix), dtype=np.int64)
+    for column in range(_FRACTION_DIGITS):
+        nanoseconds = nanoseconds * 10 + np.where(column < length, fraction[:, column], 0)
+
+    return seconds * NANOSECONDS_PER_SECOND + nanoseconds
+
+def parse_timestamp(value: str) -> int:
+    """Parse a single TOA5 timestamp string into int nanoseconds since the epoch."""
+    return int(parse_timestamps([value])[0])
+
+def floor_to_block(nanoseconds: Union[int, np.ndarray], block_minutes: int = 30) -> Union[int, np.ndarray]:
+    """Round times down to the start of their block, e.g. HH:00 or HH:30 for 30-minute blocks."""
+    block = block_minutes * NANOSECONDS_PER_MINUTE
+    return nanoseconds - nanoseconds % block
+
+def block_numbers(nanoseconds: np.ndarray, block_minutes: int = 30) -> np.ndarray:
+    """Return the number of the block every time falls in, counted from the epoch."""
+    return nanoseconds // (block_minutes * NANOSECONDS_PER_MINUTE)
+
+def to_datetime(nanoseconds: int) -> datetime:
+    """Convert nanoseconds since the epoch to a naive datetime (microsecond precision)."""
+    return EPOCH + timedelta(microseconds=int(nanoseconds) // 1000)
+
+def format_block_key(nanoseconds: int, block_minutes: int = 30) -> str:
+    """Return the block key "YYYY-MM-DD_HHMM" of the block containing a time."""
+    return to_datetime(floor_to_block(int(nanoseconds), block_minutes)).strftime('%Y-%m-%d_%H%M')
@@ -0,0 +1,148 @@
+import os
+import mmap
+from typing import Optional, Tuple
+from .compressed_io import codec_of, open_compressed
+
+# Purpose: Summaries of TOA5 .dat files for the inventory and the line-count splitter. The
+#          file is memory-mapped and the header is parsed once, so the first and last row
+#          are read without scanning the file and rows are counted without decoding them.
+
+HEADER_LINES = 4
+
+class TOA5Reader:
+    """Memory-mapped reader for a TOA5 .dat file.
+
+    TOA5 rows are written in time order, so the first and last data line give the time
+    range of the file.
+
+    Example:
+        with TOA5Reader(path) as reader:
+            first, last, rows = reader.first_timestamp, reader.last_timestamp, reader.row_count()
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            if self.size == 0:
+                raise ValueError("File is empty.")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+        # Parse the header once
+        self.header = []
+        offset = 0
+        for _ in range(HEADER_LINES):
+            end = self._line_end(offset)
+            self.header.append(self._map[offset:end].decode().rstrip('\r'))
+            offset = min(end + 1, self.size)
+        self.data_offset = offset
+        self.columns = [name.strip('"') for name in self.header[1].split(',')] if len(self.header) > 1 else []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def _line_end(self, offset: int) -> int:
+        """Return the offset of the newline ending the line at `offset`, or the file size."""
+        end = self._map.find(b'\n', offset)
+        return self.size if end == -1 else end
+
+    def _line_start(self, offset: int) -> int:
+        """Return the offset where the data line containing `offset` starts."""
+        return max(self._map.rfind(b'\n', self.data_offset, offset) + 1, self.data_offset)
+
+    def _data_end(self) -> int:
+        """Return the offset after the last non-empty data line."""
+        end = self.size
+        while end > self.data_offset and self._map[end - 1:end] in (b'\n', b'\r'):
+            end -= 1
+        return end
+
+    def line_at(self, offset: int) -> str:
+        """Return the data line starting at byte `offset`, without its newline."""
+        return self._map[offset:self._line_end(offset)].decode().rstrip('\r')
+
+    def timestamp_at(self, offset: int) -> str:
+        """Return the timestamp of the data line starting at byte `offset`."""
+        return self._map[offset:self._line_end(offset)].split(b',', 1)[0].strip(b'"').decode()
+
+    @property
+    def first_timestamp(self) -> Optional[str]:
+        """Timestamp of the first data row, or None if the file has no data rows."""
+        if self._data_end() <= self.data_offset:
+            return None
+        return self.timestamp_at(self.data_offset)
+
+    @property
+    def last_timestamp(self) -> Optional[str]:
+        """Timestamp of the last data row, or None if the file has no data rows."""
+        end = self._data_end()
+        if end <= self.data_offset:
+            return None
+        return self.timestamp_at(self._line_start(end - 1))
+
+    def row_count(self, chunk_size: int = 16 * 1024 * 1024) -> int:
+        """Count the data rows by counting newlines in the mapped file."""
+        end = self._data_end()
+        if end <= self.data_offset:
+            return 0
+        newlines = sum(self._map[offset:min(offset + chunk_size, end)].count(b'\n')
+                       for offset in range(self.data_offset, end, chunk_size))
+        return newlines + 1
+
+def summarize_stream(stream, chunk_size: int = 16 * 1024 * 1024, tail_size: int = 64 * 1024) -> Tuple[Optional[str], Optional[str], int]:
+    """Return the first and last timestamp and the row count of a TOA5 file read as a stream.
+
+    Compressed files cannot be memory-mapped or searched, so they are read once from start to
+    end; only the last `tail_size` bytes are kept to find the last row.
+
+    Args:
+        stream: Binary stream of the TOA5 file, e.g. from compressed_io.open_compressed.
+
+    Returns:
+        The same values as TOA5Reader's first_timestamp, last_timestamp and row_count().
+    """
+    for _ in range(HEADER_LINES):
+        stream.readline()
+    first = stream.readline()
+    if not first.strip(b'\r\n'):
+        return None, None, 0
+    newlines = first.count(b'\n')
+    tail = first
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        newlines += chunk.count(b'\n')
+        tail = (tail + chunk)[-tail_size:]
+    data = tail.rstrip(b'\r\n')
+    newlines -= tail[len(data):].count(b'\n')
+    last = data[data.rfind(b'\n') + 1:]
+    def timestamp(line: bytes) -> str:
+        return line.split(b',', 1)[0].strip(b'"').decode()
+    return timestamp(first), timestamp(last), newlines + 1
+
+def summarize_file(file_path: str) -> Tuple[Optional[str], Optional[str], int]:
+    """Return the first and last timestamp and the row count of a TOA5 file.
+
+    Plain files are memory-mapped; compressed files (.dat.gz, .dat.zst) cannot be searched,
+    so they are decompressed once from start to end.
+
+    Args:
+        file_path: Path to the TOA5 .dat file, compressed or not.
+
+    Returns:
+        The first and last timestamp (None if the file has no data rows) and the row count.
+    """
+    if codec_of(file_path) != 'none':
+        with open_compressed(file_path) as stream:
+            return summarize_stream(stream)
+    with TOA5Reader(file_path) as reader:
+        return reader.first_timestamp, reader.last_timestamp, reader.row_count()
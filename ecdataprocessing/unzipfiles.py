@@ -0,0 +1,193 @@
+import os
+import shutil
+import sqlite3
+import zipfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .instrumentation import timer, count, track_file, get_metrics
+from .concurrent_io import ConcurrentIO, WRITE_BUFFER_SIZE
+
+MANIFEST_FILENAME = 'extraction_manifest.sqlite'
+COPY_BUFFER_SIZE = 1024 * 1024
+
+class ExtractionManifest:
+    """Record of the zip members extracted into a destination folder.
+
+    Each member is stored with its size and CRC, so a rerun can tell whether a member is
+    already extracted without touching the destination folder. The connection is shared
+    between the extraction threads and guarded by a lock.
+    """
+
+    def __init__(self, destination_folder, filename=MANIFEST_FILENAME):
+        self.path = os.path.join(destination_folder, filename)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS members ("
+                "name TEXT PRIMARY KEY, size INTEGER NOT NULL, crc INTEGER NOT NULL, archive TEXT NOT NULL)"
+            )
+
+    def is_extracted(self, member):
+        with self.lock:
+            row = self.connection.execute("SELECT size, crc FROM members WHERE name = ?", (member.filename,)).fetchone()
+        return row == (member.file_size, member.CRC)
+
+    def record(self, member, archive):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO members (name, size, crc, archive) VALUES (?, ?, ?, ?)",
+                (member.filename, member.file_size, member.CRC, archive)
+            )
+
+    def close(self):
+        self.connection.close()
+
+def find_year_folders(source_dir, years, turb_years, fs=None):
+    # Return (year, folder with the zip files) for every year directory in the source tree.
+    # The tree is listed level by level with concurrent listings; pass a ConcurrentIO to reuse its threads
+    if fs is None:
+        with ConcurrentIO() as fs:
+            return find_year_folders(source_dir, years, turb_years, fs)
+    year_folders = []
+    for root, dirs, _ in fs.walk([source_dir]):
+        for dir_name in dirs:
+            if dir_name.isdigit() and int(dir_name) in years:
+                if int(dir_name) in turb_years:
+                    # For these years the zip files are inside the 'turb' directory
+                    year_folders.append((dir_name, os.path.join(root, dir_name, 'turb')))
+                else:
+                    year_folders.append((dir_name, os.path.join(root, dir_name)))
+    return year_folders
+
+def member_destination(member, destination_folder):
+    # Return the destination path of a member, or None if it would land outside the folder
+    path = os.path.normpath(os.path.join(destination_folder, member.filename))
+    if os.path.isabs(member.filename) or not path.startswith(os.path.normpath(destination_folder) + os.sep):
+        return None
+    return path
+
+def extract_zip(zip_file_path, destination_folder, manifest):
+    # Stream the members that are not extracted yet into the destination folder.
+    # Returns the number of members written.
+    written = 0
+    with track_file(zip_file_path), zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+        for member in zip_ref.infolist():
+            if member.is_dir():
+                continue
+            with timer('exists'):
+                extracted = manifest.is_extracted(member)
+            if extracted:
+                count('members_skipped')
+                continue
+
+            destination = member_destination(member, destination_folder)
+            if destination is None:
+                raise ValueError(f'Unsafe member path {member.filename}')
+
+            # Files extracted before the manifest existed are recognised by their size
+            with timer('exists'):
+                try:
+                    # One stat instead of an isfile and a getsize, each a round trip on a share
+                    present = os.path.getsize(destination) == member.file_size
+                except OSError:
+                    present = False
+            if present:
+                with timer('index'):
+                    manifest.record(member, zip_file_path)
+                count('members_skipped')
+                continue
+
+            # Write to a temporary name first, so an interrupted run never leaves a truncated file
+            with timer('extract'):
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                temporary = destination + '.part'
+                with zip_ref.open(member) as source, open(temporary, 'wb', buffering=WRITE_BUFFER_SIZE) as target:
+                    shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+                os.replace(temporary, destination)
+            with timer('index'):
+                manifest.record(member, zip_file_path)
+            count('members_extracted')
+            count('bytes_in', member.compress_size)
+            count('bytes_out', member.file_size)
+            written += 1
+    return written
+
+def unzip_all_files(source_dir, destination_base_folder, years=range(2010, 2013), turb_years=range(2014, 2020), workers=8):
+    # Check if the source directory exists
+    if not os.path.isdir(source_dir):
+        raise Exception('Source directory does not exist.')
+
+    jobs = []
+    manifests = {}
+    error_logs = {}
+    with ConcurrentIO() as fs:
+        year_folders = find_year_folders(source_dir, years, turb_years, fs)
+        # All year folders are listed concurrently
+        walked = sorted(fs.walk(year_dir_path for _, year_dir_path in year_folders))
+    for year, year_dir_path in year_folders:
+        # Define the specific destination folder for the current year
+        year_destination_folder = os.path.join(destination_base_folder, year, 'TOB')
+        os.makedirs(year_destination_folder, exist_ok=True)
+
+        if year_destination_folder not in manifests:
+            manifests[year_destination_folder] = ExtractionManifest(year_destination_folder)
+
+            # File to log the errors, kept across runs with a header per run
+            error_log_file = os.path.join(year_destination_folder, 'error_log.txt')
+            with open(error_log_file, 'a') as log:
+                log.write(f'\nError Log {datetime.now():%Y-%m-%d %H:%M:%S}\n')
+                log.write('=========\n\n')
+            error_logs[year_destination_folder] = error_log_file
+
+        for sub_root, _, files in walked:
+            if sub_root == year_dir_path or sub_root.startswith(year_dir_path + os.sep):
+                for file in files:
+                    if file.endswith('.zip'):
+                        jobs.append((os.path.join(sub_root, file), year_destination_folder))
+
+    log_lock = threading.Lock()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(extract_zip, zip_file_path, destination, manifests[destination]): (zip_file_path, destination)
+                for zip_file_path, destination in jobs
+            }
+            for future in as_completed(futures):
+                zip_file_path, destination = futures[future]
+                try:
+                    if future.result():
+                        print(f'Unzipped: {zip_file_path}')
+                    else:
+                        print(f'Skipping already unzipped file: {zip_file_path}')
+                except Exception as e:
+                    # Log the error to the error log file
+                    with log_lock, open(error_logs[destination], 'a') as log:
+                        log.write(f'Failed to unzip {zip_file_path}: {e}\n')
+                    print(f'Error unzipping {zip_file_path}. Check {error_logs[destination]} for details.')
+    finally:
+        for manifest in manifests.values():
+            manifest.close()
+
+    print(f'All .zip files have been processed. Errors, if any, are logged in the respective year folders.')
+
+def main():
+    # Define the source and destination base folders
+    source_folder = '/Volumes/Group/Siteswrs/Speuld/data/1_raw/old'
+    destination_base_folder = '/Volumes/Group/speuldpro_praj'
+    years = range(2010, 2013)  # just for remaining years
+    turb_years = range(2014, 2020)  # years whose zip files are inside a 'turb' directory
+    workers = 8  # concurrent archives, the share is latency bound
+    metrics_path = None  # e.g. 'unzip_metrics.json', or a .prom file for Prometheus text
+
+    # Call the function
+    unzip_all_files(source_folder, destination_base_folder, years=years, turb_years=turb_years, workers=workers)
+
+    # Time spent per stage and bytes moved; with several threads the stage times add up to more than the run
+    print(get_metrics().summary())
+    if metrics_path is not None:
+        get_metrics().export(metrics_path)
+
+if __name__ == "__main__":
+    main()
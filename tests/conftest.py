@@ -0,0 +1,15 @@
+import pytest
+from toa5files import toa5_lines, write_lines
+
+@pytest.fixture
+def make_dat(tmp_path):
+    """Write a .dat file under tmp_path, e.g. make_dat('a.dat', '2012-01-01 00:17:00', 7200)."""
+    def make(name: str, start: str, rows: int, newline: str = '\n', **options) -> str:
+        return write_lines(str(tmp_path / name), toa5_lines(start, rows, **options), newline)
+    return make
+
+@pytest.fixture
+def output_directory(tmp_path):
+    path = tmp_path / 'out'
+    path.mkdir()
+    return str(path)
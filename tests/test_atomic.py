@@ -0,0 +1,118 @@
+import logging
+import os
+import stat
+import threading
+import zlib
+import pytest
+from toa5files import BLOCK_SIZE, SITE, expected_blocks, read_blocks
+from ecdataprocessing import split_30mins_file
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.split_30mins_file import BLOCK_FILE_MODE, TEMPORARY_SUFFIX, BlockWriter, count_lines, split_file_vectorized, split_files_parallel
+
+def test_block_writer_replaces_the_block_only_on_commit(tmp_path):
+    path = str(tmp_path / 'block.raw')
+    with open(path, 'w') as file:
+        file.write('old\n')
+    writer = BlockWriter(path)
+    writer.write('new\n')
+    writer.discard()
+    assert open(path).read() == 'old\n' and os.listdir(tmp_path) == ['block.raw']
+
+    writer = BlockWriter(path, existing=b'old\n')
+    writer.write('new\n')
+    assert open(path).read() == 'old\n'
+    writer.commit()
+    assert open(path).read() == 'old\nnew\n' and os.listdir(tmp_path) == ['block.raw']
+    assert writer.checksum == zlib.crc32(b'old\nnew\n') and writer.size == 8
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_index_checksums_match_the_blocks(make_dat, output_directory, workers):
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE), make_dat('b.dat', '2012-01-01 00:47:00', BLOCK_SIZE)]
+    if workers > 1:
+        split_files_parallel(paths, output_directory, SITE, BLOCK_SIZE, workers, use_index=True)
+    else:
+        index = BlockIndex(output_directory)
+        for path in paths:
+            split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+        index.close()
+    assert not any(name.endswith(TEMPORARY_SUFFIX) for name in os.listdir(output_directory))
+    index = BlockIndex(output_directory)
+    for name, content in read_blocks(output_directory).items():
+        assert index.checksum(name) == zlib.crc32(content)
+    index.close()
+
+def test_rebuild_removes_only_stale_temporary_files(make_dat, output_directory):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE)
+    index = BlockIndex(output_directory)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+    stale, running = (os.path.join(output_directory, f'2012-01-01_0030_{SITE}.raw.{tag}{TEMPORARY_SUFFIX}') for tag in ('x1', 'x2'))
+    for temporary in (stale, running):
+        with open(temporary, 'w') as file:
+            file.write('1\t2\t3\n')
+    os.utime(stale, (0, 0))
+    assert index.rebuild() == []
+    assert not os.path.exists(stale) and os.path.exists(running)
+    assert index.get(os.path.basename(running)) is None
+    index.close()
+
+def test_concurrent_writers_of_a_block_do_not_mix(tmp_path):
+    path = str(tmp_path / 'block.raw')
+    writers = [BlockWriter(path), BlockWriter(path)]
+    assert writers[0].temporary != writers[1].temporary
+    contents = [b''.join(b'%d\t%d\n' % (number, row) for row in range(2000)) for number in range(2)]
+
+    def write(number):
+        for line in contents[number].splitlines(keepends=True):
+            writers[number].write(line)
+        writers[number].commit()
+    threads = [threading.Thread(target=write, args=(number,)) for number in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert open(path, 'rb').read() in contents
+    assert os.listdir(tmp_path) == ['block.raw']
+    assert stat.S_IMODE(os.stat(path).st_mode) == BLOCK_FILE_MODE
+
+def test_torn_last_line_is_dropped_before_appending(make_dat, output_directory, caplog):
+    first = make_dat('a.dat', '2012-01-01 00:17:00', 100)
+    whole = make_dat('whole.dat', '2012-01-01 00:17:00', 99)
+    second = make_dat('b.dat', '2012-01-01 00:17:50', 100)
+    index = BlockIndex(output_directory)
+    split_file_vectorized(first, output_directory, SITE, BLOCK_SIZE, index=index)
+    block = os.path.join(output_directory, f'2012-01-01_0000_{SITE}.raw')
+    with open(block, 'rb+') as file:
+        file.truncate(os.path.getsize(block) - 10)
+    # As recorded by a run that was killed while it appended to the block
+    index.record(os.path.basename(block), count_lines(block), os.path.getsize(block), 'a.dat')
+    with caplog.at_level(logging.WARNING):
+        split_file_vectorized(second, output_directory, SITE, BLOCK_SIZE, index=index)
+    assert read_blocks(output_directory) == expected_blocks([whole, second])
+    index.close()
+    assert 'ends in an incomplete line, which is dropped' in caplog.text
+
+@pytest.mark.parametrize('output_format', ['raw', 'npy'])
+def test_new_block_never_overwrites_an_unknown_file(make_dat, output_directory, output_format):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 2 * BLOCK_SIZE)
+    BlockIndex(output_directory).close()
+    # Written without the index, after the index was created in an empty folder
+    foreign = os.path.join(output_directory, f'2012-01-01_0030_{SITE}.{output_format}')
+    with open(foreign, 'w') as file:
+        file.write('foreign\n')
+    index = BlockIndex(output_directory)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index, output_format=output_format)
+    index.close()
+    assert open(foreign).read() == 'foreign\n'
+    assert len(os.listdir(output_directory)) == 4
+
+def test_failed_block_leaves_no_empty_file(make_dat, output_directory, monkeypatch):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE)
+    index = BlockIndex(output_directory)
+
+    def format_block(values):
+        raise RuntimeError("killed")
+    monkeypatch.setattr(split_30mins_file, 'format_block', format_block)
+    with pytest.raises(RuntimeError):
+        split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+    index.close()
+    assert not any(name.endswith('.raw') for name in os.listdir(output_directory))
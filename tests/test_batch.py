@@ -0,0 +1,38 @@
+import json
+import os
+import pytest
+from toa5files import SITE, expected_blocks, read_blocks, toa5_lines, write_lines
+from ecdataprocessing.batch_split import SiteConfig, load_config, run_batch
+
+def write_config(path, sites: list) -> str:
+    with open(path, 'w') as file:
+        json.dump({'workers': 3, 'sites': sites}, file)
+    return str(path)
+
+def test_load_config(tmp_path):
+    path = write_config(tmp_path / 'sites.json', [{'site_name': SITE, 'file_location': 'data', 'output_directory': 'out',
+                                                   'years': [2012], 'frequency': 10, 'block_minutes': 15}])
+    sites, workers = load_config(path)
+    assert workers == 3
+    assert sites[0].block_size == 15 * 60 * 10 and sites[0].output_format == 'raw'
+
+@pytest.mark.parametrize('site, message', [({'block_minutes': 7}, 'divide an hour'),
+                                           ({'blocksize': 100}, 'Unknown site settings: blocksize'),
+                                           ({'file_location': ''}, 'no file_location')])
+def test_load_config_rejects_bad_sites(tmp_path, site, message):
+    entry = {'site_name': SITE, 'file_location': 'data', 'output_directory': 'out', 'years': [2012], **site}
+    with pytest.raises(ValueError, match=message):
+        load_config(write_config(tmp_path / 'sites.json', [entry]))
+
+def test_run_batch_shares_one_pool(tmp_path):
+    folder = tmp_path / 'data' / '2012' / 'TOA5'
+    folder.mkdir(parents=True)
+    paths = [write_lines(str(folder / f'{number}.dat'), toa5_lines(start, 2000, frequency=1))
+             for number, start in enumerate(['2012-01-01 00:17:00', '2012-01-01 00:50:20'])]
+    sites = [SiteConfig(SITE, str(tmp_path / 'data'), str(tmp_path / f'{minutes}mins'), [2012], frequency=1, block_minutes=minutes)
+             for minutes in (30, 15)]
+    run_batch(sites, workers=2)
+    for minutes in (30, 15):
+        output_directory = str(tmp_path / f'{minutes}mins')
+        assert read_blocks(output_directory) == expected_blocks(paths, block_minutes=minutes)
+        assert os.path.exists(os.path.join(output_directory, 'block_index.sqlite'))
@@ -0,0 +1,65 @@
+import os
+from toa5files import BLOCK_SIZE, SITE, expected_blocks, read_blocks
+from ecdataprocessing import split_30mins_file
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.split_30mins_file import split_file_vectorized, split_files_parallel
+
+def test_index_records_blocks(make_dat, output_directory):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 2 * BLOCK_SIZE)
+    index = BlockIndex(output_directory)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+    for name, content in read_blocks(output_directory).items():
+        rows, size = index.get(name)
+        assert (rows, size) == (content.count(b'\n'), len(content))
+        assert index.sources(name) == ['a.dat']
+    assert index.get(f'2012-01-01_0030_{SITE}.raw')[0] == BLOCK_SIZE
+    index.close()
+
+def test_rerun_skips_complete_blocks_without_reading_them(make_dat, output_directory, monkeypatch):
+    path = make_dat('a.dat', '2012-01-01 00:30:00', 2 * BLOCK_SIZE)
+    index = BlockIndex(output_directory)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+    modified = {name: os.stat(os.path.join(output_directory, name)).st_mtime_ns for name in read_blocks(output_directory)}
+
+    def count_lines(path):
+        raise AssertionError(f"{path} was read")
+    # The manifest says the blocks are complete, so a rerun must not count them
+    monkeypatch.setattr(split_30mins_file, 'count_lines', count_lines)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+    assert {name: os.stat(os.path.join(output_directory, name)).st_mtime_ns for name in modified} == modified
+    assert read_blocks(output_directory) == expected_blocks([path])
+    index.close()
+
+def test_parallel_workers_share_index(make_dat, output_directory):
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', 2 * BLOCK_SIZE), make_dat('b.dat', '2012-01-01 01:17:00', 2 * BLOCK_SIZE)]
+    split_files_parallel(paths, output_directory, SITE, BLOCK_SIZE, workers=2, use_index=True)
+    index = BlockIndex(output_directory)
+    assert sorted(index.sources(f'2012-01-01_0100_{SITE}.raw')) == ['a.dat', 'b.dat']
+    assert index.rebuild() == []
+    index.close()
+
+def test_rebuild_reports_and_corrects_mismatches(make_dat, output_directory):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE)
+    index = BlockIndex(output_directory)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+    name = f'2012-01-01_0000_{SITE}.raw'
+    with open(os.path.join(output_directory, name), 'a') as file:
+        file.write('1\t2\t3\t4\t5\t6\n')
+    os.remove(os.path.join(output_directory, f'2012-01-01_0030_{SITE}.raw'))
+
+    assert index.rebuild() == [name]
+    rows, _ = index.get(name)
+    assert rows == 13 * 60 * 2 + 1
+    assert index.sources(name) == ['a.dat']
+    assert index.get(f'2012-01-01_0030_{SITE}.raw') is None
+    assert index.rebuild() == []
+    index.close()
+
+def test_fresh_index_falls_back_to_disk_for_unknown_files(make_dat, output_directory):
+    path = make_dat('a.dat', '2012-01-01 00:30:00', 2 * BLOCK_SIZE)
+    index = BlockIndex(output_directory)
+    # Blocks written without the index, after it was created in an empty folder
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+    assert read_blocks(output_directory) == expected_blocks([path])
+    index.close()
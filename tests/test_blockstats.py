@@ -0,0 +1,66 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from toa5files import BLOCK_SIZE, FREQUENCY, SITE, read_blocks
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.blockstats import BlockStats, spike_window
+from ecdataprocessing.split_30mins_file import STAT_CHANNELS, block_statistics, split_files_parallel, split_files_serial
+
+def test_block_stats_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(1000, 3))
+    values[rng.integers(0, 1000, 30), rng.integers(0, 3, 30)] = np.nan
+    values[500, 1] = 50.0  # a spike
+    whole = BlockStats(['a', 'b', 'c'], spike_window=300)
+    whole.update(values)
+    whole.finish()
+    pieces = BlockStats(['a', 'b', 'c'], spike_window=300)
+    for piece in np.array_split(values, [1, 7, 299, 301, 650]):
+        pieces.update(piece)
+    pieces.finish()
+    for stats in (whole, pieces):
+        np.testing.assert_array_equal(stats.count, (~np.isnan(values)).sum(axis=0))
+        np.testing.assert_allclose(stats.mean, np.nanmean(values, axis=0))
+        np.testing.assert_allclose(stats.variance, np.nanvar(values, axis=0, ddof=1))
+        np.testing.assert_array_equal(stats.min, np.nanmin(values, axis=0))
+        np.testing.assert_array_equal(stats.max, np.nanmax(values, axis=0))
+    np.testing.assert_array_equal(whole.spikes, pieces.spikes)
+    assert whole.spikes[1] >= 1
+
+    # Statistics of two halves merged equal those of the whole
+    first, second = BlockStats(['a', 'b', 'c'], spike_window=500), BlockStats(['a', 'b', 'c'], spike_window=500)
+    first.update(values[:500])
+    second.update(values[500:])
+    first.finish().merge(second.finish())
+    np.testing.assert_allclose(first.variance, whole.variance)
+    restored = BlockStats.from_rows(first.rows())
+    np.testing.assert_allclose(restored.variance, first.variance)
+
+@pytest.mark.parametrize('mode', ['vectorized', 'streaming', 'line_count', 'parallel'])
+def test_index_stats_match_the_written_blocks(make_dat, output_directory, mode):
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE, nan_rows={10, 20}),
+             make_dat('b.dat', '2012-01-01 00:47:00', BLOCK_SIZE, nan_rows={3000})]
+    if mode == 'parallel':
+        split_files_parallel(paths, output_directory, SITE, BLOCK_SIZE, workers=2, use_index=True)
+    else:
+        index = BlockIndex(output_directory)
+        split_files_serial(paths, output_directory, SITE, BLOCK_SIZE, FREQUENCY, mode, index)
+        index.close()
+    index = BlockIndex(output_directory)
+    frame = index.stats_frame()
+    index.close()
+    for name, content in read_blocks(output_directory).items():
+        stats = BlockStats(STAT_CHANNELS, spike_window=spike_window(FREQUENCY))
+        stats.update(pd.read_csv(io.BytesIO(content), sep='\t', header=None, na_values=['NAN']).to_numpy())
+        stats.finish()
+        block = frame[frame['name'] == name].set_index('channel').loc[list(STAT_CHANNELS)]
+        np.testing.assert_array_equal(block['count'], stats.count)
+        np.testing.assert_allclose(block['mean'], stats.mean)
+        np.testing.assert_allclose(block['variance'], stats.variance)
+        np.testing.assert_array_equal(block['spikes'], stats.spikes)
+
+def test_spike_window_is_five_minutes():
+    assert spike_window(20) == 6000
+    assert block_statistics(block_size=15 * 60 * 10, block_minutes=15).spike_window == 3000
+    assert block_statistics(block_size=BLOCK_SIZE).spike_window == 300 * FREQUENCY
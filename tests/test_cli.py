@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import ecdataprocessing
+from toa5files import SITE, expected_blocks, read_blocks, toa5_lines, write_lines
+from ecdataprocessing.checktime import FileInventory
+from ecdataprocessing.cli import main
+
+def make_site(tmp_path) -> list:
+    folder = tmp_path / 'data' / '2012' / 'TOA5'
+    folder.mkdir(parents=True)
+    return [write_lines(str(folder / f'TOA5_{SITE}.ts_data_{number}.dat'), toa5_lines(start, 2000, frequency=1))
+            for number, start in enumerate(['2012-01-01 00:17:00', '2012-01-01 00:50:20'])]
+
+def test_split_and_inventory(tmp_path):
+    paths = make_site(tmp_path)
+    output_directory = str(tmp_path / 'out')
+    assert main(['split', str(tmp_path / 'data'), output_directory, '--years', '2012', '--site', SITE,
+                 '--frequency', '1', '--workers', '1', '--metrics', str(tmp_path / 'metrics.json')]) == 0
+    assert read_blocks(output_directory) == expected_blocks(paths)
+    assert (tmp_path / 'metrics.json').exists()
+
+    inventory_path = str(tmp_path / 'inventory.sqlite')
+    assert main(['inventory', str(tmp_path / 'data'), '--inventory', inventory_path, '--frequency', '1']) == 0
+    inventory = FileInventory(inventory_path)
+    assert list(inventory.files(site=SITE)['path']) == paths
+    inventory.close()
+
+def test_batch_and_verify(tmp_path):
+    paths = make_site(tmp_path)
+    output_directory = str(tmp_path / 'out')
+    config = tmp_path / 'sites.json'
+    config.write_text(json.dumps({'sites': [{'site_name': SITE, 'file_location': str(tmp_path / 'data'),
+                                             'output_directory': output_directory, 'years': [2012], 'frequency': 1}]}))
+    assert main(['batch', str(config), '--workers', '1', '--log', str(tmp_path / 'batch.log')]) == 0
+    assert read_blocks(output_directory) == expected_blocks(paths)
+    assert main(['verify', output_directory]) == 0
+
+    # A block changed behind the index is corrected, and verifies on the next run
+    name = sorted(read_blocks(output_directory))[0]
+    with open(os.path.join(output_directory, name), 'a') as block:
+        block.write('1.0\t2.0\t3.0\t4.0\t5.0\t6.0\n')
+    assert main(['verify', output_directory]) == 1
+    assert main(['verify', output_directory]) == 0
+    assert main(['verify', str(tmp_path / 'missing')]) == 1
+
+def test_split_without_files_fails(tmp_path):
+    (tmp_path / 'data').mkdir()
+    assert main(['split', str(tmp_path / 'data'), str(tmp_path / 'out'), '--years', '2012', '--workers', '1']) == 1
+
+def test_package_imports_lazily():
+    code = 'import sys, ecdataprocessing; assert "pandas" not in sys.modules and "ecdataprocessing.split_30mins_file" not in sys.modules'
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.dirname(ecdataprocessing.__path__[0]))
+    assert ecdataprocessing.FileInventory is FileInventory
+
+def test_every_split_run_logs_to_its_own_file(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    make_site(tmp_path)
+    handlers = list(logging.getLogger().handlers)
+    for run in ('first', 'second'):
+        assert main(['split', str(tmp_path / 'data'), str(tmp_path / run), '--years', '2012', '--site', SITE,
+                     '--frequency', '1', '--workers', '1', '--log', str(tmp_path / f'{run}.log')]) == 0
+    assert logging.getLogger().handlers == handlers
+    # A handler left behind would write the summary of the second run into the first log as well
+    for run in ('first', 'second'):
+        assert (tmp_path / f'{run}.log').read_text().count('Run summary') == 1
@@ -0,0 +1,67 @@
+import gzip
+import shutil
+import pytest
+from toa5files import BLOCK_SIZE, FREQUENCY, SITE, expected_blocks, read_blocks
+from ecdataprocessing import compressed_io
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.checktime import FileInventory
+from ecdataprocessing.compressed_io import configure_compression, decompress, strip_codec_suffix
+from ecdataprocessing.split_30mins_file import split_file_by_line_count, split_file_streaming, split_file_vectorized, split_files_parallel
+
+@pytest.fixture
+def gzip_output(request):
+    configure_compression('gzip', threads=getattr(request, 'param', 0))
+    yield
+    configure_compression('none')
+
+def gzipped(path: str) -> str:
+    with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+        shutil.copyfileobj(source, target)
+    return path + '.gz'
+
+def read_gzip_blocks(output_directory: str) -> dict:
+    return {strip_codec_suffix(name): decompress(content, 'gzip') for name, content in read_blocks(output_directory, '.raw.gz').items()}
+
+@pytest.mark.parametrize('mode', ['streaming', 'line_count', 'vectorized'])
+def test_gzip_input(make_dat, output_directory, mode):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 2 * BLOCK_SIZE, nan_rows={7}, nan_column=8)
+    if mode == 'streaming':
+        split_file_streaming(gzipped(path), output_directory, SITE, BLOCK_SIZE)
+    elif mode == 'line_count':
+        split_file_by_line_count(gzipped(path), output_directory, SITE, BLOCK_SIZE, FREQUENCY)
+    else:
+        split_file_vectorized(gzipped(path), output_directory, SITE, BLOCK_SIZE)
+    assert read_blocks(output_directory) == expected_blocks([path])
+
+@pytest.mark.parametrize('gzip_output', [0, 2], indirect=True)
+@pytest.mark.parametrize('workers', [1, 2])
+def test_gzip_output(make_dat, output_directory, gzip_output, workers):
+    # b.dat appends to the block a.dat started
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE), make_dat('b.dat', '2012-01-01 00:47:00', BLOCK_SIZE)]
+    if workers > 1:
+        split_files_parallel(paths, output_directory, SITE, BLOCK_SIZE, workers, use_index=True)
+    else:
+        index = BlockIndex(output_directory)
+        for path in paths:
+            split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+        index.close()
+    assert read_blocks(output_directory) == {}
+    assert read_gzip_blocks(output_directory) == expected_blocks(paths)
+    index = BlockIndex(output_directory)
+    assert index.rebuild() == []
+    index.close()
+
+def test_zstd_without_zstandard_says_what_to_install(monkeypatch):
+    monkeypatch.setattr(compressed_io, 'zstandard', None)
+    with pytest.raises(ImportError, match='pip install zstandard'):
+        configure_compression('zstd')
+    assert compressed_io.get_compression().codec == 'none'
+
+def test_inventory_reads_compressed_files(make_dat, tmp_path):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 100)
+    inventory = FileInventory(str(tmp_path / 'inventory.sqlite'))
+    inventory.update([path, gzipped(path)])
+    frame = inventory.to_dataframe()
+    assert list(frame['rows']) == [100, 100]
+    assert frame['start_time'].nunique() == frame['end_time'].nunique() == 1
+    inventory.close()
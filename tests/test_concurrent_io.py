@@ -0,0 +1,70 @@
+import asyncio
+import os
+import time
+from ecdataprocessing.concurrent_io import ConcurrentIO, latency_shim
+
+def test_map_keeps_order_and_bounds_calls_in_flight():
+    running, peak = [0], [0]
+
+    def call(item):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        running[0] -= 1
+        return item * 2
+
+    with ConcurrentIO(limit=3) as fs:
+        assert fs.map(call, range(12)) == [item * 2 for item in range(12)]
+        assert fs.map(call, []) == []
+        errors = fs.map(lambda item: 1 / item, [1, 0], return_exceptions=True)
+    assert peak[0] <= 3
+    assert errors[0] == 1 and isinstance(errors[1], ZeroDivisionError)
+
+def test_each_hands_results_to_the_callback():
+    results = {}
+    with ConcurrentIO(limit=2) as fs:
+        fs.each(lambda item: 10 // item, [1, 2, 0], lambda item, result, error: results.update({item: (result, error)}))
+    assert results[1] == (10, None) and results[2] == (5, None)
+    assert results[0][0] is None and isinstance(results[0][1], ZeroDivisionError)
+
+def test_stat_many_walk_and_listdir_many(tmp_path):
+    for name in ('a/x.dat', 'a/b/y.dat', 'c/z.dat'):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+    with ConcurrentIO() as fs:
+        stats = fs.stat_many([str(tmp_path / 'a' / 'x.dat'), str(tmp_path / 'missing.dat')])
+        assert stats[str(tmp_path / 'a' / 'x.dat')].st_size == 7 and stats[str(tmp_path / 'missing.dat')] is None
+        # One tree level at a time, so the order differs from os.walk but the listings do not
+        assert sorted(fs.walk([str(tmp_path)])) == [(root, sorted(dirs), sorted(files)) for root, dirs, files in sorted(os.walk(tmp_path))]
+        assert fs.listdir_many([str(tmp_path / 'a'), str(tmp_path / 'missing')]) == {
+            str(tmp_path / 'a'): ['b', 'x.dat'], str(tmp_path / 'missing'): []}
+
+def test_latency_shim_overlaps_concurrent_calls(tmp_path):
+    paths = [str(tmp_path / f'{number}.dat') for number in range(8)]
+    with latency_shim(0.05, str(tmp_path)):
+        start = time.perf_counter()
+        os.stat(str(tmp_path))
+        assert time.perf_counter() - start >= 0.05
+        with ConcurrentIO(limit=8) as fs:
+            start = time.perf_counter()
+            fs.stat_many(paths)
+            assert time.perf_counter() - start < 8 * 0.05
+    start = time.perf_counter()
+    os.stat(str(tmp_path))
+    assert time.perf_counter() - start < 0.05
+
+def test_batch_calls_inside_a_running_event_loop(tmp_path):
+    (tmp_path / 'a.dat').write_text('a')
+    results = []
+
+    async def job():
+        # As a long-lived asyncio scheduler would call them in-process
+        with ConcurrentIO(limit=2) as fs:
+            assert fs.map(len, ['a', 'bb']) == [1, 2]
+            fs.each(len, ['ccc'], lambda item, result, error: results.append((item, result, error)))
+            return fs.stat_many([str(tmp_path / 'a.dat')])
+
+    stats = asyncio.run(job())
+    assert stats[str(tmp_path / 'a.dat')].st_size == 1
+    assert results == [('ccc', 3, None)]
@@ -0,0 +1,46 @@
+import numpy as np
+from ecdataprocessing.coverage import Coverage, merge_intervals
+
+MINUTE = 60 * 10 ** 9
+HALF_HOUR = 30 * MINUTE
+PERIOD = 10 ** 9 // 2
+
+def ns(text: str) -> int:
+    return int(np.datetime64(text, 'ns').astype(np.int64))
+
+def three_files() -> Coverage:
+    # Back-to-back files a and b, then an hour without data before c
+    return Coverage([ns('2012-01-01T00:00'), ns('2012-01-01T01:00'), ns('2012-01-01T03:00')],
+                    [ns('2012-01-01T01:00') - PERIOD, ns('2012-01-01T02:00') - PERIOD, ns('2012-01-01T04:00') - PERIOD],
+                    names=['a', 'b', 'c'], sample_period=PERIOD)
+
+def test_merge_intervals():
+    starts, ends = merge_intervals(np.array([50, 0, 10, 30, 31]), np.array([60, 20, 15, 31, 40]))
+    np.testing.assert_array_equal(starts, [0, 30, 50])
+    np.testing.assert_array_equal(ends, [20, 40, 60])
+    starts, ends = merge_intervals(np.array([], dtype=np.int64), np.array([], dtype=np.int64))
+    assert len(starts) == len(ends) == 0
+
+def test_gaps():
+    starts, ends = three_files().gaps(ns('2012-01-01T00:00'), ns('2012-01-01T05:00'), resolution=PERIOD)
+    np.testing.assert_array_equal(starts, [ns('2012-01-01T02:00'), ns('2012-01-01T04:00')])
+    np.testing.assert_array_equal(ends, [ns('2012-01-01T03:00'), ns('2012-01-01T05:00')])
+    # Only gaps longer than the resolution are reported
+    starts, _ = three_files().gaps(ns('2012-01-01T00:00'), ns('2012-01-01T05:00'), resolution=HALF_HOUR * 2)
+    assert len(starts) == 0
+
+def test_fraction_and_missing_blocks():
+    coverage = three_files()
+    fractions = coverage.fraction([ns('2012-01-01T01:30'), ns('2012-01-01T01:45'), ns('2012-01-01T02:00')], HALF_HOUR)
+    np.testing.assert_allclose(fractions, [1.0, 0.5, 0.0])
+    missing = coverage.missing_blocks(ns('2012-01-01T00:00'), ns('2012-01-01T05:00'), HALF_HOUR)
+    np.testing.assert_array_equal(missing, [ns(f'2012-01-01T{hhmm}') for hhmm in ('02:00', '02:30', '04:00', '04:30')])
+
+def test_files_covering():
+    coverage = three_files()
+    assert list(coverage.files_covering(ns('2012-01-01T01:00'))) == ['b']
+    assert list(coverage.files_covering(ns('2012-01-01T00:59:59.5'))) == ['a']
+    assert list(coverage.files_covering(ns('2012-01-01T02:30'))) == []
+    # Overlapping files are both found, also when a long file started much earlier
+    overlapping = Coverage([0, 10, 20], [100, 15, 30])
+    assert list(overlapping.files_covering(25)) == [0, 2]
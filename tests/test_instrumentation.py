@@ -0,0 +1,53 @@
+import json
+import os
+import pytest
+from toa5files import BLOCK_SIZE, SITE
+from ecdataprocessing.instrumentation import Metrics, configure_profiling, set_metrics
+from ecdataprocessing.split_30mins_file import split_files_parallel
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    previous = set_metrics(metrics)
+    yield metrics
+    set_metrics(previous)
+    configure_profiling(None)
+
+def test_metrics_per_file_and_merge():
+    metrics = Metrics()
+    with metrics.file('a.dat'):
+        with metrics.timer('parse'):
+            pass
+        metrics.count('rows', 10)
+    metrics.count('rows', 5)
+    assert metrics.counters['rows'] == 15 and metrics.counters['files'] == 1
+    assert metrics.files['a.dat']['counters'] == {'rows': 10}
+    assert set(metrics.files['a.dat']['timers']) == {'parse', 'total'}
+
+    other = Metrics()
+    other.count('rows', 1)
+    with other.file('a.dat'):
+        other.count('rows', 2)
+    metrics.merge(other.to_dict())
+    assert metrics.counters['rows'] == 18 and metrics.counters['files'] == 2
+    assert metrics.files['a.dat']['counters'] == {'rows': 12}
+    assert '18 rows' in metrics.summary()
+
+def test_export(tmp_path):
+    metrics = Metrics()
+    metrics.add_time('write', 1.5)
+    metrics.count('blocks_written', 3)
+    metrics.export(str(tmp_path / 'metrics.json'))
+    assert json.loads((tmp_path / 'metrics.json').read_text())['counters'] == {'blocks_written': 3}
+    metrics.export(str(tmp_path / 'metrics.prom'))
+    text = (tmp_path / 'metrics.prom').read_text()
+    assert 'ecdata_stage_seconds_total{stage="write"} 1.500000' in text and 'ecdata_blocks_written_total 3' in text
+
+def test_worker_metrics_and_profiles_reach_the_parent(make_dat, output_directory, tmp_path, metrics):
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE), make_dat('b.dat', '2012-01-01 00:47:00', BLOCK_SIZE)]
+    configure_profiling('b.dat', str(tmp_path / 'profiles'))
+    split_files_parallel(paths, output_directory, SITE, BLOCK_SIZE, workers=2)
+    assert metrics.counters['files'] == 2 and metrics.counters['rows'] == 2 * BLOCK_SIZE
+    assert metrics.counters['blocks_written'] == 3
+    assert set(metrics.files) == {'a.dat', 'b.dat'}
+    assert os.listdir(tmp_path / 'profiles') == ['b.dat.prof']
@@ -0,0 +1,90 @@
+import os
+from toa5files import toa5_lines, write_lines
+from ecdataprocessing import checktime
+from ecdataprocessing.checktime import FileInventory, update_inventory
+from ecdataprocessing.timestamps import parse_timestamp
+
+def test_update_probes_only_new_or_changed_files(make_dat, tmp_path, monkeypatch):
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', 100), make_dat('b.dat', '2012-01-01 00:30:00', 200)]
+    inventory = FileInventory(str(tmp_path / 'inventory.sqlite'))
+    assert inventory.update(paths, workers=2) == 2
+    frame = inventory.to_dataframe()
+    assert list(frame['filename']) == ['a.dat', 'b.dat']
+    assert list(frame['rows']) == [100, 200]
+    assert list(frame['start_time']) == ['2012-01-01 00:17:00', '2012-01-01 00:30:00']
+    assert list(frame['end_time']) == ['2012-01-01 00:17:49.5', '2012-01-01 00:31:39.5']
+
+    probed = []
+    probe_file = checktime.probe_file
+    monkeypatch.setattr(checktime, 'probe_file', lambda path: probed.append(path) or probe_file(path))
+    assert inventory.update(paths, workers=2) == 0
+    assert probed == []
+
+    # Appending rows changes size and mtime, so only that file is read again
+    make_dat('b.dat', '2012-01-01 00:30:00', 300)
+    assert inventory.update(paths, workers=2) == 1
+    assert probed == [paths[1]]
+    assert list(inventory.to_dataframe()['rows']) == [100, 300]
+    inventory.close()
+
+def test_update_drops_removed_files(make_dat, tmp_path):
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', 10), make_dat('b.dat', '2012-01-01 00:30:00', 10)]
+    inventory = FileInventory(str(tmp_path / 'inventory.sqlite'))
+    inventory.update(paths)
+    os.remove(paths[0])
+    inventory.update(paths[1:])
+    assert list(inventory.to_dataframe()['filename']) == ['b.dat']
+    inventory.close()
+
+def test_files_removed_during_the_update_are_dropped(make_dat, tmp_path, monkeypatch):
+    paths = [make_dat(f'{name}.dat', '2012-01-01 00:17:00', 10) for name in 'abc']
+    inventory = FileInventory(str(tmp_path / 'inventory.sqlite'))
+    inventory.update(paths)
+    # a.dat is gone before it is stat'ed; c.dat changed and is gone before it is read
+    os.remove(paths[0])
+    make_dat('c.dat', '2012-01-01 00:17:00', 20)
+    probe_file = checktime.probe_file
+    monkeypatch.setattr(checktime, 'probe_file', lambda path: os.remove(path) or probe_file(path))
+    assert inventory.update(paths) == 0
+    assert list(inventory.to_dataframe()['filename']) == ['b.dat']
+    inventory.close()
+
+def test_queries_use_the_typed_columns(make_dat, tmp_path):
+    paths = [make_dat('TOA5_speuld.ts_data_0000.dat', '2012-01-01 00:00:00', 3600),
+             make_dat('TOA5_speuld.ts_data_0100.dat', '2012-01-01 01:00:00', 1800),
+             make_dat('TOA5_loobos.ts_data_0000.dat', '2012-01-01 00:00:00', 10)]
+    inventory = FileInventory(str(tmp_path / 'inventory.sqlite'))
+    inventory.update(paths)
+    assert inventory.sites() == ['loobos', 'speuld']
+    assert list(inventory.files(site='speuld')['path']) == paths[:2]
+    assert len(inventory.files(start=parse_timestamp('2012-01-01 00:30:00'))) == 1
+    assert len(inventory.files(years=[2013])) == 0
+
+    inventory.update_blocks(frequency=2, site='speuld')
+    blocks = inventory.blocks(site='speuld', below=1.0)
+    assert list(blocks['start_ns']) == [parse_timestamp('2012-01-01 00:30:00'), parse_timestamp('2012-01-01 01:00:00')]
+    assert list(blocks['covered']) == [0.0, 0.5]
+    inventory.close()
+
+def test_shared_inventory_prunes_only_the_updated_tree(tmp_path):
+    inventory_path = str(tmp_path / 'inventory.sqlite')
+    trees = {}
+    for site in ('speuld', 'loobos'):
+        folder = tmp_path / site / '2012' / 'TOA5'
+        folder.mkdir(parents=True)
+        trees[site] = [write_lines(str(folder / f'TOA5_{site}.ts_data_{number}.dat'), toa5_lines('2012-01-01 00:00:00', 10))
+                       for number in range(2)]
+    for site in trees:
+        update_inventory(str(tmp_path / site), inventory_path, frequency=2)
+    os.remove(trees['speuld'][0])
+    update_inventory(str(tmp_path / 'speuld'), inventory_path, frequency=2)
+    inventory = FileInventory(inventory_path)
+    assert sorted(inventory.files()['path']) == sorted(trees['loobos'] + trees['speuld'][1:])
+
+    # Without a root, only the folders of the listed files are pruned
+    os.remove(trees['loobos'][0])
+    inventory.update(trees['speuld'][1:])
+    assert len(inventory.files(site='loobos')) == 2
+    inventory.update(trees['loobos'][1:])
+    assert list(inventory.files(site='loobos')['path']) == trees['loobos'][1:]
+    inventory.close()
@@ -0,0 +1,39 @@
+import os
+import numpy as np
+import pytest
+from toa5files import BLOCK_SIZE, SITE, read_blocks
+from ecdataprocessing.split_30mins_file import BLOCK_DTYPE, format_block, load_block, split_file_vectorized, split_files_parallel
+
+def npy_as_raw(output_directory: str) -> dict:
+    """Format the .npy blocks of a folder like .raw blocks."""
+    blocks = {}
+    for name in sorted(os.listdir(output_directory)):
+        if name.endswith('.npy'):
+            block = load_block(os.path.join(output_directory, name))
+            values = np.column_stack([block[column] for column in BLOCK_DTYPE.names[1:]])
+            blocks[name[:-4] + '.raw'] = format_block(values).encode()
+    return blocks
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_npy_blocks_hold_the_raw_values(make_dat, tmp_path, workers):
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', 2 * BLOCK_SIZE, nan_rows={3, 4000}),
+             make_dat('b.dat', '2012-01-01 01:17:00', 2 * BLOCK_SIZE)]
+    for output_format in ('raw', 'npy'):
+        output_directory = str(tmp_path / output_format)
+        os.makedirs(output_directory)
+        if workers > 1:
+            split_files_parallel(paths, output_directory, SITE, BLOCK_SIZE, workers, output_format=output_format)
+        else:
+            for path in paths:
+                split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, output_format=output_format)
+    assert npy_as_raw(str(tmp_path / 'npy')) == read_blocks(str(tmp_path / 'raw'))
+
+def test_load_block_maps_the_file(make_dat, output_directory):
+    path = make_dat('a.dat', '2012-01-01 00:30:00', BLOCK_SIZE)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE, output_format='npy')
+    block = load_block(os.path.join(output_directory, f'2012-01-01_0030_{SITE}.npy'))
+    assert isinstance(block, np.memmap) and not block.flags.writeable
+    assert block.dtype == BLOCK_DTYPE and len(block) == BLOCK_SIZE
+    times = block['timestamp'].view('datetime64[ns]')
+    assert times[0] == np.datetime64('2012-01-01T00:30:00') and times[1] == np.datetime64('2012-01-01T00:30:00.5')
+    assert np.all(np.diff(block['timestamp']) == 500_000_000)
@@ -0,0 +1,60 @@
+import gc
+import logging
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from toa5files import BLOCK_SIZE, SITE, expected_blocks, read_blocks, write_lines
+from ecdataprocessing.split_30mins_file import split_files_parallel, submit_jobs
+
+def test_parallel_matches_baseline(make_dat, output_directory):
+    # Every file boundary falls inside a block, so the edge blocks are shared by two files
+    starts = ['2012-01-01 00:17:00', '2012-01-01 01:17:00', '2012-01-01 02:17:00', '2012-01-01 03:17:00']
+    paths = [make_dat(f'{i}.dat', start, 2 * BLOCK_SIZE) for i, start in enumerate(starts)]
+    split_files_parallel(paths, output_directory, SITE, BLOCK_SIZE, workers=2)
+    assert read_blocks(output_directory) == expected_blocks(paths)
+
+def test_parallel_logs_failed_file(make_dat, output_directory, tmp_path, caplog):
+    good = make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE)
+    bad = write_lines(str(tmp_path / 'b.dat'), ['not,a,toa5,row'])
+    with caplog.at_level(logging.INFO):
+        split_files_parallel([good, bad], output_directory, SITE, BLOCK_SIZE, workers=2)
+    assert f"Error processing {bad}" in caplog.text
+    assert read_blocks(output_directory) == expected_blocks([good])
+
+def test_workers_log_at_the_parents_level(make_dat, output_directory, tmp_path):
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    root = logging.getLogger()
+    level = root.level
+    root.addHandler(handler)
+    root.setLevel(logging.WARNING)
+    try:
+        good = make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE)
+        bad = write_lines(str(tmp_path / 'b.dat'), ['not,a,toa5,row'])
+        split_files_parallel([good, bad], output_directory, SITE, BLOCK_SIZE, workers=2)
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(level)
+    # Worker records bypass the parent's logger level, so the workers must filter them
+    assert any(f"Error processing {bad}" in record.getMessage() for record in records)
+    assert all(record.levelno >= logging.WARNING for record in records)
+
+class CountingExecutor(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+def test_submit_jobs_keeps_only_a_few_files_in_flight():
+    with CountingExecutor(2) as executor:
+        collected = []
+        for future in submit_jobs(executor, ((number,) for number in range(10)), 3, function=lambda number: number):
+            # A file is only submitted once the parent has collected the file three places before it
+            assert executor.submitted == min(len(collected) + 3, 10)
+            collected.append(future.result())
+            consumed = weakref.ref(future)
+            del future
+            gc.collect()
+            assert consumed() is None
+    assert collected == list(range(10))
@@ -0,0 +1,43 @@
+import os
+import pytest
+from toa5files import BLOCK_SIZE, FREQUENCY, SITE, read_blocks
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.split_30mins_file import split_files_serial, split_site
+from ecdataprocessing.synthetic_toa5 import generate_dataset
+
+@pytest.fixture(scope='module')
+def gappy(tmp_path_factory):
+    # Logger gaps of up to 20 minutes make many blocks legitimately short
+    root = str(tmp_path_factory.mktemp('gappy'))
+    return generate_dataset(root, days=0.25, frequency=FREQUENCY, file_hours=2, gaps=2, max_gap_seconds=1200, zip_files=False)
+
+def run(files, output_directory, mode):
+    index = BlockIndex(output_directory)
+    split_files_serial(files, output_directory, SITE, BLOCK_SIZE, FREQUENCY, mode, index)
+    index.close()
+
+@pytest.mark.parametrize('mode', ['vectorized', 'streaming', 'line_count'])
+def test_rerun_leaves_blocks_unchanged(gappy, output_directory, mode):
+    run(gappy['files'], output_directory, mode)
+    first = read_blocks(output_directory)
+    run(gappy['files'], output_directory, mode)
+    assert read_blocks(output_directory) == first
+
+@pytest.mark.parametrize('mode', ['vectorized', 'streaming', 'line_count'])
+def test_resume_matches_full_run(gappy, tmp_path, mode):
+    full, resumed = str(tmp_path / 'full'), str(tmp_path / 'resumed')
+    os.makedirs(full)
+    os.makedirs(resumed)
+    run(gappy['files'], full, mode)
+    run(gappy['files'][:1], resumed, mode)
+    run(gappy['files'], resumed, mode)
+    assert read_blocks(resumed) == read_blocks(full)
+    index = BlockIndex(resumed)
+    assert index.sources(f'2012-01-01_0000_{SITE}.raw') == [os.path.basename(gappy['files'][0])]
+    index.close()
+
+def test_rerun_without_index_keeps_blocks(gappy, output_directory):
+    split_site(gappy['dat_root'], output_directory, gappy['years'], SITE, FREQUENCY, workers=1, use_index=False)
+    first = read_blocks(output_directory)
+    split_site(gappy['dat_root'], output_directory, gappy['years'], SITE, FREQUENCY, workers=1, use_index=False)
+    assert read_blocks(output_directory) == first
@@ -0,0 +1,40 @@
+import pytest
+from toa5files import BLOCK_SIZE, FREQUENCY, SITE, expected_blocks, read_blocks
+from ecdataprocessing import split_30mins_file
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.instrumentation import Metrics, set_metrics
+from ecdataprocessing.split_30mins_file import split_file_by_line_count, split_files_serial
+
+@pytest.fixture
+def metrics():
+    metrics = Metrics()
+    previous = set_metrics(metrics)
+    yield metrics
+    set_metrics(previous)
+
+@pytest.mark.parametrize('mode', ['vectorized', 'streaming', 'line_count'])
+def test_cross_file_blocks_are_written_once(make_dat, output_directory, metrics, mode):
+    # Block 0030 spans all three files
+    paths = [make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE), make_dat('b.dat', '2012-01-01 00:47:00', 100),
+             make_dat('c.dat', '2012-01-01 00:47:50', BLOCK_SIZE)]
+    index = BlockIndex(output_directory)
+    split_files_serial(paths, output_directory, SITE, BLOCK_SIZE, FREQUENCY, mode, index)
+    assert read_blocks(output_directory) == expected_blocks(paths)
+    assert metrics.counters['blocks_written'] == 3 and 'blocks_appended' not in metrics.counters
+    assert index.sources(f'2012-01-01_0030_{SITE}.raw') == ['a.dat', 'b.dat', 'c.dat']
+    index.close()
+
+def test_line_count_file_starting_on_the_half_hour(make_dat, output_directory, monkeypatch):
+    monkeypatch.setattr(split_30mins_file, 'LINE_CHUNK', 1000)
+    path = make_dat('a.dat', '2012-01-01 00:30:00', 2 * BLOCK_SIZE + 100)
+    split_file_by_line_count(path, output_directory, SITE, BLOCK_SIZE, FREQUENCY)
+    assert read_blocks(output_directory) == expected_blocks([path])
+
+def test_line_count_skips_files_without_rows(make_dat, output_directory, tmp_path, caplog):
+    empty = tmp_path / 'empty.dat'
+    empty.write_bytes(b'')
+    header_only = make_dat('header.dat', '2012-01-01 00:30:00', 0)
+    for path in (str(empty), header_only):
+        split_file_by_line_count(path, output_directory, SITE, BLOCK_SIZE, FREQUENCY)
+    assert caplog.text.count('Skipping empty file') == 2
+    assert read_blocks(output_directory) == {}
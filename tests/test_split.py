@@ -0,0 +1,113 @@
+import io
+import logging
+import numpy as np
+import pytest
+from toa5files import BLOCK_SIZE, FREQUENCY, SITE, expected_blocks, read_blocks, toa5_lines, write_lines
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.split_30mins_file import (DATA_COLUMNS, clean_block, format_block, format_line, read_data_columns,
+                                                split_file_by_line_count, split_file_streaming, split_file_vectorized)
+
+def test_streaming_matches_baseline(make_dat, output_directory):
+    # Starts at 00:17, so the first block is partial and the last one ends mid-block
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 3 * BLOCK_SIZE, nan_rows={5, 4000})
+    split_file_streaming(path, output_directory, SITE, BLOCK_SIZE)
+    blocks = read_blocks(output_directory)
+    assert blocks == expected_blocks([path])
+    assert sorted(blocks) == [f'2012-01-01_{hhmm}_{SITE}.raw' for hhmm in ('0000', '0030', '0100', '0130')]
+
+def test_streaming_matches_line_count(make_dat, tmp_path):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 2 * BLOCK_SIZE + 100)
+    streaming, line_count = tmp_path / 'streaming', tmp_path / 'line_count'
+    streaming.mkdir()
+    line_count.mkdir()
+    split_file_streaming(path, str(streaming), SITE, BLOCK_SIZE)
+    split_file_by_line_count(path, str(line_count), SITE, BLOCK_SIZE, FREQUENCY)
+    assert read_blocks(str(streaming)) == read_blocks(str(line_count))
+
+def test_streaming_crlf(make_dat, output_directory):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', BLOCK_SIZE, newline='\r\n')
+    split_file_streaming(path, output_directory, SITE, BLOCK_SIZE)
+    assert read_blocks(output_directory) == expected_blocks([path])
+
+@pytest.mark.parametrize('start, next_start', [('2012-01-01 00:17:00', '2012-01-01 00:47:00'),
+                                               ('2012-01-01 00:30:00', '2012-01-01 01:00:00')])
+def test_streaming_continues_block_of_previous_file(make_dat, output_directory, start, next_start):
+    first = make_dat('a.dat', start, BLOCK_SIZE)
+    second = make_dat('b.dat', next_start, BLOCK_SIZE)
+    # The index lists the sources of a block, which allows b.dat to append to it
+    index = BlockIndex(output_directory)
+    for path in (first, second):
+        split_file_streaming(path, output_directory, SITE, BLOCK_SIZE, index)
+    assert read_blocks(output_directory) == expected_blocks([first, second])
+    index.close()
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_streaming_nan_in_last_column(make_dat, output_directory, newline):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 100, newline=newline, nan_rows={0, 99}, nan_column=8)
+    split_file_streaming(path, output_directory, SITE, BLOCK_SIZE)
+    lines = read_blocks(output_directory)[f'2012-01-01_0000_{SITE}.raw'].splitlines()
+    assert lines[0].endswith(b'\tNAN') and lines[-1].endswith(b'\tNAN')
+
+@pytest.mark.parametrize('newline', ['\n', '\r\n'])
+def test_vectorized_matches_baseline(make_dat, output_directory, newline):
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 3 * BLOCK_SIZE, newline=newline, nan_rows={0, 1800, 7199}, nan_column=8)
+    split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE)
+    assert read_blocks(output_directory) == expected_blocks([path])
+
+def test_format_block_matches_format_line():
+    lines = [
+        '"2012-01-01 00:00:00",0,-0.0000004,1234567.1234567,1e-05,0.1,0,"NAN",-12.5',
+        '"2012-01-01 00:00:00.05",1,"NAN","NAN","NAN","NAN",0,"NAN","NAN"',
+        '"2012-01-01 00:00:00.1",2,0.0000005,-0.0000005,2.675,1.0000005,0,720.123456789,8\r\n',
+    ]
+    values = read_data_columns(io.StringIO(''.join(line.rstrip('\r\n') + '\n' for line in lines)), DATA_COLUMNS).to_numpy()
+    assert format_block(values) == ''.join(format_line(line) for line in lines)
+
+def test_vectorized_assigns_rows_by_timestamp(make_dat, tmp_path, output_directory, caplog):
+    lines = toa5_lines('2012-01-01 00:00:00', 2 * BLOCK_SIZE)
+    header, rows = lines[:4], lines[4:]
+    clean = rows[:100] + rows[200:]  # 100 missing samples in block 0000
+    messy = clean[:400] + [clean[400]] + clean[400:]  # one duplicate row
+    # Rows of block 0030 arrive before the last rows of block 0000
+    boundary = BLOCK_SIZE - 100
+    messy = messy[:boundary - 5] + messy[boundary:boundary + 5] + messy[boundary - 5:boundary] + messy[boundary + 5:]
+    path = write_lines(str(tmp_path / 'messy.dat'), header + messy)
+    expected = expected_blocks([write_lines(str(tmp_path / 'clean.dat'), header + clean)])
+    with caplog.at_level(logging.WARNING):
+        split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE)
+    assert read_blocks(output_directory) == expected
+    assert 'Block 2012-01-01_0000 of messy.dat: 3500/3600 rows, 1 duplicate' in caplog.text
+    assert '1 gaps (100 missing samples)' in caplog.text
+
+def test_clean_block():
+    timestamps = np.array([0, 2, 1, 1, 3, 7]) * (10 ** 9 // FREQUENCY)
+    values = np.arange(len(timestamps) * 6, dtype=float).reshape(-1, 6)
+    timestamps, cleaned, report = clean_block(timestamps, values, 10 ** 9 // FREQUENCY)
+    np.testing.assert_array_equal(cleaned[:, 0], values[[0, 2, 1, 4, 5], 0])
+    assert (report.rows, report.duplicates, report.out_of_order, report.gaps, report.missing_samples) == (5, 1, 1, 1, 3)
+
+@pytest.mark.parametrize('mode', ['streaming', 'line_count', 'vectorized'])
+def test_fifteen_minute_blocks_at_10_hz(make_dat, output_directory, mode):
+    block_size = 15 * 60 * 10
+    path = make_dat('a.dat', '2012-01-01 00:17:00', 2 * block_size + 100, frequency=10, nan_rows={9000}, nan_column=8)
+    if mode == 'streaming':
+        split_file_streaming(path, output_directory, SITE, block_size, block_minutes=15)
+    elif mode == 'line_count':
+        split_file_by_line_count(path, output_directory, SITE, block_size, 10, block_minutes=15)
+    else:
+        split_file_vectorized(path, output_directory, SITE, block_size, block_minutes=15)
+    blocks = read_blocks(output_directory)
+    assert blocks == expected_blocks([path], block_minutes=15)
+    assert sorted(blocks) == [f'2012-01-01_{hhmm}_{SITE}.raw' for hhmm in ('0015', '0030', '0045')]
+
+def test_vectorized_drops_rows_after_their_block(make_dat, tmp_path, output_directory, caplog):
+    lines = toa5_lines('2012-01-01 00:17:00', 3 * BLOCK_SIZE)
+    header, rows = lines[:4], lines[4:]
+    # A row of the first block turns up again in a later chunk
+    late = rows[:2 * BLOCK_SIZE] + [rows[10]] + rows[2 * BLOCK_SIZE:]
+    path = write_lines(str(tmp_path / 'late.dat'), header + late)
+    expected = expected_blocks([write_lines(str(tmp_path / 'clean.dat'), header + rows)])
+    with caplog.at_level(logging.WARNING):
+        split_file_vectorized(path, output_directory, SITE, BLOCK_SIZE)
+    assert read_blocks(output_directory) == expected
+    assert 'arrived after the block was written' in caplog.text
@@ -0,0 +1,24 @@
+import os
+import numpy as np
+from ecdataprocessing.synthetic_toa5 import HEADER, generate_dataset, timestamp_strings, write_toa5
+from ecdataprocessing.timestamps import parse_timestamps
+
+def test_timestamp_strings():
+    times = parse_timestamps(['2012-01-01 00:00:00', '2012-01-01 00:00:00.05', '2012-01-01 00:00:00.5'])
+    assert list(timestamp_strings(times)) == ['"2012-01-01 00:00:00"', '"2012-01-01 00:00:00.05"', '"2012-01-01 00:00:00.5"']
+
+def test_write_toa5_gaps(tmp_path):
+    path = str(tmp_path / 'a.dat')
+    rows = write_toa5(path, '2012-01-01 00:17:00', 1000, frequency=2, gaps=2, max_gap_seconds=30, newline='\r\n')
+    with open(path, newline='') as file:
+        lines = file.readlines()
+    assert [line.rstrip('\r\n') for line in lines[:4]] == HEADER
+    assert len(lines) - 4 == rows < 1000 and all(line.endswith('\r\n') for line in lines)
+    times = parse_timestamps([line.split(',', 1)[0] for line in lines[4:]])
+    assert np.all(np.diff(times) > 0) and times[0] == parse_timestamps(['2012-01-01 00:17:00'])[0]
+
+def test_generate_dataset(tmp_path):
+    dataset = generate_dataset(str(tmp_path), days=0.5, start='2014-12-31 18:17:00', frequency=1, file_hours=4, gaps=0)
+    assert dataset['years'] == [2014, 2015] and len(dataset['files']) == 3
+    assert dataset['rows'] == 12 * 3600
+    assert os.path.exists(os.path.join(dataset['zip_root'], '2015', 'turb', os.path.basename(dataset['files'][-1])[:-4] + '.zip'))
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+from ecdataprocessing.timestamps import block_numbers, floor_to_block, format_block_key, parse_timestamp, parse_timestamps, to_datetime
+
+def test_parse_timestamps():
+    values = ['"2012-01-01 00:17:00"', '2012-01-01 00:17:00.5', '2016-02-29T23:59:59.123456789', '"1999-12-31 12:00:00.05"']
+    expected = np.array(['2012-01-01T00:17:00', '2012-01-01T00:17:00.5', '2016-02-29T23:59:59.123456789',
+                         '1999-12-31T12:00:00.05'], dtype='datetime64[ns]').astype(np.int64)
+    np.testing.assert_array_equal(parse_timestamps(values), expected)
+    np.testing.assert_array_equal(parse_timestamps(np.array(values, dtype='S')), expected)
+    assert parse_timestamps([]).dtype == np.int64
+
+def test_parse_timestamps_matches_pandas():
+    times = pd.date_range('1990-01-01', '2030-12-31', periods=2000) + pd.to_timedelta(np.arange(2000) * 50, unit='ms')
+    text = times.strftime('%Y-%m-%d %H:%M:%S.%f')
+    np.testing.assert_array_equal(parse_timestamps(np.asarray(text)), times.as_unit('ns').asi8)
+
+@pytest.mark.parametrize('value', ['2012/01/01 00:17:00', '2012-01-01', 'TIMESTAMP', '"NAN"'])
+def test_parse_timestamps_rejects_other_layouts(value):
+    with pytest.raises(ValueError):
+        parse_timestamps(['2012-01-01 00:00:00', value])
+
+def test_blocks():
+    time = parse_timestamp('2012-01-01 00:47:13.5')
+    assert to_datetime(time) == datetime(2012, 1, 1, 0, 47, 13, 500000)
+    assert to_datetime(floor_to_block(time)) == datetime(2012, 1, 1, 0, 30)
+    assert to_datetime(floor_to_block(time, 15)) == datetime(2012, 1, 1, 0, 45)
+    assert format_block_key(time) == '2012-01-01_0030'
+    assert format_block_key(time, 60) == '2012-01-01_0000'
+    times = parse_timestamps(['2012-01-01 00:29:59.95', '2012-01-01 00:30:00', '2012-01-01 01:00:00'])
+    assert list(np.diff(block_numbers(times))) == [1, 1]
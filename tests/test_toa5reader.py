@@ -0,0 +1,30 @@
+import pytest
+from toa5files import HEADER, toa5_lines, write_lines
+from ecdataprocessing.toa5reader import TOA5Reader, summarize_file
+from ecdataprocessing.checktime import get_start_and_end_times
+
+@pytest.fixture(params=['\n', '\r\n'])
+def dat_file(tmp_path, request):
+    # 00:17:00 to 00:25:19.5 at 2 Hz
+    return write_lines(str(tmp_path / 'a.dat'), toa5_lines('2012-01-01 00:17:00', 1000), request.param)
+
+def test_header_and_first_and_last_timestamp(dat_file):
+    with TOA5Reader(dat_file) as reader:
+        assert reader.header == HEADER
+        assert reader.columns[:3] == ['TIMESTAMP', 'RECORD', 'Ux']
+        assert reader.first_timestamp == '2012-01-01 00:17:00'
+        assert reader.last_timestamp == '2012-01-01 00:25:19.5'
+    assert get_start_and_end_times(dat_file) == ('2012-01-01 00:17:00', '2012-01-01 00:25:19.5')
+
+def test_row_count(dat_file, tmp_path):
+    with TOA5Reader(dat_file) as reader:
+        assert reader.row_count(chunk_size=1000) == 1000
+    # Trailing blank lines are not rows
+    with open(dat_file, 'a') as file:
+        file.write('\n\n')
+    assert summarize_file(dat_file) == ('2012-01-01 00:17:00', '2012-01-01 00:25:19.5', 1000)
+
+def test_header_only_file(tmp_path):
+    with TOA5Reader(write_lines(str(tmp_path / 'a.dat'), [])) as reader:
+        assert reader.first_timestamp is None and reader.last_timestamp is None
+        assert reader.row_count() == 0
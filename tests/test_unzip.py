@@ -0,0 +1,56 @@
+import os
+import zipfile
+from ecdataprocessing.unzipfiles import ExtractionManifest, extract_zip, unzip_all_files
+
+def make_zip(path, members: dict) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return path
+
+def test_unzip_all_files_uses_year_and_turb_layout(tmp_path):
+    source, destination = tmp_path / 'zips', tmp_path / 'out'
+    make_zip(str(source / '2012' / 'a.zip'), {'a.dat': 'a'})
+    make_zip(str(source / '2015' / 'turb' / 'b.zip'), {'b.dat': 'b'})
+    make_zip(str(source / '2015' / 'c.zip'), {'c.dat': 'c'})  # outside 'turb', ignored
+    make_zip(str(source / '2013' / 'd.zip'), {'d.dat': 'd'})  # year not selected
+    unzip_all_files(str(source), str(destination), years=[2012, 2015], turb_years=[2015], workers=2)
+    assert (destination / '2012' / 'TOB' / 'a.dat').read_text() == 'a'
+    assert (destination / '2015' / 'TOB' / 'b.dat').read_text() == 'b'
+    assert not (destination / '2015' / 'TOB' / 'c.dat').exists()
+    assert not (destination / '2013').exists()
+
+def test_extract_zip_skips_recorded_members(tmp_path):
+    archive = make_zip(str(tmp_path / 'a.zip'), {'a.dat': 'first', 'b.dat': 'second'})
+    destination = tmp_path / 'TOB'
+    destination.mkdir()
+    manifest = ExtractionManifest(str(destination))
+    assert extract_zip(archive, str(destination), manifest) == 2
+    assert extract_zip(archive, str(destination), manifest) == 0
+
+    # A member that changed (other size and CRC) is extracted again
+    make_zip(archive, {'a.dat': 'changed!', 'b.dat': 'second'})
+    assert extract_zip(archive, str(destination), manifest) == 1
+    assert (destination / 'a.dat').read_text() == 'changed!'
+    assert not any(name.endswith('.part') for name in os.listdir(destination))
+    manifest.close()
+
+def test_files_extracted_before_the_manifest_are_recognised(tmp_path):
+    archive = make_zip(str(tmp_path / 'a.zip'), {'a.dat': 'content'})
+    destination = tmp_path / 'TOB'
+    destination.mkdir()
+    (destination / 'a.dat').write_text('content')
+    manifest = ExtractionManifest(str(destination))
+    assert extract_zip(archive, str(destination), manifest) == 0
+    assert manifest.is_extracted(zipfile.ZipFile(archive).getinfo('a.dat'))
+    manifest.close()
+
+def test_errors_are_appended_to_the_error_log(tmp_path):
+    source, destination = tmp_path / 'zips', tmp_path / 'out'
+    make_zip(str(source / '2012' / 'bad.zip'), {'../escape.dat': 'x'})
+    for _ in range(2):
+        unzip_all_files(str(source), str(destination), years=[2012], turb_years=[], workers=1)
+    log = (destination / '2012' / 'TOB' / 'error_log.txt').read_text()
+    assert log.count('Failed to unzip') == 2 and 'Unsafe member path' in log
+    assert not (destination / '2012' / 'escape.dat').exists()
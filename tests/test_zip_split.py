@@ -0,0 +1,65 @@
+import os
+import logging
+import zipfile
+import pytest
+from toa5files import BLOCK_SIZE, FREQUENCY, SITE, expected_blocks, read_blocks
+from ecdataprocessing.blockindex import BlockIndex
+from ecdataprocessing.split_30mins_file import split_files_parallel, split_files_serial, split_path_vectorized
+
+@pytest.fixture
+def archives(make_dat, tmp_path):
+    """Two archives of two consecutive .dat files each, and the .dat files themselves."""
+    starts = ['2012-01-01 00:17:00', '2012-01-01 01:17:00', '2012-01-01 02:17:00', '2012-01-01 03:17:00']
+    paths = [make_dat(f'{i}.dat', start, 2 * BLOCK_SIZE) for i, start in enumerate(starts)]
+    zips = []
+    for number, members in enumerate((paths[:2], paths[2:])):
+        zips.append(str(tmp_path / f'{number}.zip'))
+        with zipfile.ZipFile(zips[-1], 'w', zipfile.ZIP_DEFLATED) as archive:
+            for path in members:
+                archive.write(path, os.path.basename(path))
+    return zips, paths
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_zip_members_match_dat_files(archives, output_directory, workers):
+    zips, paths = archives
+    if workers > 1:
+        split_files_parallel(zips, output_directory, SITE, BLOCK_SIZE, workers)
+    else:
+        index = BlockIndex(output_directory)
+        for path in zips:
+            split_path_vectorized(path, output_directory, SITE, BLOCK_SIZE, index=index)
+        index.close()
+    assert read_blocks(output_directory) == expected_blocks(paths)
+
+def test_non_toa5_members_are_skipped(make_dat, tmp_path, output_directory, caplog):
+    path = make_dat('a.dat', '2012-01-01 00:30:00', BLOCK_SIZE)
+    archive_path = str(tmp_path / 'a.zip')
+    with zipfile.ZipFile(archive_path, 'w') as archive:
+        archive.write(path, 'a.dat')
+        archive.writestr('b.dat', b'TOB1 binary')
+        archive.writestr('notes.txt', 'not data')
+    with caplog.at_level(logging.WARNING):
+        split_path_vectorized(archive_path, output_directory, SITE, BLOCK_SIZE)
+    assert 'Skipping a.zip:b.dat: not a TOA5 file' in caplog.text
+    assert read_blocks(output_directory) == expected_blocks([path])
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_rerun_with_an_extra_member(make_dat, tmp_path, output_directory, workers):
+    first = make_dat('a.dat', '2012-01-01 00:17:00', 2 * BLOCK_SIZE)
+    second = make_dat('b.dat', '2012-01-01 01:17:00', BLOCK_SIZE)
+    archive_path = str(tmp_path / 'archive.zip')
+    for members in ([first], [first, second]):
+        # The logger added b.dat to the archive after the first run
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            for path in members:
+                archive.write(path, os.path.basename(path))
+        if workers > 1:
+            split_files_parallel([archive_path], output_directory, SITE, BLOCK_SIZE, workers, use_index=True)
+        else:
+            index = BlockIndex(output_directory)
+            split_files_serial([archive_path], output_directory, SITE, BLOCK_SIZE, FREQUENCY, index=index)
+            index.close()
+    assert read_blocks(output_directory) == expected_blocks([first, second])
+    index = BlockIndex(output_directory)
+    assert index.sources(f'2012-01-01_0100_{SITE}.raw') == ['archive.zip:a.dat', 'archive.zip:b.dat']
+    index.close()
@@ -0,0 +1,66 @@
+import os
+from datetime import datetime, timedelta
+
+# Small TOA5 files and expected block contents for the tests. 2 Hz keeps a 30-minute block at 3600 rows while the
+# timestamps still have fractions.
+
+FREQUENCY = 2
+BLOCK_SIZE = 30 * 60 * FREQUENCY
+SITE = 'speuld'
+HEADER = [
+    '"TOA5","speuld","CR3000","1","CR3000.Std","CPU:ec.CR3","1","ts_data"',
+    '"TIMESTAMP","RECORD","Ux","Uy","Uz","Ts","diag","co2","h2o"',
+    '"TS","RN","m/s","m/s","m/s","C","","mg/m3","g/m3"',
+    '"","","Smp","Smp","Smp","Smp","Smp","Smp","Smp"',
+]
+
+def toa5_timestamp(time: datetime) -> str:
+    """Format a time like the logger: "YYYY-MM-DD HH:MM:SS" plus a fraction without trailing zeros."""
+    fraction = f"{time.microsecond / 1e6:.6f}"[1:].rstrip('0').rstrip('.')
+    return f'"{time:%Y-%m-%d %H:%M:%S}{fraction}"'
+
+def toa5_lines(start: str, rows: int, frequency: int = FREQUENCY, nan_rows=(), nan_column: int = 2, first_record: int = 0):
+    """Return data lines with deterministic values; the rows in `nan_rows` have "NAN" in column `nan_column`."""
+    first = datetime.strptime(start, '%Y-%m-%d %H:%M:%S')
+    lines = []
+    for row in range(rows):
+        values = [f"{(row * 7 + column * 13) % 1000 / 8:.4f}" for column in range(7)]
+        values[4] = '0'
+        if row in nan_rows:
+            values[nan_column - 2] = '"NAN"'
+        time = first + timedelta(seconds=row / frequency)
+        lines.append(','.join([toa5_timestamp(time), str(first_record + row)] + values))
+    return lines
+
+def write_lines(path: str, lines, newline: str = '\n') -> str:
+    """Write a TOA5 file with the standard header and the given data lines."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', newline='') as file:
+        file.write(newline.join(HEADER + list(lines)) + newline)
+    return path
+
+def baseline_line(line: str) -> str:
+    """Format one data line the way the original splitter did."""
+    return '\t'.join([f"{float(entry):.6f}" if entry.strip('"') != "NAN" else "NAN"
+                      for i, entry in enumerate(line.rstrip('\r\n').split(',')[2:9]) if i != 4]) + '\n'
+
+def expected_blocks(dat_files, block_minutes: int = 30) -> dict:
+    """Return {block file name: content} of gap-free .dat files, formatted like the original splitter."""
+    blocks = {}
+    for path in dat_files:
+        with open(path) as file:
+            for line in list(file)[len(HEADER):]:
+                timestamp = line.split(',')[0].strip('"')
+                minute = int(timestamp[14:16]) // block_minutes * block_minutes
+                name = f"{timestamp[:10]}_{timestamp[11:13]}{minute:02d}_{SITE}.raw"
+                blocks[name] = blocks.get(name, '') + baseline_line(line)
+    return {name: text.encode() for name, text in blocks.items()}
+
+def read_blocks(output_directory: str, suffix: str = '.raw') -> dict:
+    """Return {block file name: content} of the blocks in a folder."""
+    blocks = {}
+    for name in sorted(os.listdir(output_directory)):
+        if name.endswith(suffix):
+            with open(os.path.join(output_directory, name), 'rb') as file:
+                blocks[name] = file.read()
+    return blocks